@@ -1,6 +1,12 @@
-from typing import List, Dict, Tuple
-from functools import cmp_to_key
+from typing import List, Dict, Tuple, Optional, Iterator, Callable
+from collections import OrderedDict
 from card import Card
+from rank_counts import RankCounts, NUM_RANKS, SLOT_BITS
+from bitboard import Bitboard, CHAIN_GUARDS, PLAIN_GUARDS
+
+# Rank values of the jokers in a count vector
+BLACK_JOKER = 13
+RED_JOKER = 14
 
 class ActionGenerator:
     def __init__(self):
@@ -8,9 +14,18 @@ class ActionGenerator:
         self.RANK_TO_VAL: Dict[str, int] = {}
         self.MAX_STRAIGHT_RANK: str = "A"
         self.MIN_STRAIGHT_RANK: str = "3"
+        self.STRAIGHT_LO: int = 0
+        self.STRAIGHT_HI: int = 11
+        self.action_space = None
+        # Bounded LRU: action_str -> (pattern info, sort key). Large enough for the
+        # whole action space, so steady-state play never re-classifies an action.
+        self.pattern_cache: "OrderedDict[str, Tuple[Dict, Tuple]]" = OrderedDict()
+        self.pattern_cache_capacity = 32768
+        self.pattern_cache_hits = 0
+        self.pattern_cache_misses = 0
 
     @classmethod
-    def NewActionGenerator(cls) -> 'ActionGenerator':
+    def NewActionGenerator(cls, use_action_space: bool = False) -> 'ActionGenerator':
         ag = cls()
         ag.RANK_ORDER = ["3","4","5","6","7","8","9","T","J","Q","K","A","2","B","R"]
         # Faster lookups
@@ -21,6 +36,13 @@ class ActionGenerator:
         # For "straight/pair-chain/airplane" the highest allowed rank is "A"
         ag.MAX_STRAIGHT_RANK = "A"   # cannot include "2","B","R"
         ag.MIN_STRAIGHT_RANK = "3"
+        ag.STRAIGHT_LO = ag.RANK_TO_VAL[ag.MIN_STRAIGHT_RANK]
+        ag.STRAIGHT_HI = ag.RANK_TO_VAL[ag.MAX_STRAIGHT_RANK]
+
+        # Optional engine: answer GetLegalActions from the precomputed action-space table
+        if use_action_space:
+            from action_space import ActionSpace
+            ag.action_space = ActionSpace.Shared(ag)
 
         return ag
 
@@ -39,197 +61,86 @@ class ActionGenerator:
     def IsRankInStraightRange(self, r: str) -> bool:
         # Straight/PairChain/Airplane core allow only 3..A
         val = self.RANK_TO_VAL[r]
-        return (self.RANK_TO_VAL[self.MIN_STRAIGHT_RANK] <= val) and (val <= self.RANK_TO_VAL[self.MAX_STRAIGHT_RANK])
-
-    def CountRanks(self, hand_cards: List[Card]) -> Dict[str, int]:
-        m: Dict[str, int] = {}
-        for c in hand_cards:
-            m[c.rank] = m.get(c.rank, 0) + 1
-        return m
-
-    def CountRanksFromString(self, s: str) -> Dict[str, int]:
-        m: Dict[str, int] = {}
-        for ch in s:
-            m[ch] = m.get(ch, 0) + 1
-        return m
-
-    def CloneCounts(self, m: Dict[str, int]) -> Dict[str, int]:
-        n: Dict[str, int] = {}
-        for k, v in m.items():
-            n[k] = v
-        return n
-
-    def SubCounts(self, a: Dict[str, int], b: Dict[str, int]) -> Dict[str, int]:
-        # returns (a - b), assumes a has enough
-        n = self.CloneCounts(a)
-        for k, v in b.items():
-            n[k] = n.get(k, 0) - v
-            if n[k] <= 0:
-                del n[k]
-        return n
-
-    def MakeUseMap(self, ranks: List[str], times: int) -> Dict[str, int]:
-        m: Dict[str, int] = {}
-        for r in ranks:
-            m[r] = m.get(r, 0) + times
-        return m
-
-    def CountTotal(self, m: Dict[str, int]) -> int:
-        s = 0
-        for _, c in m.items():
-            s = s + c
-        return s
-
-    def NumberOfKeys(self, cnt: Dict[str, int]) -> int:
-        n = 0
-        for _ in cnt.items():
-            n = n + 1
-        return n
-
-    def AllSameCount(self, cnt: Dict[str, int], value: int) -> bool:
-        if self.NumberOfKeys(cnt) == 0:
-            return False
-        for _, c in cnt.items():
-            if c != value:
-                return False
-        return True
-
-    def AllCountsMax(self, cnt: Dict[str, int], maxv: int) -> bool:
-        for _, c in cnt.items():
-            if c > maxv:
-                return False
-        return True
+        return (self.STRAIGHT_LO <= val) and (val <= self.STRAIGHT_HI)
 
-    def ContainsCount(self, cnt: Dict[str, int], target: int) -> bool:
-        for _, c in cnt.items():
-            if c == target:
-                return True
-        return False
-
-    def GetRankWithCount(self, cnt: Dict[str, int], target: int):
-        for r, c in cnt.items():
-            if c == target:
-                return r
-        return None
+    def CountVector(self, hand_cards: List[Card]) -> List[int]:
+        # Card-list adapter: 15-slot rank-count vector indexed by rank value
+        return RankCounts.FromCards(hand_cards)
 
     def SortRanks(self, ranks: List[str]) -> List[str]:
         ranks.sort(key=lambda rank: self.RANK_TO_VAL[rank])
         return ranks
 
-    def SortedRanks(self, cnt: Dict[str, int]) -> List[str]:
-        ranks: List[str] = []
-        for r, _ in cnt.items():
-            ranks.append(r)
-        return self.SortRanks(ranks)
-
-    def IsConsecutive(self, ranks_sorted: List[str]) -> bool:
-        if len(ranks_sorted) <= 1:
-            return True
-        for i in range(0, len(ranks_sorted) - 1):
-            if self.RANK_TO_VAL[ranks_sorted[i+1]] != self.RANK_TO_VAL[ranks_sorted[i]] + 1:
-                return False
-        return True
-
-    def AllWithinStraightRange(self, ranks_sorted: List[str]) -> bool:
-        for r in ranks_sorted:
-            if not self.IsRankInStraightRange(r):
-                return False
-        return True
-
-    def ListSingleRanksFromCounts(self, cnt: Dict[str, int]) -> List[str]:
-        # Each rank appears as many times as multiplicity (so we can choose two different copies if available)
-        out: List[str] = []
-        for r, c in cnt.items():
-            for _ in range(1, c + 1):
-                out.append(r)
-        # Keep stable order by rank value
-        out = self.SortRanks(out)
-        return out
-
-    def ListPairRanksFromCounts(self, cnt: Dict[str, int]) -> List[str]:
-        # Each rank appears floor(c/2) times; picking it once consumes 2 cards
-        out: List[str] = []
-        for r, c in cnt.items():
-            k = c // 2
-            for _ in range(1, k + 1):
-                # Jokers cannot form pairs naturally; counts for "B"/"R" will be 0/1, so no entry added
-                if r != "B" and r != "R":
-                    out.append(r)
-        out = self.SortRanks(out)
-        return out
+    def CombinationsOfCounts(self, caps: List[Tuple[str, int]], k: int) -> List[Dict[str, int]]:
+        # Distinct multisets of k picks where rank r may be picked 0..cap times.
+        # Walks rank-count combinations directly, so equal multisets are never built twice.
+        result: List[Dict[str, int]] = []
+        cur: Dict[str, int] = {}
 
-    def CombinationsByIndex(self, A: List, k: int) -> List[List[int]]:
-        result: List[List[int]] = []
-        cur: List[int] = []
+        # suffix_cap[i] = how many picks ranks i.. can still supply (prunes dead branches)
+        suffix_cap = [0] * (len(caps) + 1)
+        for i in range(len(caps) - 1, -1, -1):
+            suffix_cap[i] = suffix_cap[i + 1] + caps[i][1]
 
-        def dfs(start: int, remain: int):
+        def dfs(i: int, remain: int):
             if remain == 0:
-                result.append(list(cur))
+                result.append(dict(cur))
                 return
-            for i in range(start, len(A) - remain + 1):
-                cur.append(i)
-                dfs(i + 1, remain - 1)
-                cur.pop()
-
-        if k <= len(A) and k >= 0:
+            if suffix_cap[i] < remain:
+                return
+            r, cap = caps[i]
+            for take in range(min(cap, remain), -1, -1):
+                if take > 0:
+                    cur[r] = take
+                else:
+                    cur.pop(r, None)
+                dfs(i + 1, remain - take)
+
+        if k >= 0:
             dfs(0, k)
         return result
 
     def StringFromCounts(self, cnt: Dict[str, int]) -> str:
         s = ""
-        ranks_sorted = self.SortRanks(self.SortedRanks(cnt))
-        for r in ranks_sorted:
-            for _ in range(1, cnt.get(r, 0) + 1):
-                s = s + r
+        for r in self.SortRanks(list(cnt.keys())):
+            s = s + r * cnt[r]
         return s
 
-    def FindAirplaneCores(self, counts: Dict[str, int]) -> List[List[str]]:
+    def ConsecutiveWindows(self, counts: List[int], min_count: int, min_len: int) -> List[Tuple[int, int]]:
+        # All (start_value, length) runs inside 3..A where every rank has >= min_count cards,
+        # shorter windows first, lower start first. Found with shift-and-AND sliding windows
+        # over the per-rank presence bits instead of scanning blocks.
+        windows: List[Tuple[int, int]] = []
+        presence = Bitboard.PresenceAtLeast(RankCounts.Pack(counts), min_count) & CHAIN_GUARDS
+        L = min_len
+        starts = Bitboard.ChainStarts(presence, L)
+        while starts:
+            for v in Bitboard.GuardRanks(starts):
+                windows.append((v, L))
+            L = L + 1
+            starts = starts & (presence >> (SLOT_BITS * (L - 1)))
+        return windows
+
+    def FindAirplaneCores(self, counts: List[int]) -> List[List[str]]:
+        # ranks eligible for core (>=3 and within straight range), consecutive blocks length >=2
         cores: List[List[str]] = []
-        # ranks eligible for core (>=3 and within straight range)
-        elig: List[str] = []
-        for r, c in counts.items():
-            if (c >= 3) and self.IsRankInStraightRange(r):
-                elig.append(r)
-        elig = self.SortRanks(elig)
-
-        # consecutive blocks length >=2
-        i = 0
-        while i < len(elig):
-            j = i
-            while (j + 1 < len(elig)) and (self.RANK_TO_VAL[elig[j+1]] == self.RANK_TO_VAL[elig[j]] + 1):
-                j = j + 1
-            block_len = j - i + 1
-            if block_len >= 2:
-                for L in range(2, block_len + 1):
-                    for start in range(i, j - L + 2):
-                        core: List[str] = []
-                        for t in range(start, start + L):
-                            core.append(elig[t])
-                        cores.append(core)
-            i = j + 1
-
+        for start, L in self.ConsecutiveWindows(counts, 3, 2):
+            cores.append(self.RANK_ORDER[start:start + L])
         return cores
 
-    def TryExtractAirplaneCore(self, cnt: Dict[str, int]) -> Dict:
-        # Brute-force: try all possible cores (as IdentifyPatternFromString is called on already-fixed string)
-        cores = self.FindAirplaneCores(cnt)
-        for core_ranks in cores:
-            # check if cnt has at least 3 of each core rank
-            ok = True
-            for r in core_ranks:
-                if cnt.get(r, 0) < 3:
-                    ok = False
-                    break
-            if ok:
-                use = self.MakeUseMap(core_ranks, 3)  # r -> 3
-                return {"success": True, "core_ranks": core_ranks, "core_use": use}
-        return {"success": False}
+    def TryExtractAirplaneCore(self, counts: List[int]):
+        # First possible core, i.e. the lowest pair of consecutive trios (IdentifyPattern is
+        # called on an already-fixed action). Returns (start_value, 2) or None.
+        presence = Bitboard.PresenceAtLeast(RankCounts.Pack(counts), 3)
+        starts = Bitboard.ChainStarts(presence, 2)
+        if starts == 0:
+            return None
+        return ((starts & -starts).bit_length() - 1) // SLOT_BITS, 2
 
     def RepeatRanks(self, core_ranks: List[str], times: int) -> str:
         s = ""
         for r in core_ranks:
-            for _ in range(1, times + 1):
-                s = s + r
+            s = s + r * times
         return s
 
     def IsValidAirplaneAttachmentCounts(self, core_ranks: List[str], attach_cnt: Dict[str, int], attach_type: str) -> bool:
@@ -269,400 +180,280 @@ class ActionGenerator:
 
         return True
 
-    def IsValidAirplaneAttachmentString(self, core_str: str, attach_cnt: Dict[str, int], attach_type: str) -> bool:
-        # derive core_ranks from core_str (every 3 contiguous chars per rank)
-        core_rank_cnt = self.CountRanksFromString(core_str)
-        core_ranks = self.SortedRanks(core_rank_cnt)
-        return self.IsValidAirplaneAttachmentCounts(core_ranks, attach_cnt, attach_type)
-
     def IdentifyPatternFromString(self, action_str: str) -> Dict:
+        if action_str == "" or action_str == "pass":
+            return {"kind": "invalid", "main_value": -1}
+        return self.IdentifyPatternFromCounts(RankCounts.FromString(action_str))
+
+    def IdentifyPatternFromCounts(self, counts: List[int]) -> Dict:
         info = {"kind": "invalid", "main_value": -1}
 
-        if action_str == "" or action_str == "pass":
+        total = 0
+        present: List[int] = []   # rank values in the action, ascending
+        for v in range(0, NUM_RANKS):
+            if counts[v] > 0:
+                total = total + counts[v]
+                present.append(v)
+        if total == 0:
             return info
-
-        # Count by rank
-        cnt = self.CountRanksFromString(action_str)
+        distinct = len(present)
+        lo = present[0]
+        hi = present[distinct - 1]
+        multiplicities = set([counts[v] for v in present])
 
         # Rocket
-        if (len(action_str) == 2) and (cnt.get("B", 0) == 1) and (cnt.get("R", 0) == 1):
+        if (total == 2) and (counts[BLACK_JOKER] == 1) and (counts[RED_JOKER] == 1):
             info["kind"] = "rocket"
             info["main_value"] = 999
             return info
 
-        # Bomb
-        if len(action_str) == 4:
-            # exactly four of a kind
-            for rank, c in cnt.items():
-                if c == 4:
-                    info["kind"] = "bomb"
-                    info["main_value"] = self.RANK_TO_VAL[rank]
-                    return info
+        # Bomb: exactly four of a kind
+        if (total == 4) and (distinct == 1):
+            info["kind"] = "bomb"
+            info["main_value"] = lo
+            return info
 
         # Solo / Pair / Trio
-        if len(action_str) == 1:
-            r = action_str[0]
+        if total == 1:
             info["kind"] = "solo"
-            info["main_value"] = self.RANK_TO_VAL[r]
+            info["main_value"] = lo
             return info
 
-        if len(action_str) == 2:
-            # could be pair (not jokers, since "BR" already returned rocket)
-            if self.AllSameCount(cnt, 2) and (self.NumberOfKeys(cnt) == 1):
-                r = self.GetRankWithCount(cnt, 2)
-                info["kind"] = "pair"
-                info["main_value"] = self.RANK_TO_VAL[r]
-                return info
+        if (total == 2) and (distinct == 1):
+            # pair (not jokers, since "BR" already returned rocket)
+            info["kind"] = "pair"
+            info["main_value"] = lo
+            return info
 
-        if len(action_str) == 3:
-            if self.AllSameCount(cnt, 3) and (self.NumberOfKeys(cnt) == 1):
-                r = self.GetRankWithCount(cnt, 3)
-                info["kind"] = "trio"
-                info["main_value"] = self.RANK_TO_VAL[r]
-                info["core_count"] = 1
-                return info
+        if (total == 3) and (distinct == 1):
+            info["kind"] = "trio"
+            info["main_value"] = lo
+            info["core_count"] = 1
+            return info
 
-        # Trio with single (4 cards): trio(3) + single(1), single rank must differ from trio rank
-        if len(action_str) == 4:
-            if self.ContainsCount(cnt, 3) and self.ContainsCount(cnt, 1) and (self.NumberOfKeys(cnt) == 2):
-                trio_rank = self.GetRankWithCount(cnt, 3)
-                single_rank = self.GetRankWithCount(cnt, 1)
-                if trio_rank != single_rank:
-                    info["kind"] = "trio_single"
-                    info["main_value"] = self.RANK_TO_VAL[trio_rank]
-                    info["core_count"] = 1
-                    return info
+        # Trio with single (4 cards): trio(3) + single(1) of another rank
+        if (total == 4) and (distinct == 2) and (3 in multiplicities):
+            trio_value = lo if counts[lo] == 3 else hi
+            info["kind"] = "trio_single"
+            info["main_value"] = trio_value
+            info["core_count"] = 1
+            return info
 
         # Trio with pair (5 cards): trio(3) + pair(2)
-        if len(action_str) == 5:
-            if self.ContainsCount(cnt, 3) and self.ContainsCount(cnt, 2) and (self.NumberOfKeys(cnt) == 2):
-                trio_rank = self.GetRankWithCount(cnt, 3)
-                pair_rank = self.GetRankWithCount(cnt, 2)
-                if (trio_rank != pair_rank) and (pair_rank != "B") and (pair_rank != "R"):
-                    info["kind"] = "trio_pair"
-                    info["main_value"] = self.RANK_TO_VAL[trio_rank]
-                    info["core_count"] = 1
-                    return info
+        if (total == 5) and (distinct == 2) and (3 in multiplicities) and (2 in multiplicities):
+            trio_value = lo if counts[lo] == 3 else hi
+            pair_value = hi if counts[lo] == 3 else lo
+            if (pair_value != BLACK_JOKER) and (pair_value != RED_JOKER):
+                info["kind"] = "trio_pair"
+                info["main_value"] = trio_value
+                info["core_count"] = 1
+                return info
 
-        # Four with two singles (6 cards): four(4) + two singles (can be same or different); no rocket among these two 
-        if len(action_str) == 6:
-            if self.ContainsCount(cnt, 4):
-                four_rank = self.GetRankWithCount(cnt, 4)
-                # Collect the remaining 2 cards
-                rem_ranks: List[str] = []
-                for rank, c in cnt.items():
-                    if rank != four_rank:
-                        for _ in range(1, c + 1):
-                            rem_ranks.append(rank)
-                # Must be exactly 2 remaining cards
-                if len(rem_ranks) == 2:
-                    # Check they are not rocket (B + R)
-                    if not (("B" in rem_ranks) and ("R" in rem_ranks)):
-                        info["kind"] = "four_two_single"
-                        info["main_value"] = self.RANK_TO_VAL[four_rank]
-                        return info
+        # Four with two singles (6 cards): the two singles may be the same rank; not the rocket
+        if (total == 6) and (4 in multiplicities):
+            four_value = [v for v in present if counts[v] == 4][0]
+            if not ((counts[BLACK_JOKER] >= 1) and (counts[RED_JOKER] >= 1)):
+                info["kind"] = "four_two_single"
+                info["main_value"] = four_value
+                return info
 
         # Four with two pairs (8 cards): four(4) + two pairs(2,2)
-        if len(action_str) == 8:
-            if self.ContainsCount(cnt, 4):
-                four_rank = self.GetRankWithCount(cnt, 4)
-                # Check remaining are exactly two pairs (no jokers can make pair anyway)
-                pairs_count = 0
-                ok = True
-                for rank, c in cnt.items():
-                    if rank == four_rank:
-                        continue
-                    if c == 2:
-                        pairs_count = pairs_count + 1
-                    else:
-                        ok = False
-                if ok and (pairs_count == 2):
-                    info["kind"] = "four_two_pair"
-                    info["main_value"] = self.RANK_TO_VAL[four_rank]
-                    return info
-
-        # Straight: length>=5, all single, consecutive in [3..A]
-        if (len(action_str) >= 5) and self.AllSameCount(cnt, 1):
-            ranks_sorted = self.SortedRanks(cnt)
-            if self.AllWithinStraightRange(ranks_sorted) and self.IsConsecutive(ranks_sorted):
-                # main value = highest rank in straight
-                top = ranks_sorted[len(ranks_sorted) - 1]
-                info["kind"] = "straight"
-                info["main_value"] = self.RANK_TO_VAL[top]
-                info["length"] = len(action_str)
+        if (total == 8) and (4 in multiplicities):
+            four_value = [v for v in present if counts[v] == 4][0]
+            others = [counts[v] for v in present if v != four_value]
+            if (len(others) == 2) and (others[0] == 2) and (others[1] == 2):
+                info["kind"] = "four_two_pair"
+                info["main_value"] = four_value
                 return info
 
-        # Pair Chain: total length >=6 and divisible by 2, all counts==2, consecutive in [3..A]
-        if (len(action_str) >= 6) and (len(action_str) % 2 == 0) and self.AllSameCount(cnt, 2):
-            ranks_sorted = self.SortedRanks(cnt)
-            if self.AllWithinStraightRange(ranks_sorted) and self.IsConsecutive(ranks_sorted):
-                top = ranks_sorted[len(ranks_sorted) - 1]
-                info["kind"] = "pair_chain"
-                info["main_value"] = self.RANK_TO_VAL[top]
-                info["pair_len"] = len(action_str) // 2
-                return info
+        # Straight / Pair Chain / Airplane (pure): one multiplicity, consecutive inside [3..A]
+        is_chain = (len(multiplicities) == 1) and (hi - lo == distinct - 1) and (self.STRAIGHT_LO <= lo) and (hi <= self.STRAIGHT_HI)
 
-        # Airplane (pure): length divisible by 3, >= 6, all counts==3, consecutive in [3..A]
-        if (len(action_str) >= 6) and (len(action_str) % 3 == 0):
-            if self.AllSameCount(cnt, 3):
-                ranks_sorted = self.SortedRanks(cnt)
-                if self.AllWithinStraightRange(ranks_sorted) and self.IsConsecutive(ranks_sorted):
-                    top = ranks_sorted[len(ranks_sorted) - 1]
-                    info["kind"] = "airplane"
-                    info["main_value"] = self.RANK_TO_VAL[top]
-                    info["trio_len"] = len(action_str) // 3
-                    info["core_count"] = info["trio_len"]
-                    return info
+        # Straight: length>=5, all single; main value = highest rank in straight
+        if is_chain and (total >= 5) and (1 in multiplicities):
+            info["kind"] = "straight"
+            info["main_value"] = hi
+            info["length"] = total
+            return info
+
+        # Pair Chain: total length >=6, all counts==2
+        if is_chain and (total >= 6) and (2 in multiplicities):
+            info["kind"] = "pair_chain"
+            info["main_value"] = hi
+            info["pair_len"] = total // 2
+            return info
+
+        # Airplane (pure): >= 6, all counts==3
+        if is_chain and (total >= 6) and (3 in multiplicities):
+            info["kind"] = "airplane"
+            info["main_value"] = hi
+            info["trio_len"] = total // 3
+            info["core_count"] = info["trio_len"]
+            return info
 
         # Airplane with attachments:
         #   - with singles: total = 4*k, composed of k trios (consecutive) + k singles
         #   - with pairs  : total = 5*k, composed of k trios (consecutive) + k pairs
-        # Identification strategy: try to extract a maximal consecutive trio-core.
-        core = self.TryExtractAirplaneCore(cnt)
-        if core.get("success", False):
-            k = len(core["core_ranks"])            # number of trios
-            top = core["core_ranks"][k - 1]
-            remain = self.SubCounts(cnt, core["core_use"])  # remove exactly 3 of each core rank
-            total_len = len(action_str)
-
-            # with singles: 4*k
-            if total_len == 4 * k:
-                # remaining must be k single cards; additionally must satisfy "no rocket inside", "no bomb in final"
-                if self.CountTotal(remain) == k:
-                    # Validate attachments vs constraints (double-joker forbidden; no bombs in final; no adjacent-core extension by 3)
-                    airplane_cards_str = self.RepeatRanks(core["core_ranks"], 3)   # 3 of each in order
-                    if self.IsValidAirplaneAttachmentString(airplane_cards_str, remain, "single"):
-                        info["kind"] = "airplane_single"
-                        info["main_value"] = self.RANK_TO_VAL[top]
-                        info["trio_len"] = k
-                        info["core_count"] = k
-                        return info
-
-            # with pairs: 5*k
-            if total_len == 5 * k:
-                # remaining must be k pairs (counts all ==2)
-                if self.CountTotal(remain) == 2 * k and self.AllSameCount(remain, 2):
-                    airplane_cards_str = self.RepeatRanks(core["core_ranks"], 3)
-                    if self.IsValidAirplaneAttachmentString(airplane_cards_str, remain, "pair"):
-                        info["kind"] = "airplane_pair"
-                        info["main_value"] = self.RANK_TO_VAL[top]
-                        info["trio_len"] = k
-                        info["core_count"] = k
-                        return info
+        core = self.TryExtractAirplaneCore(counts)
+        if core is not None:
+            (start, k) = core                      # k = number of trios
+            core_ranks = self.RANK_ORDER[start:start + k]
+            top = start + k - 1
+            # remove exactly 3 of each core rank
+            attach_cnt: Dict[str, int] = {}
+            attach_total = 0
+            for v in present:
+                c = counts[v] - 3 if (start <= v <= top) else counts[v]
+                if c > 0:
+                    attach_cnt[self.RANK_ORDER[v]] = c
+                    attach_total = attach_total + c
+
+            # with singles: 4*k; validate "no rocket inside", "no bomb in final", no adjacent-core extension by 3
+            if (total == 4 * k) and (attach_total == k):
+                if self.IsValidAirplaneAttachmentCounts(core_ranks, attach_cnt, "single"):
+                    info["kind"] = "airplane_single"
+                    info["main_value"] = top
+                    info["trio_len"] = k
+                    info["core_count"] = k
+                    return info
+
+            # with pairs: 5*k; remaining must be k pairs (counts all ==2)
+            if (total == 5 * k) and (attach_total == 2 * k) and all(c == 2 for c in attach_cnt.values()):
+                if self.IsValidAirplaneAttachmentCounts(core_ranks, attach_cnt, "pair"):
+                    info["kind"] = "airplane_pair"
+                    info["main_value"] = top
+                    info["trio_len"] = k
+                    info["core_count"] = k
+                    return info
 
         return info
 
-    def LexRankLess(self, a: str, b: str) -> bool:
-        # compare char by char using rank order map
-        i = 0
-        while (i < len(a)) and (i < len(b)):
-            va = self.RANK_TO_VAL[a[i]]
-            vb = self.RANK_TO_VAL[b[i]]
-            if va != vb:
-                return va < vb
-            i = i + 1
-        return len(a) < len(b)
-
-    def SortUnique(self, seq: List[str]) -> List[str]:
-        # Deduplicate first
-        seen = set()
-        tmp: List[str] = []
-        for s in seq:
-            if s not in seen:
-                seen.add(s)
-                tmp.append(s)
+    def GetPatternEntry(self, action_str: str) -> Tuple[Dict, Tuple]:
+        entry = self.pattern_cache.get(action_str)
+        if entry is not None:
+            self.pattern_cache_hits = self.pattern_cache_hits + 1
+            self.pattern_cache.move_to_end(action_str)
+            return entry
 
+        self.pattern_cache_misses = self.pattern_cache_misses + 1
+        info = self.IdentifyPatternFromString(action_str)
         # Sort by:
-        # 1) length ascending
-        # 2) by main pattern value (if identifiable), otherwise lexicographic by rank order
-
-        def compare_actions(a: str, b: str) -> int:
-            if a == "pass" and b == "pass": return 0
-            if a == "pass": return -1  # pass 排最前
-            if b == "pass": return 1
-            if len(a) != len(b):
-                return -1 if len(a) < len(b) else 1
-            ia = self.IdentifyPatternFromString(a)
-            ib = self.IdentifyPatternFromString(b)
-            if (ia["kind"] != "invalid") and (ib["kind"] != "invalid"):
-                if ia["main_value"] != ib["main_value"]:
-                    return -1 if ia["main_value"] < ib["main_value"] else 1
-                # tie-break by lexicographic in rank-order
-                return -1 if self.LexRankLess(a, b) else (1 if self.LexRankLess(b, a) else 0)
-            else:
-                return -1 if self.LexRankLess(a, b) else (1 if self.LexRankLess(b, a) else 0)
+        # 1) "pass" first, then length ascending
+        # 2) main pattern value (unidentifiable patterns first), then lexicographic by rank order
+        if action_str == "pass":
+            key = (0, 0, 0, ())
+        else:
+            main_value = info["main_value"] if info["kind"] != "invalid" else -1
+            key = (1, len(action_str), main_value, tuple([self.RANK_TO_VAL[ch] for ch in action_str]))
+        entry = (info, key)
+        self.pattern_cache[action_str] = entry
+        if len(self.pattern_cache) > self.pattern_cache_capacity:
+            self.pattern_cache.popitem(last=False)
+        return entry
+
+    def GetPatternInfo(self, action_str: str) -> Dict:
+        # Memoized IdentifyPatternFromString; the returned dict is shared, do not modify it
+        return self.GetPatternEntry(action_str)[0]
+
+    def ActionSortKey(self, action_str: str) -> Tuple:
+        return self.GetPatternEntry(action_str)[1]
+
+    def GetPatternCacheStats(self) -> Dict[str, int]:
+        return {
+            "hits": self.pattern_cache_hits,
+            "misses": self.pattern_cache_misses,
+            "size": len(self.pattern_cache),
+            "capacity": self.pattern_cache_capacity,
+        }
 
-        tmp.sort(key=cmp_to_key(compare_actions))
+    def SortUnique(self, seq: List[str]) -> List[str]:
+        # Deduplicate first, then sort by the cached per-action key
+        tmp = list(dict.fromkeys(seq))
+        tmp.sort(key=self.ActionSortKey)
         return tmp
 
-    def FindSolos(self, hand_cards: List[Card]) -> List[str]:
-        result: List[str] = []
-        counts = self.CountRanks(hand_cards)
-        for r, c in counts.items():
-            if c >= 1:
-                result.append(r)
-        return self.SortUnique(result)
+    # --- Pattern finders over a 15-slot rank-count vector (see RankCounts) ---
 
-    def FindPairs(self, hand_cards: List[Card]) -> List[str]:
+    def FindSolosFromCounts(self, counts: List[int]) -> List[str]:
         result: List[str] = []
-        counts = self.CountRanks(hand_cards)
-        for r, c in counts.items():
-            if c >= 2 and r != "B" and r != "R":
-                result.append(r + r)
+        for v in range(0, NUM_RANKS):
+            if counts[v] >= 1:
+                result.append(self.RANK_ORDER[v])
         return self.SortUnique(result)
 
-    def FindTrios(self, hand_cards: List[Card]) -> List[str]:
+    def FindPairsFromCounts(self, counts: List[int]) -> List[str]:
         result: List[str] = []
-        counts = self.CountRanks(hand_cards)
-        for r, c in counts.items():
-            if c >= 3 and r != "B" and r != "R":
-                result.append(r + r + r)
+        for v in range(0, BLACK_JOKER):
+            if counts[v] >= 2:
+                result.append(self.RANK_ORDER[v] * 2)
         return self.SortUnique(result)
 
-    def FindTrioWithSingle(self, hand_cards: List[Card]) -> List[str]:
+    def FindTriosFromCounts(self, counts: List[int]) -> List[str]:
         result: List[str] = []
-        counts = self.CountRanks(hand_cards)
-
-        for r, c in counts.items():
-            if c >= 3 and r != "B" and r != "R":
-                # build remaining counts after taking trio rrr
-                remain = self.CloneCounts(counts)
-                remain[r] = remain.get(r, 0) - 3
-
-                # singles cannot be same rank as trio, and cannot be empty
-                for s_rank, s_cnt in remain.items():
-                    if s_cnt >= 1 and s_rank != r:
-                        result.append(r + r + r + s_rank)
+        for v in range(0, BLACK_JOKER):
+            if counts[v] >= 3:
+                result.append(self.RANK_ORDER[v] * 3)
         return self.SortUnique(result)
 
-    def FindTrioWithPair(self, hand_cards: List[Card]) -> List[str]:
+    def FindTrioWithSingleFromCounts(self, counts: List[int]) -> List[str]:
         result: List[str] = []
-        counts = self.CountRanks(hand_cards)
-
-        for r, c in counts.items():
-            if c >= 3 and r != "B" and r != "R":
-                remain = self.CloneCounts(counts)
-                remain[r] = remain.get(r, 0) - 3
-                for p_rank, p_cnt in remain.items():
-                    if (p_cnt >= 2) and (p_rank != "B") and (p_rank != "R") and (p_rank != r):
-                        result.append(r + r + r + p_rank + p_rank)
+        for v in range(0, BLACK_JOKER):
+            if counts[v] >= 3:
+                trio = self.RANK_ORDER[v] * 3
+                # singles cannot be same rank as trio
+                for s in range(0, NUM_RANKS):
+                    if (s != v) and (counts[s] >= 1):
+                        result.append(trio + self.RANK_ORDER[s])
         return self.SortUnique(result)
 
-    def FindStraights(self, hand_cards: List[Card]) -> List[str]:
+    def FindTrioWithPairFromCounts(self, counts: List[int]) -> List[str]:
         result: List[str] = []
-        counts = self.CountRanks(hand_cards)
-
-        # collect ranks eligible for straight (>=1, 3..A)
-        elig: List[str] = []
-        for r, c in counts.items():
-            if (c >= 1) and self.IsRankInStraightRange(r):
-                elig.append(r)
-        elig = self.SortRanks(elig)  # ascending by RANK_TO_VAL
-
-        # find all consecutive windows of length >= 5
-        i = 0
-        while i < len(elig):
-            j = i
-            while (j + 1 < len(elig)) and (self.RANK_TO_VAL[elig[j+1]] == self.RANK_TO_VAL[elig[j]] + 1):
-                j = j + 1
-            # elig[i..j] is a consecutive block
-            block_len = j - i + 1
-            if block_len >= 5:
-                # output all sub-windows of length >= 5
-                for L in range(5, block_len + 1):
-                    for start in range(i, j - L + 2):
-                        s = ""
-                        for t in range(start, start + L):
-                            s = s + elig[t]
-                        result.append(s)
-            i = j + 1
-
+        for v in range(0, BLACK_JOKER):
+            if counts[v] >= 3:
+                trio = self.RANK_ORDER[v] * 3
+                for p in range(0, BLACK_JOKER):
+                    if (p != v) and (counts[p] >= 2):
+                        result.append(trio + self.RANK_ORDER[p] * 2)
         return self.SortUnique(result)
 
-    def FindPairChains(self, hand_cards: List[Card]) -> List[str]:
+    def FindChainsFromCounts(self, counts: List[int], width: int, min_len: int) -> List[str]:
+        # all consecutive windows (in 3..A) of ranks holding >= width cards, each rank repeated width times
         result: List[str] = []
-        counts = self.CountRanks(hand_cards)
-
-        # eligible ranks: count>=2 and in straight range
-        elig: List[str] = []
-        for r, c in counts.items():
-            if (c >= 2) and self.IsRankInStraightRange(r):
-                elig.append(r)
-        elig = self.SortRanks(elig)
-
-        # consecutive blocks, each contributes 2 of that rank
-        i = 0
-        while i < len(elig):
-            j = i
-            while (j + 1 < len(elig)) and (self.RANK_TO_VAL[elig[j+1]] == self.RANK_TO_VAL[elig[j]] + 1):
-                j = j + 1
-            block_len = j - i + 1
-            if block_len >= 3:
-                # sub-windows length >=3
-                for L in range(3, block_len + 1):
-                    for start in range(i, j - L + 2):
-                        s = ""
-                        for t in range(start, start + L):
-                            s = s + elig[t] + elig[t]
-                        result.append(s)
-            i = j + 1
-
+        for start, L in self.ConsecutiveWindows(counts, width, min_len):
+            s = ""
+            for v in range(start, start + L):
+                s = s + self.RANK_ORDER[v] * width
+            result.append(s)
         return self.SortUnique(result)
 
-    def FindAirplanes(self, hand_cards: List[Card]) -> List[str]:
-        result: List[str] = []
-        counts = self.CountRanks(hand_cards)
-
-        # eligible ranks: count>=3 and in straight range
-        elig: List[str] = []
-        for r, c in counts.items():
-            if (c >= 3) and self.IsRankInStraightRange(r):
-                elig.append(r)
-        elig = self.SortRanks(elig)
-
-        # find consecutive blocks of length >=2
-        i = 0
-        while i < len(elig):
-            j = i
-            while (j + 1 < len(elig)) and (self.RANK_TO_VAL[elig[j+1]] == self.RANK_TO_VAL[elig[j]] + 1):
-                j = j + 1
-            block_len = j - i + 1
-            if block_len >= 2:
-                for L in range(2, block_len + 1):
-                    for start in range(i, j - L + 2):
-                        s = ""
-                        for t in range(start, start + L):
-                            s = s + elig[t] + elig[t] + elig[t]
-                        result.append(s)
-            i = j + 1
+    def FindStraightsFromCounts(self, counts: List[int]) -> List[str]:
+        return self.FindChainsFromCounts(counts, 1, 5)
 
-        return self.SortUnique(result)
+    def FindPairChainsFromCounts(self, counts: List[int]) -> List[str]:
+        return self.FindChainsFromCounts(counts, 2, 3)
 
-    def FindAirplanesWithAttachments(self, hand_cards: List[Card]) -> List[str]:
+    def FindAirplanesFromCounts(self, counts: List[int]) -> List[str]:
+        return self.FindChainsFromCounts(counts, 3, 2)
+
+    def FindAirplanesWithAttachmentsFromCounts(self, counts: List[int], attach_type: Optional[str] = None) -> List[str]:
+        # attach_type: "single" / "pair" to build only one wing type, None for both
         result: List[str] = []
-        counts = self.CountRanks(hand_cards)
 
         # 先找所有飞机核心
-        cores = self.FindAirplaneCores(counts)  # list of core_ranks (ascending) each
-
-        for core_ranks in cores:
-            k = len(core_ranks)
+        for start, k in self.ConsecutiveWindows(counts, 3, 2):
+            core_ranks = self.RANK_ORDER[start:start + k]
             # 构造核心牌串
             core_str = self.RepeatRanks(core_ranks, 3)
-            # 剩余牌计数
-            remain = self.SubCounts(counts, self.MakeUseMap(core_ranks, 3))
 
             # --- 带单牌：需要 k 个单牌 ---
-            single_slots = k
-            single_candidates = self.ListSingleRanksFromCounts(remain)  # ranks repeated by multiplicity
-            # 组合从 single_candidates 中选 k 个不同“实例”（允许同点数多张，只要剩余中有多张）
-            for pick in self.CombinationsByIndex(single_candidates, single_slots):
-                # 构造附件计数
-                attach_cnt: Dict[str, int] = {}
-                for idx in pick:
-                    r = single_candidates[idx]
-                    attach_cnt[r] = attach_cnt.get(r, 0) + 1
-
+            # 核心点数再带一张必成炸弹，同点数带四张也是炸弹 → 直接不枚举
+            single_caps: List[Tuple[str, int]] = []
+            for v in range(0, NUM_RANKS):
+                if attach_type == "pair":
+                    break
+                if (counts[v] >= 1) and not (start <= v < start + k):
+                    single_caps.append((self.RANK_ORDER[v], min(counts[v], 3)))
+            for attach_cnt in self.CombinationsOfCounts(single_caps, k):
                 # 校验：不允许双王
                 if (attach_cnt.get("B", 0) == 1) and (attach_cnt.get("R", 0) == 1):
                     continue
@@ -675,15 +466,18 @@ class ActionGenerator:
                 attach_str = self.StringFromCounts(attach_cnt)
                 result.append(core_str + attach_str)
 
-            # --- 带对子：需要 k 个对子 ---
-            pair_slots = k
-            pair_candidates = self.ListPairRanksFromCounts(remain)  # rank appears floor(count/2) times
-            for pick in self.CombinationsByIndex(pair_candidates, pair_slots):
-                # 构造附件计数（每个被选中的索引贡献2张）
+            # --- 带对子：需要 k 个不同点数的对子（同点数两对即炸弹） ---
+            pair_caps: List[Tuple[str, int]] = []
+            for v in range(0, BLACK_JOKER):
+                if attach_type == "single":
+                    break
+                if (counts[v] >= 2) and not (start <= v < start + k):
+                    pair_caps.append((self.RANK_ORDER[v], 1))
+            for pick in self.CombinationsOfCounts(pair_caps, k):
+                # 构造附件计数（每个被选中的点数贡献2张）
                 attach_cnt: Dict[str, int] = {}
-                for idx in pick:
-                    r = pair_candidates[idx]
-                    attach_cnt[r] = attach_cnt.get(r, 0) + 2
+                for r in pick:
+                    attach_cnt[r] = 2
 
                 # 校验：最终无炸弹 && 不从大飞机拆出小飞机（边缘检查）
                 if not self.IsValidAirplaneAttachmentCounts(core_ranks, attach_cnt, "pair"):
@@ -694,245 +488,291 @@ class ActionGenerator:
 
         return self.SortUnique(result)
 
-    def FindFourWithTwo(self, hand_cards: List[Card]) -> List[str]:
+    def FindFourWithTwoFromCounts(self, counts: List[int], attach_type: Optional[str] = None) -> List[str]:
+        # attach_type: "single" / "pair" to build only one attachment type, None for both
         result: List[str] = []
-        counts = self.CountRanks(hand_cards)
 
-        for r, c in counts.items():
-            if c >= 4:
+        for v in range(0, BLACK_JOKER):
+            if counts[v] >= 4:
                 # take four r as core
-                core_str = r + r + r + r
-                remain = self.CloneCounts(counts)
-                remain[r] = remain.get(r, 0) - 4
-
-                # --- two singles (distinct ranks; cannot be BR as rocket) ---
-                singles = self.ListSingleRanksFromCounts(remain)
-                for pick in self.CombinationsByIndex(singles, 2):
-                    rank1 = singles[pick[0]]
-                    rank2 = singles[pick[1]]
-                    if ((rank1 == "B" and rank2 == "R") or (rank1 == "R" and rank2 == "B")):
+                core_str = self.RANK_ORDER[v] * 4
+
+                # --- two singles (same rank allowed; cannot be BR as rocket) ---
+                single_caps: List[Tuple[str, int]] = []
+                for s in range(0, NUM_RANKS):
+                    if (s != v) and (counts[s] >= 1) and (attach_type != "pair"):
+                        single_caps.append((self.RANK_ORDER[s], min(counts[s], 2)))
+                for pick in self.CombinationsOfCounts(single_caps, 2):
+                    if ("B" in pick) and ("R" in pick):
                         continue  # 不允许附件组成火箭
-                    s = core_str + rank1 + rank2
-                    result.append(s)
-
-                # --- two pairs (distinct or same rank? 必须是两对 → 两个不同点数的对子) ---
-                pairs = self.ListPairRanksFromCounts(remain)
-                for pick in self.CombinationsByIndex(pairs, 2):
-                    rankA = pairs[pick[0]]
-                    rankB = pairs[pick[1]]
-                    if rankA == rankB:
-                        continue
-                    # jokers不会形成对子；
-                    s = core_str + rankA + rankA + rankB + rankB
+                    result.append(core_str + self.StringFromCounts(pick))
+
+                # --- two pairs (必须是两对 → 两个不同点数的对子; jokers不会形成对子) ---
+                pair_caps: List[Tuple[str, int]] = []
+                for p in range(0, BLACK_JOKER):
+                    if (p != v) and (counts[p] >= 2) and (attach_type != "single"):
+                        pair_caps.append((self.RANK_ORDER[p], 1))
+                for pick in self.CombinationsOfCounts(pair_caps, 2):
+                    s = core_str
+                    for p_rank in self.SortRanks(list(pick.keys())):
+                        s = s + p_rank + p_rank
                     result.append(s)
 
         return self.SortUnique(result)
 
-    def FindBombs(self, hand_cards: List[Card]) -> List[str]:
+    def FindBombsFromCounts(self, counts: List[int]) -> List[str]:
         result: List[str] = []
-        counts = self.CountRanks(hand_cards)
-        for r, c in counts.items():
-            if c >= 4 and r != "B" and r != "R":
-                result.append(r + r + r + r)
-        return self.SortUnique(result)
+        fours = Bitboard.PresenceAtLeast(RankCounts.Pack(counts), 4) & PLAIN_GUARDS
+        for v in Bitboard.GuardRanks(fours):
+            result.append(self.RANK_ORDER[v] * 4)
+        return result
 
-    def FilterHigherBombs(self, hand_cards: List[Card], last_bomb_value: int) -> List[str]:
-        bombs = self.FindBombs(hand_cards)
+    def FilterHigherBombsFromCounts(self, counts: List[int], last_bomb_value: int) -> List[str]:
         out: List[str] = []
-        for b in bombs:
-            r = b[0]
-            if self.RANK_TO_VAL[r] > last_bomb_value:
+        for b in self.FindBombsFromCounts(counts):
+            if self.RANK_TO_VAL[b[0]] > last_bomb_value:
                 out.append(b)
-        return self.SortUnique(out)
+        return out
 
-    def HasRocket(self, hand_cards: List[Card]) -> bool:
-        counts = self.CountRanks(hand_cards)
-        return (counts.get("B", 0) >= 1) and (counts.get("R", 0) >= 1)
+    def HasRocketFromCounts(self, counts: List[int]) -> bool:
+        return (counts[BLACK_JOKER] >= 1) and (counts[RED_JOKER] >= 1)
 
-    def FindSamePatternStronger(self, hand_cards: List[Card], last_info: Dict) -> List[str]:
+    def FindSamePatternStrongerFromCounts(self, counts: List[int], last_info: Dict) -> List[str]:
         out: List[str] = []
-
         kind = last_info["kind"]
 
         if kind == "solo":
-            candidates = self.FindSolos(hand_cards)
-            for s in candidates:
-                val = self.RANK_TO_VAL[s[0]]
-                if val > last_info["main_value"]:
-                    out.append(s)
-
+            candidates = self.FindSolosFromCounts(counts)
         elif kind == "pair":
-            candidates = self.FindPairs(hand_cards)
-            for s in candidates:
-                val = self.RANK_TO_VAL[s[0]]
-                if val > last_info["main_value"]:
-                    out.append(s)
-
+            candidates = self.FindPairsFromCounts(counts)
         elif kind == "trio":
-            candidates = self.FindTrios(hand_cards)
-            for s in candidates:
-                trio_rank = s[0]
-                if self.RANK_TO_VAL[trio_rank] > last_info["main_value"]:
-                    out.append(s)
-
+            candidates = self.FindTriosFromCounts(counts)
         elif kind == "trio_single":
-            candidates = self.FindTrioWithSingle(hand_cards)
-            for s in candidates:
-                info = self.IdentifyPatternFromString(s)
-                if (info["kind"] == "trio_single") and (info.get("core_count", 0) == last_info.get("core_count", 0)) and (info["main_value"] > last_info["main_value"]):
-                    out.append(s)
-
+            candidates = self.FindTrioWithSingleFromCounts(counts)
         elif kind == "trio_pair":
-            candidates = self.FindTrioWithPair(hand_cards)
-            for s in candidates:
-                info = self.IdentifyPatternFromString(s)
-                if (info["kind"] == "trio_pair") and (info.get("core_count", 0) == last_info.get("core_count", 0)) and (info["main_value"] > last_info["main_value"]):
-                    out.append(s)
-
+            candidates = self.FindTrioWithPairFromCounts(counts)
         elif kind == "straight":
-            candidates = self.FindStraights(hand_cards)
-            for s in candidates:
-                info = self.IdentifyPatternFromString(s)
-                if (info["kind"] == "straight") and (info.get("length", 0) == last_info.get("length", 0)) and (info["main_value"] > last_info["main_value"]):
-                    out.append(s)
-
+            candidates = self.FindStraightsFromCounts(counts)
         elif kind == "pair_chain":
-            candidates = self.FindPairChains(hand_cards)
-            for s in candidates:
-                info = self.IdentifyPatternFromString(s)
-                if (info["kind"] == "pair_chain") and (info.get("pair_len", 0) == last_info.get("pair_len", 0)) and (info["main_value"] > last_info["main_value"]):
-                    out.append(s)
-
+            candidates = self.FindPairChainsFromCounts(counts)
         elif kind == "airplane":
-            candidates = self.FindAirplanes(hand_cards)
-            for s in candidates:
-                info = self.IdentifyPatternFromString(s)
-                if (info["kind"] == "airplane") and (info.get("trio_len", 0) == last_info.get("trio_len", 0)) and (info["main_value"] > last_info["main_value"]):
-                    out.append(s)
-
-        elif kind == "airplane_single":
-            candidates = self.FindAirplanesWithAttachments(hand_cards)
-            for s in candidates:
-                info = self.IdentifyPatternFromString(s)
-                if (info["kind"] == "airplane_single") and (info.get("trio_len", 0) == last_info.get("trio_len", 0)) and (info["main_value"] > last_info["main_value"]):
-                    out.append(s)
-
-        elif kind == "airplane_pair":
-            candidates = self.FindAirplanesWithAttachments(hand_cards)
-            for s in candidates:
-                info = self.IdentifyPatternFromString(s)
-                if (info["kind"] == "airplane_pair") and (info.get("trio_len", 0) == last_info.get("trio_len", 0)) and (info["main_value"] > last_info["main_value"]):
-                    out.append(s)
-
-        elif kind == "four_two_single":
-            candidates = self.FindFourWithTwo(hand_cards)   # both forms returned; filter in identify
-            for s in candidates:
-                info = self.IdentifyPatternFromString(s)
-                if (info["kind"] == "four_two_single") and (info["main_value"] > last_info["main_value"]):
-                    out.append(s)
-
-        elif kind == "four_two_pair":
-            candidates = self.FindFourWithTwo(hand_cards)
-            for s in candidates:
-                info = self.IdentifyPatternFromString(s)
-                if (info["kind"] == "four_two_pair") and (info["main_value"] > last_info["main_value"]):
-                    out.append(s)
-
+            candidates = self.FindAirplanesFromCounts(counts)
+        elif (kind == "airplane_single") or (kind == "airplane_pair"):
+            candidates = self.FindAirplanesWithAttachmentsFromCounts(counts)
+        elif (kind == "four_two_single") or (kind == "four_two_pair"):
+            candidates = self.FindFourWithTwoFromCounts(counts)   # both forms returned; filter by identify
         else:
             # "bomb" handled outside; default do nothing
-            pass
+            candidates = []
+
+        # same kind, same size (length / pair_len / trio_len / core_count) and higher main value
+        for s in candidates:
+            info = self.GetPatternInfo(s)
+            if info["kind"] != kind:
+                continue
+            if (info.get("core_count", 0) != last_info.get("core_count", 0)) or (info.get("length", 0) != last_info.get("length", 0)) or (info.get("pair_len", 0) != last_info.get("pair_len", 0)) or (info.get("trio_len", 0) != last_info.get("trio_len", 0)):
+                continue
+            if info["main_value"] > last_info["main_value"]:
+                out.append(s)
 
         return self.SortUnique(out)
 
-    def GenerateAllPatterns(self, hand_cards: List[Card]) -> List[str]:
+    def PatternFamilies(self) -> List[Tuple[str, Callable[[List[int]], List[str]]]]:
+        # Free-play pattern families in generation order: (kind, finder over a count vector)
+        return [
+            ("solo", self.FindSolosFromCounts),
+            ("pair", self.FindPairsFromCounts),
+            ("trio", self.FindTriosFromCounts),
+            ("trio_single", self.FindTrioWithSingleFromCounts),
+            ("trio_pair", self.FindTrioWithPairFromCounts),
+            ("straight", self.FindStraightsFromCounts),
+            ("pair_chain", self.FindPairChainsFromCounts),
+            ("airplane", self.FindAirplanesFromCounts),
+            ("airplane_single", lambda counts: self.FindAirplanesWithAttachmentsFromCounts(counts, "single")),
+            ("airplane_pair", lambda counts: self.FindAirplanesWithAttachmentsFromCounts(counts, "pair")),
+            ("four_two_single", lambda counts: self.FindFourWithTwoFromCounts(counts, "single")),
+            ("four_two_pair", lambda counts: self.FindFourWithTwoFromCounts(counts, "pair")),
+            ("bomb", self.FindBombsFromCounts),
+            ("rocket", lambda counts: ["BR"] if self.HasRocketFromCounts(counts) else []),
+        ]
+
+    def GenerateAllPatternsFromCounts(self, counts: List[int]) -> List[str]:
         result: List[str] = []
+        for _, finder in self.PatternFamilies():
+            result.extend(finder(counts))
+        return self.SortUnique(result)
 
-        solos = self.FindSolos(hand_cards)
-        for s in solos: result.append(s)
+    # --- Card-list adapters ---
 
-        pairs = self.FindPairs(hand_cards)
-        for s in pairs: result.append(s)
+    def FindSolos(self, hand_cards: List[Card]) -> List[str]:
+        return self.FindSolosFromCounts(self.CountVector(hand_cards))
 
-        trios = self.FindTrios(hand_cards)
-        for s in trios: result.append(s)
+    def FindPairs(self, hand_cards: List[Card]) -> List[str]:
+        return self.FindPairsFromCounts(self.CountVector(hand_cards))
 
-        trio_single = self.FindTrioWithSingle(hand_cards)
-        for s in trio_single: result.append(s)
+    def FindTrios(self, hand_cards: List[Card]) -> List[str]:
+        return self.FindTriosFromCounts(self.CountVector(hand_cards))
 
-        trio_pair = self.FindTrioWithPair(hand_cards)
-        for s in trio_pair: result.append(s)
+    def FindTrioWithSingle(self, hand_cards: List[Card]) -> List[str]:
+        return self.FindTrioWithSingleFromCounts(self.CountVector(hand_cards))
 
-        straights = self.FindStraights(hand_cards)
-        for s in straights: result.append(s)
+    def FindTrioWithPair(self, hand_cards: List[Card]) -> List[str]:
+        return self.FindTrioWithPairFromCounts(self.CountVector(hand_cards))
 
-        pair_chains = self.FindPairChains(hand_cards)
-        for s in pair_chains: result.append(s)
+    def FindStraights(self, hand_cards: List[Card]) -> List[str]:
+        return self.FindStraightsFromCounts(self.CountVector(hand_cards))
+
+    def FindPairChains(self, hand_cards: List[Card]) -> List[str]:
+        return self.FindPairChainsFromCounts(self.CountVector(hand_cards))
+
+    def FindAirplanes(self, hand_cards: List[Card]) -> List[str]:
+        return self.FindAirplanesFromCounts(self.CountVector(hand_cards))
 
-        airplanes = self.FindAirplanes(hand_cards)
-        for s in airplanes: result.append(s)
+    def FindAirplanesWithAttachments(self, hand_cards: List[Card]) -> List[str]:
+        return self.FindAirplanesWithAttachmentsFromCounts(self.CountVector(hand_cards))
 
-        airplane_wings = self.FindAirplanesWithAttachments(hand_cards)
-        for s in airplane_wings: result.append(s)
+    def FindFourWithTwo(self, hand_cards: List[Card]) -> List[str]:
+        return self.FindFourWithTwoFromCounts(self.CountVector(hand_cards))
 
-        four_two = self.FindFourWithTwo(hand_cards)
-        for s in four_two: result.append(s)
+    def FindBombs(self, hand_cards: List[Card]) -> List[str]:
+        return self.FindBombsFromCounts(self.CountVector(hand_cards))
 
-        bombs = self.FindBombs(hand_cards)
-        for s in bombs: result.append(s)
+    def FilterHigherBombs(self, hand_cards: List[Card], last_bomb_value: int) -> List[str]:
+        return self.FilterHigherBombsFromCounts(self.CountVector(hand_cards), last_bomb_value)
 
-        if self.HasRocket(hand_cards):
-            result.append("BR")
+    def HasRocket(self, hand_cards: List[Card]) -> bool:
+        return self.HasRocketFromCounts(self.CountVector(hand_cards))
 
-        return self.SortUnique(result)
+    def FindSamePatternStronger(self, hand_cards: List[Card], last_info: Dict) -> List[str]:
+        return self.FindSamePatternStrongerFromCounts(self.CountVector(hand_cards), last_info)
 
-    def GetLegalActions(self, player, round_context) -> List[str]:
-        actions: List[str] = []
-        hand_cards = player.GetHand()
+    def GenerateAllPatterns(self, hand_cards: List[Card]) -> List[str]:
+        return self.GenerateAllPatternsFromCounts(self.CountVector(hand_cards))
 
-        # Retrieve last non-pass play
+    # --- Legal actions ---
+
+    def GetLegalActions(self, player, round_context) -> List[str]:
+        # Retrieve last non-pass play; our own last play means a free play
         last = round_context.GetLastValidPlay()  # (player_id, action_str) or null
+        last_info = None
+        if (last is not None) and (last[0] != player.GetId()):
+            last_info = self.GetPatternInfo(last[1])
+
+        # Table engine with a live per-player index: no enumeration at all
+        index = player.GetActionIndex()
+        if (self.action_space is not None) and (index is not None) and (index.space is self.action_space):
+            if last_info is None:
+                return index.GetLegalActions(None)
+            last_id = self.action_space.action_to_id.get(last[1])
+            if last_id is not None:
+                return index.GetLegalActions(last_id)
+
+        # The hand is turned into a count vector once per turn and shared by every finder
+        return self.GetLegalActionsFromCounts(player.GetRankCounts(), last_info)
+
+    def GetLegalActionIds(self, player, round_context) -> List[int]:
+        # GetLegalActions as ids of the round's action space, in the same (sorted) order
+        space = round_context.GetActionSpace()
+        index = player.GetActionIndex()
+        if (space is self.action_space) and (index is not None) and (index.space is space):
+            last = round_context.GetLastValidPlayId()
+            if (last is None) or (last[0] == player.GetId()):
+                return index.GetLegalActionIds(None)
+            return index.GetLegalActionIds(last[1])
+        return [space.action_to_id[a] for a in self.GetLegalActions(player, round_context)]
+
+    def IterLegalActions(self, player, round_context, kinds=None, min_length: int = 0, max_main_value: Optional[int] = None) -> Iterator[str]:
+        # Streaming variant of GetLegalActions; see IterLegalActionsFromCounts
+        last = round_context.GetLastValidPlay()
+        last_info = None
+        if (last is not None) and (last[0] != player.GetId()):
+            last_info = self.GetPatternInfo(last[1])
+        return self.IterLegalActionsFromCounts(player.GetRankCounts(), last_info, kinds, min_length, max_main_value)
+
+    def IterLegalActionsFromCounts(self, counts: List[int], last_info, kinds=None, min_length: int = 0, max_main_value: Optional[int] = None) -> Iterator[str]:
+        # Yields legal actions one pattern family at a time, so a consumer that stops early
+        # never pays for the families it did not reach. Order: "pass" (when following), then
+        # the families of PatternFamilies() (following: the stronger same-pattern plays,
+        # bombs, rocket); each family ascending like GetLegalActions. Families outside
+        # `kinds` are never generated. min_length counts cards ("pass" has none);
+        # max_main_value caps the identified main value (the rocket's is 999).
+        def wanted(kind: str) -> bool:
+            return (kinds is None) or (kind in kinds)
+
+        def keep(action_str: str) -> bool:
+            if len(action_str) < min_length:
+                return False
+            if (max_main_value is not None) and (self.GetPatternInfo(action_str)["main_value"] > max_main_value):
+                return False
+            return True
 
-        if (last is None) or (last[0] == player.GetId()):
-            # Free play: generate everything
-            all_patterns = self.GenerateAllPatterns(hand_cards)
-            for s in all_patterns:
-                actions.append(s)
-            return self.SortUnique(actions)
+        following = last_info is not None
+        if following and wanted("pass") and (min_length <= 0):
+            yield "pass"
+
+        if (not following) or (last_info["kind"] == "invalid"):
+            for kind, finder in self.PatternFamilies():
+                if not wanted(kind):
+                    continue
+                for action_str in finder(counts):
+                    if keep(action_str):
+                        yield action_str
+            return
+
+        kind = last_info["kind"]
+        if kind == "rocket":
+            return
+
+        if (kind != "bomb") and wanted(kind):
+            for action_str in self.FindSamePatternStrongerFromCounts(counts, last_info):
+                if keep(action_str):
+                    yield action_str
+
+        if wanted("bomb"):
+            if kind != "bomb":
+                bombs = self.FindBombsFromCounts(counts)
+            else:
+                bombs = self.FilterHigherBombsFromCounts(counts, last_info["main_value"])
+            for action_str in bombs:
+                if keep(action_str):
+                    yield action_str
+
+        if wanted("rocket") and self.HasRocketFromCounts(counts) and keep("BR"):
+            yield "BR"
+
+    def GetLegalActionsFromCounts(self, counts: List[int], last_info) -> List[str]:
+        # last_info: identified last non-pass play of another player, or None for a free play
+        if self.action_space is not None:
+            # Table engine: subset-test the precomputed actions against the hand counts
+            return self.action_space.GetLegalActions(RankCounts.Pack(counts), last_info)
+
+        if last_info is None:
+            # Free play: generate everything (already deduplicated and sorted)
+            return self.GenerateAllPatternsFromCounts(counts)
 
         # Follow case
-        actions.append("pass")
-        last_str = last[1]
-        last_info = self.IdentifyPatternFromString(last_str)
+        actions: List[str] = ["pass"]
 
         # If last was invalid (shouldn't happen), treat as free play (minus duplication)
         if last_info["kind"] == "invalid":
-            all_patterns = self.GenerateAllPatterns(hand_cards)
-            for s in all_patterns:
-                actions.append(s)
+            actions.extend(self.GenerateAllPatternsFromCounts(counts))
             return self.SortUnique(actions)
 
         # If last was rocket, nothing can beat it; only "pass"
         if last_info["kind"] == "rocket":
-            return self.SortUnique(actions)
+            return actions
 
         # 1) Same pattern but stronger (same size & type)
-        stronger = self.FindSamePatternStronger(hand_cards, last_info)
-        for s in stronger:
-            actions.append(s)
+        actions.extend(self.FindSamePatternStrongerFromCounts(counts, last_info))
 
-        # 2) Any bomb beats non-bomb
+        # 2) Any bomb beats non-bomb; a bomb only by a higher bomb
         if last_info["kind"] != "bomb":
-            bombs = self.FindBombs(hand_cards)
-            for b in bombs:
-                actions.append(b)
+            actions.extend(self.FindBombsFromCounts(counts))
         else:
-            # last is bomb → only higher bomb allowed
-            higher_bombs = self.FilterHigherBombs(hand_cards, last_info["main_value"])
-            for b in higher_bombs:
-                actions.append(b)
+            actions.extend(self.FilterHigherBombsFromCounts(counts, last_info["main_value"]))
 
         # 3) Rocket always allowed if present
-        if self.HasRocket(hand_cards):
+        if self.HasRocketFromCounts(counts):
             actions.append("BR")
 
         return self.SortUnique(actions)
@@ -0,0 +1,399 @@
+from typing import List, Dict, Tuple, Optional
+from bisect import bisect_right
+from rank_counts import RankCounts, RANK_ORDER, RANK_TO_VAL, NUM_RANKS
+from action_generator import ActionGenerator
+
+# Cards a single hand can ever hold (landlord: 17 + 3 seen cards)
+MAX_ACTION_CARDS = 20
+
+# Which IdentifyPatternFromString field carries the "same size" requirement per kind
+SIZE_FIELD = {
+    "trio": "core_count",
+    "trio_single": "core_count",
+    "trio_pair": "core_count",
+    "straight": "length",
+    "pair_chain": "pair_len",
+    "airplane": "trio_len",
+    "airplane_single": "trio_len",
+    "airplane_pair": "trio_len",
+}
+
+
+class ActionSpace:
+    # The action space depends only on the rules, so one table is shared process-wide
+    _shared: Optional['ActionSpace'] = None
+
+    def __init__(self):
+        # Parallel per-action tables, indexed by action id. Id 0 is always "pass".
+        # Ids follow the generator's output order, so sorting ids sorts actions.
+        self.actions: List[str] = []
+        self.packed: List[int] = []
+        self.kinds: List[str] = []
+        self.main_values: List[int] = []
+        self.sizes: List[int] = []
+        self.ranks_of: List[List[int]] = []     # rank values an action uses
+        self.action_to_id: Dict[str, int] = {}
+        # Every action is a distinct rank multiset, so the packed counts are a second key
+        self.packed_to_id: Dict[int, int] = {}
+
+        # Actions grouped by (kind, size, main_value). Each group carries the slot-wise
+        # minimum of its members' counts, so one subset test can skip the whole group.
+        # group = (kind, size, main_value, core_packed, member_ids)
+        self.groups: List[Tuple[str, int, int, int, List[int]]] = []
+        # (kind, size) -> groups of that shape, ascending by main_value
+        self.groups_by_shape: Dict[Tuple[str, int], List[Tuple[str, int, int, int, List[int]]]] = {}
+        self.bomb_ids: List[int] = []
+        self.rocket_id: int = -1
+
+        # Beats index. shape_ids[(kind, size)] lists the ids of one identified shape sorted by
+        # main value; whatever beats an action within its shape is the suffix starting at
+        # beats_start[action_id]. Bombs and the rocket are appended by GetBeatingIds.
+        self.shape_ids: Dict[Tuple[str, int], List[int]] = {}
+        self.beats_start: List[int] = []
+
+    @staticmethod
+    def PatternSize(info: Dict) -> int:
+        field = SIZE_FIELD.get(info["kind"])
+        if field is None:
+            return 0
+        return info.get(field, 0)
+
+    @staticmethod
+    def EnumerateCandidates(action_generator) -> List[Tuple[str, str, int, int]]:
+        # Every action the pattern finders can produce for some hand of <= 20 cards,
+        # written exactly as the finders write it. Entries: (action_str, kind, size, main_value)
+        ag = action_generator
+        out: List[Tuple[str, str, int, int]] = []
+        plain = RANK_ORDER[0:13]          # "3".."2"
+        chain = RANK_ORDER[0:12]          # "3".."A"
+
+        for r in RANK_ORDER:
+            out.append((r, "solo", 0, RANK_TO_VAL[r]))
+        for r in plain:
+            out.append((r * 2, "pair", 0, RANK_TO_VAL[r]))
+            out.append((r * 3, "trio", 1, RANK_TO_VAL[r]))
+            out.append((r * 4, "bomb", 0, RANK_TO_VAL[r]))
+        out.append(("BR", "rocket", 0, 999))
+
+        for r in plain:
+            for s in RANK_ORDER:
+                if s != r:
+                    out.append((r * 3 + s, "trio_single", 1, RANK_TO_VAL[r]))
+            for p in plain:
+                if p != r:
+                    out.append((r * 3 + p * 2, "trio_pair", 1, RANK_TO_VAL[r]))
+
+        # Straights, pair chains and pure airplanes: consecutive windows inside 3..A
+        for kind, width, min_len in (("straight", 1, 5), ("pair_chain", 2, 3), ("airplane", 3, 2)):
+            for L in range(min_len, len(chain) + 1):
+                if L * width > MAX_ACTION_CARDS:
+                    break
+                for start in range(0, len(chain) - L + 1):
+                    ranks = chain[start:start + L]
+                    s = "".join([r * width for r in ranks])
+                    out.append((s, kind, L, RANK_TO_VAL[ranks[L - 1]]))
+
+        # Airplanes with wings: k consecutive trios + k singles / k pairs. A core rank
+        # cannot be attached (it would make a bomb), nor can four cards of one rank.
+        for k in range(2, len(chain) + 1):
+            if 4 * k > MAX_ACTION_CARDS:
+                break
+            for start in range(0, len(chain) - k + 1):
+                core_ranks = chain[start:start + k]
+                core_str = ag.RepeatRanks(core_ranks, 3)
+                main_value = RANK_TO_VAL[core_ranks[k - 1]]
+
+                single_caps = [(r, 1 if r in ("B", "R") else 3) for r in RANK_ORDER if r not in core_ranks]
+                for attach_cnt in ag.CombinationsOfCounts(single_caps, k):
+                    if not ag.IsValidAirplaneAttachmentCounts(core_ranks, attach_cnt, "single"):
+                        continue
+                    out.append((core_str + ag.StringFromCounts(attach_cnt), "airplane_single", k, main_value))
+
+                if 5 * k > MAX_ACTION_CARDS:
+                    continue
+                pair_caps = [(r, 1) for r in plain if r not in core_ranks]
+                for pick in ag.CombinationsOfCounts(pair_caps, k):
+                    attach_cnt = {r: 2 for r in pick}
+                    if not ag.IsValidAirplaneAttachmentCounts(core_ranks, attach_cnt, "pair"):
+                        continue
+                    out.append((core_str + ag.StringFromCounts(attach_cnt), "airplane_pair", k, main_value))
+
+        # Four with two singles (may repeat a rank, never the rocket) / two different pairs
+        for r in plain:
+            single_caps = [(x, 1 if x in ("B", "R") else 2) for x in RANK_ORDER if x != r]
+            for pick in ag.CombinationsOfCounts(single_caps, 2):
+                if ("B" in pick) and ("R" in pick):
+                    continue
+                out.append((r * 4 + ag.StringFromCounts(pick), "four_two_single", 0, RANK_TO_VAL[r]))
+            pair_caps = [(x, 1) for x in plain if x != r]
+            for pick in ag.CombinationsOfCounts(pair_caps, 2):
+                out.append((r * 4 + ag.StringFromCounts({x: 2 for x in pick}), "four_two_pair", 0, RANK_TO_VAL[r]))
+
+        return out
+
+    @classmethod
+    def NewActionSpace(cls, action_generator) -> 'ActionSpace':
+        space = cls()
+        ag = action_generator
+        candidates = ActionSpace.EnumerateCandidates(ag)
+
+        # Classify every candidate once with the generator's own rules. The table stores
+        # the identified pattern (that is what beats-checks compare against); the
+        # structural kind is only used for grouping.
+        rows = []
+        for action_str, kind, size, main_value in candidates:
+            (info, key) = ag.GetPatternEntry(action_str)
+            rows.append((key, action_str, info, kind, size, main_value))
+        rows.sort(key=lambda row: row[0])
+
+        space.actions.append("pass")
+        space.packed.append(0)
+        space.kinds.append("pass")
+        space.main_values.append(-1)
+        space.sizes.append(0)
+        space.ranks_of.append([])
+        space.action_to_id["pass"] = 0
+        space.packed_to_id[0] = 0
+
+        group_index: Dict[Tuple[str, int, int], List[int]] = {}
+        for _, action_str, info, kind, size, main_value in rows:
+            if action_str in space.action_to_id:
+                raise ValueError("duplicate action in action space: " + action_str)
+            action_id = len(space.actions)
+            space.actions.append(action_str)
+            space.packed.append(RankCounts.PackString(action_str))
+            space.kinds.append(info["kind"])
+            space.main_values.append(info["main_value"])
+            space.sizes.append(ActionSpace.PatternSize(info))
+            space.ranks_of.append(sorted(set([RANK_TO_VAL[ch] for ch in action_str])))
+            space.action_to_id[action_str] = action_id
+            if space.packed[action_id] in space.packed_to_id:
+                raise ValueError("two actions share one rank multiset: " + action_str)
+            space.packed_to_id[space.packed[action_id]] = action_id
+            group_index.setdefault((kind, size, main_value), []).append(action_id)
+            if kind == "bomb":
+                space.bomb_ids.append(action_id)
+            elif kind == "rocket":
+                space.rocket_id = action_id
+
+        for (kind, size, main_value), member_ids in group_index.items():
+            core = [min(slot) for slot in zip(*[RankCounts.Unpack(space.packed[i]) for i in member_ids])]
+            group = (kind, size, main_value, RankCounts.Pack(core), member_ids)
+            space.groups.append(group)
+            space.groups_by_shape.setdefault((kind, size), []).append(group)
+        for shape_groups in space.groups_by_shape.values():
+            shape_groups.sort(key=lambda g: g[2])
+        space.bomb_ids.sort(key=lambda i: space.main_values[i])
+        space.BuildBeatsIndex()
+        return space
+
+    def BuildBeatsIndex(self) -> None:
+        self.shape_ids = {}
+        for action_id in range(1, len(self.actions)):
+            if self.kinds[action_id] == "invalid":
+                continue
+            self.shape_ids.setdefault((self.kinds[action_id], self.sizes[action_id]), []).append(action_id)
+
+        self.beats_start = [0] * len(self.actions)
+        for shape, ids in self.shape_ids.items():
+            ids.sort(key=lambda i: (self.main_values[i], i))
+            mains = [self.main_values[i] for i in ids]
+            for action_id in ids:
+                self.beats_start[action_id] = bisect_right(mains, self.main_values[action_id])
+
+    @classmethod
+    def Shared(cls, action_generator: Optional[ActionGenerator] = None) -> 'ActionSpace':
+        if cls._shared is None:
+            if action_generator is None:
+                action_generator = ActionGenerator.NewActionGenerator()
+            cls._shared = cls.NewActionSpace(action_generator)
+        return cls._shared
+
+    def Size(self) -> int:
+        return len(self.actions)
+
+    # --- Codec: action id <-> action string / cards ---
+
+    def Encode(self, action_str: str) -> int:
+        # Id of an action string, or -1 if it is not a playable action. Strings written in a
+        # different card order than the table resolve through their rank multiset.
+        action_id = self.action_to_id.get(action_str)
+        if action_id is not None:
+            return action_id
+        for ch in action_str:
+            if ch not in RANK_TO_VAL:
+                return -1
+        return self.EncodePacked(RankCounts.PackString(action_str))
+
+    def EncodePacked(self, packed: int) -> int:
+        return self.packed_to_id.get(packed, -1)
+
+    def EncodeCards(self, cards) -> int:
+        # An empty card list is a pass
+        if not cards:
+            return 0
+        return self.Encode("".join([c.rank for c in cards]))
+
+    def Decode(self, action_id: int) -> str:
+        return self.actions[action_id]
+
+    def Beats(self, action_id: int, target_id: int) -> bool:
+        # Can action_id be played over the (identified, non-pass) play target_id?
+        kind = self.kinds[action_id]
+        target_kind = self.kinds[target_id]
+        if target_kind == "rocket":
+            return False
+        if kind == "rocket":
+            return True
+        if kind == "bomb":
+            return (target_kind != "bomb") or (self.main_values[action_id] > self.main_values[target_id])
+        return (kind == target_kind) and (self.sizes[action_id] == self.sizes[target_id]) and (self.main_values[action_id] > self.main_values[target_id])
+
+    def CountBeating(self, target_id: int) -> int:
+        # len(GetBeatingIds(target_id)) without building the list
+        kind = self.kinds[target_id]
+        if (kind == "pass") or (kind == "rocket"):
+            return 0
+        if kind == "invalid":
+            return len(self.actions) - 1
+        shape = self.shape_ids[(kind, self.sizes[target_id])]
+        n = len(shape) - self.beats_start[target_id] + 1
+        if kind != "bomb":
+            n = n + len(self.bomb_ids)
+        return n
+
+    def GetBeatingIds(self, target_id: int) -> List[int]:
+        # Every action that beats target_id, weakest first: same shape with a higher main
+        # value, then every bomb (higher ones only over a bomb), then the rocket. Nothing
+        # beats a pass; anything but a pass answers an "invalid" play, as in the legal-action
+        # rules (in id order).
+        kind = self.kinds[target_id]
+        if (kind == "pass") or (kind == "rocket"):
+            return []
+        if kind == "invalid":
+            return list(range(1, len(self.actions)))
+        shape = self.shape_ids[(kind, self.sizes[target_id])]
+        out = shape[self.beats_start[target_id]:]
+        if kind != "bomb":
+            out.extend(self.bomb_ids)
+        out.append(self.rocket_id)
+        return out
+
+    def CollectFitting(self, groups, hand_packed: int, out: List[int]) -> None:
+        fits = RankCounts.PackedFits
+        for group in groups:
+            if not fits(group[3], hand_packed):
+                continue
+            for action_id in group[4]:
+                if fits(self.packed[action_id], hand_packed):
+                    out.append(action_id)
+
+    def GetLegalActionIds(self, hand_packed: int, last_info: Optional[Dict]) -> List[int]:
+        # last_info is the identified last non-pass play, or None for a free play
+        ids: List[int] = []
+        if (last_info is None) or (last_info["kind"] == "invalid"):
+            if last_info is not None:
+                ids.append(0)
+            self.CollectFitting(self.groups, hand_packed, ids)
+            ids.sort()
+            return ids
+
+        ids.append(0)
+        kind = last_info["kind"]
+        if kind == "rocket":
+            return ids
+
+        # 1) Same kind and size, higher main value
+        if kind != "bomb":
+            shape_groups = self.groups_by_shape.get((kind, ActionSpace.PatternSize(last_info)), [])
+            stronger = [g for g in shape_groups if g[2] > last_info["main_value"]]
+            self.CollectFitting(stronger, hand_packed, ids)
+
+        # 2) Bombs (only higher ones over a bomb) and 3) the rocket
+        for action_id in self.bomb_ids:
+            if kind == "bomb" and self.main_values[action_id] <= last_info["main_value"]:
+                continue
+            if RankCounts.PackedFits(self.packed[action_id], hand_packed):
+                ids.append(action_id)
+        if RankCounts.PackedFits(self.packed[self.rocket_id], hand_packed):
+            ids.append(self.rocket_id)
+
+        ids.sort()
+        return ids
+
+    def GetLegalActions(self, hand_packed: int, last_info: Optional[Dict]) -> List[str]:
+        return [self.actions[i] for i in self.GetLegalActionIds(hand_packed, last_info)]
+
+
+class HandActionIndex:
+    # Live set of the action ids one hand can afford. Built once when the hand is final
+    # (after the landlord takes the seen cards); since a hand only shrinks during play,
+    # removing cards only has to re-check the actions that use the removed ranks.
+    def __init__(self, space: ActionSpace):
+        self.space = space
+        self.hand_packed = 0
+        self.live = set()
+        self.live_by_rank: List[set] = [set() for _ in range(0, NUM_RANKS)]
+
+    @classmethod
+    def NewHandActionIndex(cls, space: ActionSpace, hand_packed: int) -> 'HandActionIndex':
+        index = cls(space)
+        index.hand_packed = hand_packed
+        ids: List[int] = []
+        space.CollectFitting(space.groups, hand_packed, ids)
+        index.live = set(ids)
+        for action_id in ids:
+            for v in space.ranks_of[action_id]:
+                index.live_by_rank[v].add(action_id)
+        return index
+
+    def Size(self) -> int:
+        return len(self.live)
+
+    def RemoveRanks(self, hand_packed: int, removed_ranks: List[int]) -> List[int]:
+        # hand_packed is the hand after the removal; removed_ranks the rank values that lost cards.
+        # Returns the ids that dropped out (RestoreIds puts them back).
+        space = self.space
+        self.hand_packed = hand_packed
+        fits = RankCounts.PackedFits
+        dropped: List[int] = []
+        for v in removed_ranks:
+            for action_id in list(self.live_by_rank[v]):
+                if fits(space.packed[action_id], hand_packed):
+                    continue
+                self.live.discard(action_id)
+                for r in space.ranks_of[action_id]:
+                    self.live_by_rank[r].discard(action_id)
+                dropped.append(action_id)
+        return dropped
+
+    def RestoreIds(self, hand_packed: int, action_ids: List[int]) -> None:
+        # Undo of RemoveRanks: hand_packed is the hand again before that removal
+        space = self.space
+        self.hand_packed = hand_packed
+        for action_id in action_ids:
+            self.live.add(action_id)
+            for r in space.ranks_of[action_id]:
+                self.live_by_rank[r].add(action_id)
+
+    def GetLegalActionIds(self, last_id: Optional[int]) -> List[int]:
+        # last_id: action id of another player's last non-pass play, or None for a free play
+        space = self.space
+        live = self.live
+        if (last_id is None) or (space.kinds[last_id] == "invalid"):
+            ids = sorted(live)
+            if last_id is not None:
+                ids.insert(0, 0)
+            return ids
+
+        # Intersect the beats list with the live set, walking whichever side is smaller
+        if len(live) < space.CountBeating(last_id):
+            ids = [action_id for action_id in live if space.Beats(action_id, last_id)]
+        else:
+            ids = [action_id for action_id in space.GetBeatingIds(last_id) if action_id in live]
+        ids.append(0)
+        ids.sort()
+        return ids
+
+    def GetLegalActions(self, last_id: Optional[int]) -> List[str]:
+        return [self.space.actions[i] for i in self.GetLegalActionIds(last_id)]
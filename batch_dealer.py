@@ -0,0 +1,119 @@
+import numpy as np
+from typing import List, Optional
+from card import Card
+from dealer import Dealer, RANK_WEIGHTS, COMBO_BONUS
+from deal_index import DealIndex
+from rank_counts import RANK_TO_VAL, NUM_RANKS, SLOT_BITS
+
+DECK_SIZE = 54
+HAND_SIZE = 17
+NUM_PLAYERS = 3
+DEAL_CHUNK = 1 << 18
+
+# Cards are numbered by their position in Dealer.CreateFullDeck(); DECK_RANKS[i] is card
+# i's rank value
+FULL_DECK: List[Card] = Dealer.CreateFullDeck()
+DECK_RANKS = np.array([RANK_TO_VAL[c.rank] for c in FULL_DECK], dtype=np.int64)
+
+# Dealer.Deal's layout: deck position i < 51 goes to player i % 3, the last 3 are the seen
+# cards. DEAL_ORDER lists the positions grouped by destination: player 0's 17, player 1's,
+# player 2's, then the seen cards.
+HAND_POSITIONS = np.array([[i for i in range(0, 51) if i % NUM_PLAYERS == p] for p in range(0, NUM_PLAYERS)],
+                          dtype=np.int64)
+SEEN_POSITIONS = np.arange(51, DECK_SIZE, dtype=np.int64)
+DEAL_ORDER = np.concatenate([HAND_POSITIONS.ravel(), SEEN_POSITIONS])
+# CARD_WEIGHTS[i]: card i as a RankCounts packed count (one in its rank's slot). A hand's
+# packed counts are the plain sum of its cards' weights, since no slot exceeds 4.
+CARD_WEIGHTS = np.array([1 << (SLOT_BITS * v) for v in DECK_RANKS], dtype=np.int64)
+# Dealer's landlord heuristic tables
+HEURISTIC_WEIGHTS = np.array(RANK_WEIGHTS, dtype=np.int64)
+HEURISTIC_BONUS = np.array(COMBO_BONUS, dtype=np.int64)
+
+
+class BatchDealer:
+    # Many deals at once as arrays: a deal is a row of card numbers (a permutation of 0..53)
+    # dealt exactly as Dealer.Deal deals a shuffled deck, and hands come out as rank-count
+    # matrices without building Card objects.
+    def __init__(self):
+        self.rng = np.random.default_rng()
+
+    @classmethod
+    def NewBatchDealer(cls, seed: Optional[int] = None) -> 'BatchDealer':
+        dealer = cls()
+        dealer.rng = np.random.default_rng(seed)
+        return dealer
+
+    def Shuffle(self, num_deals: int) -> np.ndarray:
+        # (num_deals, 54) uint8, each row an independent uniform permutation of the deck:
+        # the order that sorts 54 random doubles (ties are vanishingly rare)
+        keys = self.rng.random((num_deals, DECK_SIZE))
+        return np.argsort(keys, axis=1).astype(np.uint8)
+
+    @staticmethod
+    def IndexedDecks(start: int, count: int, key: int = 0) -> np.ndarray:
+        # Deals #start .. #start + count - 1 of key (DealIndex), the same decks
+        # Dealer.UseDealIndex deals
+        return DealIndex.Decks(start, count, key)
+
+    @staticmethod
+    def SplitDeals(decks: np.ndarray):
+        # (hands (M, 3, 17), seen (M, 3)) card numbers
+        return (decks[:, HAND_POSITIONS], decks[:, SEEN_POSITIONS])
+
+    @staticmethod
+    def PackedCounts(decks: np.ndarray) -> np.ndarray:
+        # (M, 4) int64 RankCounts packed counts: the three hands, then the seen cards
+        num_deals = len(decks)
+        weights = CARD_WEIGHTS[decks[:, DEAL_ORDER]]
+        packed = np.empty((num_deals, NUM_PLAYERS + 1), dtype=np.int64)
+        packed[:, :NUM_PLAYERS] = weights[:, :51].reshape(num_deals, NUM_PLAYERS, HAND_SIZE).sum(axis=2)
+        packed[:, NUM_PLAYERS] = weights[:, 51:].sum(axis=1)
+        return packed
+
+    @staticmethod
+    def UnpackCounts(packed: np.ndarray) -> np.ndarray:
+        # Packed counts (any shape) -> uint8 counts with a trailing 15-rank axis. Each byte
+        # of the little-endian packed value holds two rank slots.
+        nibbles = packed.astype("<i8").view(np.uint8).reshape(packed.shape + (8,))
+        counts = np.empty(packed.shape + (16,), dtype=np.uint8)
+        counts[..., 0::2] = nibbles & 0xF
+        counts[..., 1::2] = nibbles >> 4
+        return counts[..., :NUM_RANKS]
+
+    @staticmethod
+    def RankCounts(decks: np.ndarray):
+        # (hand counts (M, 3, 15), seen counts (M, 15)) uint8 rank-count matrices
+        counts = BatchDealer.UnpackCounts(BatchDealer.PackedCounts(decks))
+        return (counts[:, :NUM_PLAYERS], counts[:, NUM_PLAYERS])
+
+    @staticmethod
+    def EvaluateHands(counts: np.ndarray) -> np.ndarray:
+        # Dealer.EvaluateHandHeuristic of every rank-count row (last axis = 15 ranks), e.g.
+        # (M, 3, 15) -> (M, 3): points per card plus the combo bonus of every count
+        return counts @ HEURISTIC_WEIGHTS + HEURISTIC_BONUS[counts].sum(axis=-1)
+
+    @staticmethod
+    def DetermineLandlords(hand_counts: np.ndarray) -> np.ndarray:
+        # Dealer.DetermineLandlord for (M, 3, 15) dealt hands (before the seen cards): the
+        # best-scoring player, the lowest id on ties
+        return np.argmax(BatchDealer.EvaluateHands(hand_counts), axis=-1)
+
+    def DealCounts(self, num_deals: int):
+        # (decks, hand counts, seen counts) for num_deals fresh deals
+        decks = self.Shuffle(num_deals)
+        (hand_counts, seen_counts) = BatchDealer.RankCounts(decks)
+        return (decks, hand_counts, seen_counts)
+
+    def IterDealCounts(self, num_deals: int, chunk_size: int = DEAL_CHUNK):
+        # DealCounts in chunks of at most chunk_size deals, so huge deal sets stream in
+        # bounded memory
+        done = 0
+        while done < num_deals:
+            n = min(chunk_size, num_deals - done)
+            yield self.DealCounts(n)
+            done = done + n
+
+    @staticmethod
+    def DeckCards(deck) -> List[Card]:
+        # One deal row as the shuffled Card list Game.DealDeck takes
+        return [Card(rank=FULL_DECK[i].rank, suit=FULL_DECK[i].suit) for i in deck]
@@ -0,0 +1,195 @@
+import time
+import queue
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Dict, Optional
+from player import Player
+from action_space import ActionSpace
+
+class BatchPolicy(ABC):
+    # Batch protocol: one call decides many pending states (each a Game.BuildState dict) and
+    # returns one legal action id per state. Model-backed policies implement SelectActions
+    # with a single batched inference.
+    @abstractmethod
+    def SelectActions(self, states: List[Dict]) -> List[int]:
+        pass
+
+
+class GreedyBatchPolicy(BatchPolicy):
+    # Player.SelectAction's rule over a batch: the longest non-pass action (first one on
+    # ties), otherwise pass
+    def SelectActions(self, states: List[Dict]) -> List[int]:
+        chosen: List[int] = []
+        for state in states:
+            action_ids = state["action_ids"]
+            best_id = 0
+            max_len = 0
+            for i, act_str in enumerate(state["actions"]):
+                if act_str != "pass" and len(act_str) > max_len:
+                    max_len = len(act_str)
+                    best_id = action_ids[i]
+            chosen.append(best_id)
+        return chosen
+
+
+class PendingDecision:
+    def __init__(self, state: Dict):
+        self.state = state
+        self.action_id = -1
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+class PolicyBatcher:
+    # Collects decisions submitted by concurrently running games (one thread per game or
+    # table) and answers them with one SelectActions call per batch. A batch is dispatched
+    # when it reaches max_batch_size, or max_wait_time seconds after its first request.
+    # Requests are only accepted between Start and Stop; every accepted one is answered.
+    def __init__(self):
+        self.policy: BatchPolicy = None
+        self.max_batch_size = 64
+        self.max_wait_time = 0.002
+        self.requests: queue.Queue = queue.Queue()
+        self.thread: Optional[threading.Thread] = None
+        # running and the requests queue change together under lock
+        self.lock = threading.Lock()
+        self.running = False
+        self.batches = 0
+        self.decisions = 0
+
+    @classmethod
+    def NewPolicyBatcher(cls, policy: BatchPolicy, max_batch_size: int = 64, max_wait_time: float = 0.002) -> 'PolicyBatcher':
+        batcher = cls()
+        batcher.policy = policy
+        batcher.max_batch_size = max(1, max_batch_size)
+        batcher.max_wait_time = max(0.0, max_wait_time)
+        batcher.requests = queue.Queue()
+        batcher.thread = None
+        batcher.lock = threading.Lock()
+        batcher.running = False
+        batcher.batches = 0
+        batcher.decisions = 0
+        return batcher
+
+    def Start(self) -> None:
+        # Each run serves its own queue, so a previous serve thread that ended on its own
+        # never touches the new run's requests
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self.requests = queue.Queue()
+            self.thread = threading.Thread(target=self.ServeLoop, args=(self.requests,), daemon=True)
+            self.thread.start()
+
+    def Stop(self) -> None:
+        # Pending requests submitted before Stop are still answered
+        with self.lock:
+            if self.running:
+                self.running = False
+                self.requests.put(None)
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def Submit(self, state: Dict) -> PendingDecision:
+        pending = PendingDecision(state)
+        with self.lock:
+            if not self.running:
+                raise RuntimeError("the policy batcher is not running (Start it first)")
+            self.requests.put(pending)
+        return pending
+
+    def SelectAction(self, state: Dict) -> int:
+        # Blocking: the action id chosen for state
+        pending = self.Submit(state)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.action_id
+
+    def ServeLoop(self, requests: queue.Queue) -> None:
+        try:
+            self.Serve(requests)
+        finally:
+            # However serving ends, stop accepting requests and fail the ones still queued
+            with self.lock:
+                if self.requests is requests:
+                    self.running = False
+            while True:
+                try:
+                    item = requests.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item.error = RuntimeError("the policy batcher stopped before answering")
+                    item.done.set()
+
+    def Serve(self, requests: queue.Queue) -> None:
+        while True:
+            first = requests.get()
+            if first is None:
+                return
+            batch = [first]
+            stopping = False
+            deadline = time.perf_counter() + self.max_wait_time
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        item = requests.get(timeout=remaining)
+                    else:
+                        item = requests.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self.Dispatch(batch)
+            if stopping:
+                return
+
+    def Dispatch(self, batch: List[PendingDecision]) -> None:
+        try:
+            action_ids = self.policy.SelectActions([p.state for p in batch])
+            if len(action_ids) != len(batch):
+                raise ValueError("policy returned " + str(len(action_ids)) + " action ids for " + str(len(batch)) + " states")
+            for p, action_id in zip(batch, action_ids):
+                p.action_id = action_id
+        except BaseException as e:
+            for p in batch:
+                p.error = e
+            # Beyond ordinary errors (e.g. KeyboardInterrupt) the serve thread ends too
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            self.batches = self.batches + 1
+            self.decisions = self.decisions + len(batch)
+            for p in batch:
+                p.done.set()
+
+    def MeanBatchSize(self) -> float:
+        if self.batches == 0:
+            return 0.0
+        return self.decisions / self.batches
+
+
+class BatchPlayer(Player):
+    # A Player whose SelectAction is answered by a shared PolicyBatcher, so games run in
+    # separate threads pool their decisions into batches
+    def __init__(self, id_: int):
+        super().__init__(id_)
+        self.batcher: PolicyBatcher = None
+        self.action_space: ActionSpace = None
+
+    @classmethod
+    def NewBatchPlayer(cls, id_: int, batcher: PolicyBatcher, action_space: ActionSpace) -> 'BatchPlayer':
+        player_instance = cls.NewPlayer(id_)
+        player_instance.batcher = batcher
+        player_instance.action_space = action_space
+        return player_instance
+
+    def SelectAction(self, state):
+        action_id = self.batcher.SelectAction(state)
+        return self.ParseActionStringToCards(self.action_space.Decode(action_id))
@@ -0,0 +1,83 @@
+import io
+import time
+import random
+import contextlib
+from typing import Dict, List
+from card import Card
+from player import Player
+from round import Round
+from judger import Judger
+from action_generator import ActionGenerator
+from game import Game
+
+# Worst-case hands for legal-action generation: consecutive trios next to many pairs make
+# the airplane-with-wings and four-with-two enumeration explode.
+WORST_CASE_HANDS: Dict[str, str] = {
+    "landlord_three_trios_many_pairs": "333444555" + "66778899TT" + "J",
+    "landlord_four_trios_pairs": "333444555666" + "778899TT",
+    "landlord_four_bombs": "3333444455556666" + "77BR",
+    "landlord_trios_pairs_jokers": "777888999" + "33445566TT" + "B",
+}
+
+
+class Benchmark:
+    @staticmethod
+    def HandFromString(hand_str: str) -> List[Card]:
+        suits = ["Spade", "Heart", "Club", "Diamond"]
+        used: Dict[str, int] = {}
+        cards: List[Card] = []
+        for ch in hand_str:
+            if ch == "B" or ch == "R":
+                cards.append(Card(rank=ch, suit=None))
+            else:
+                cards.append(Card(rank=ch, suit=suits[used.get(ch, 0)]))
+                used[ch] = used.get(ch, 0) + 1
+        return cards
+
+    @staticmethod
+    def TimeLegalActions(action_generator: ActionGenerator, hand_str: str, repeat: int) -> Dict:
+        player = Player.NewPlayer(0)
+        player.SetHand(Benchmark.HandFromString(hand_str))
+        round_context = Round.NewRound([player], Judger.NewJudger())
+
+        timings: List[float] = []
+        actions: List[str] = []
+        for _ in range(0, repeat):
+            start = time.perf_counter()
+            actions = action_generator.GetLegalActions(player, round_context)
+            timings.append(time.perf_counter() - start)
+        return {"actions": len(actions), "mean_ms": 1000.0 * sum(timings) / len(timings), "max_ms": 1000.0 * max(timings)}
+
+    @staticmethod
+    def RunWorstCaseHands(repeat: int = 20) -> None:
+        engines = [
+            ("finders", ActionGenerator.NewActionGenerator()),
+            ("table", ActionGenerator.NewActionGenerator(use_action_space=True)),
+        ]
+        print("Worst-case free-play GetLegalActions (%d runs each)" % repeat)
+        for name, hand_str in WORST_CASE_HANDS.items():
+            for engine_name, ag in engines:
+                r = Benchmark.TimeLegalActions(ag, hand_str, repeat)
+                print(" %-34s %-8s actions=%5d mean=%8.3f ms max=%8.3f ms" % (name, engine_name, r["actions"], r["mean_ms"], r["max_ms"]))
+
+    @staticmethod
+    def RunGameLoop(games: int = 50, use_action_space: bool = False) -> None:
+        # Whole Game.Run loops (output discarded), reported per turn
+        random.seed(0)
+        turns = 0
+        elapsed = 0.0
+        for _ in range(0, games):
+            game = Game.NewGame(use_action_space)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                game.Run()
+            elapsed = elapsed + (time.perf_counter() - start)
+            turns = turns + len(game.round.GetActionTrace())
+        engine_name = "table" if use_action_space else "finders"
+        print("Game.Run %-8s games=%d turns=%d %.1f us/turn" % (engine_name, games, turns, 1e6 * elapsed / turns))
+
+
+if __name__ == "__main__":
+    Benchmark.RunWorstCaseHands()
+    Benchmark.RunGameLoop()
+    Benchmark.RunGameLoop(use_action_space=True)
@@ -0,0 +1,106 @@
+from typing import List
+from card import Card
+from rank_counts import RANK_ORDER, RANK_TO_VAL, NUM_RANKS, SLOT_BITS, GUARD_MASK, RankCounts
+
+# One bit per card: bit 4*rank_value + suit_slot. Every rank owns one 4-bit nibble, so a
+# hand's nibbles line up with the RankCounts packed layout and the 54 cards fit in 57 bits
+# (the jokers sit in slot 0 of their own nibbles: B = bit 52, R = bit 56).
+# Suit slots follow the order Player.SortHand uses, so ascending bits = sorted hand.
+SUIT_ORDER = ["Club", "Diamond", "Heart", "Spade"]
+SUIT_TO_SLOT = {s: i for i, s in enumerate(SUIT_ORDER)}
+
+NIBBLE_ONES = 0       # 0x1 in every nibble
+for _i in range(0, NUM_RANKS):
+    NIBBLE_ONES = NIBBLE_ONES | (1 << (SLOT_BITS * _i))
+PAIR_BITS_LOW = NIBBLE_ONES * 0x5      # 0b0101 per nibble
+QUAD_BITS_LOW = NIBBLE_ONES * 0x3      # 0b0011 per nibble
+
+# Guard bits of the nibbles a chain (straight / pair chain / airplane) may use: 3..A
+CHAIN_GUARDS = 0
+for _i in range(0, 12):
+    CHAIN_GUARDS = CHAIN_GUARDS | (0x8 << (SLOT_BITS * _i))
+# Guard bits of the ranks that can form pairs / trios / bombs: 3..2
+PLAIN_GUARDS = CHAIN_GUARDS | (0x8 << (SLOT_BITS * 12))
+
+
+class Bitboard:
+    @staticmethod
+    def CardBit(card: Card) -> int:
+        slot = 0 if card.suit is None else SUIT_TO_SLOT[card.suit]
+        return SLOT_BITS * RANK_TO_VAL[card.rank] + slot
+
+    @staticmethod
+    def FromCards(cards) -> int:
+        mask = 0
+        for c in cards:
+            mask = mask | (1 << Bitboard.CardBit(c))
+        return mask
+
+    @staticmethod
+    def ToCards(mask: int) -> List[Card]:
+        # Cards in ascending bit order, i.e. sorted by rank then suit
+        cards: List[Card] = []
+        while mask:
+            low = mask & -mask
+            bit = low.bit_length() - 1
+            rank = RANK_ORDER[bit // SLOT_BITS]
+            if rank == "B" or rank == "R":
+                cards.append(Card(rank=rank, suit=None))
+            else:
+                cards.append(Card(rank=rank, suit=SUIT_ORDER[bit % SLOT_BITS]))
+            mask = mask ^ low
+        return cards
+
+    @staticmethod
+    def CardCount(mask: int) -> int:
+        return bin(mask).count("1")
+
+    @staticmethod
+    def RankNibble(mask: int, rank_value: int) -> int:
+        return (mask >> (SLOT_BITS * rank_value)) & 0xF
+
+    @staticmethod
+    def LowestCardOfRank(mask: int, rank_value: int) -> int:
+        # Bit index of the lowest-suit card of that rank in mask, or -1
+        nibble = Bitboard.RankNibble(mask, rank_value)
+        if nibble == 0:
+            return -1
+        return SLOT_BITS * rank_value + ((nibble & -nibble).bit_length() - 1)
+
+    @staticmethod
+    def PackedCounts(mask: int) -> int:
+        # SWAR popcount of every nibble -> RankCounts packed layout
+        x = mask - ((mask >> 1) & PAIR_BITS_LOW)
+        return (x & QUAD_BITS_LOW) + ((x >> 2) & QUAD_BITS_LOW)
+
+    @staticmethod
+    def RankCounts(mask: int) -> List[int]:
+        return RankCounts.Unpack(Bitboard.PackedCounts(mask))
+
+    @staticmethod
+    def PresenceAtLeast(packed_counts: int, k: int) -> int:
+        # Guard bit of nibble v set when rank v holds >= k cards (1 <= k <= 4).
+        # c + (8 - k) stays below 16 for c <= 4, so nibbles never carry into each other.
+        return (packed_counts + NIBBLE_ONES * (8 - k)) & GUARD_MASK
+
+    @staticmethod
+    def ChainStarts(presence: int, length: int) -> int:
+        # Sliding-window AND: guard bit of nibble v survives when ranks v..v+length-1 are
+        # all present and inside 3..A
+        presence = presence & CHAIN_GUARDS
+        window = presence
+        for i in range(1, length):
+            if window == 0:
+                break
+            window = window & (presence >> (SLOT_BITS * i))
+        return window
+
+    @staticmethod
+    def GuardRanks(guards: int) -> List[int]:
+        # Rank values whose guard bit is set, ascending
+        ranks: List[int] = []
+        while guards:
+            low = guards & -guards
+            ranks.append((low.bit_length() - 1) // SLOT_BITS)
+            guards = guards ^ low
+        return ranks
@@ -0,0 +1,63 @@
+import numpy as np
+from typing import List
+from zobrist import Zobrist, MASK64
+
+DECK_SIZE = 54
+GOLDEN = 0x9E3779B97F4A7C15
+
+# Vectorized splitmix64 finalizer constants (Zobrist.Mix)
+_GOLDEN = np.uint64(GOLDEN)
+_MUL1 = np.uint64(0xBF58476D1CE4E5B9)
+_MUL2 = np.uint64(0x94D049BB133111EB)
+
+
+class DealIndex:
+    # Counter-based shuffle: deal #n of a key is a Fisher-Yates shuffle (the same loop as
+    # Dealer.ShuffleDeck) whose draws are splitmix64 outputs of a stream determined by
+    # (key, n) alone. Any deal is computed directly from its 64-bit index, with no state,
+    # no storage and no earlier deals, and the scalar and NumPy versions agree card for card.
+    # Decks are lists of card numbers (positions in Dealer.CreateFullDeck()).
+    # The draw for slot i is the top 32 bits of its output scaled to [0, i]; the bias this
+    # leaves is below 54 / 2^32.
+
+    @staticmethod
+    def StreamStart(index: int, key: int = 0) -> int:
+        return Zobrist.Mix((index & MASK64) ^ Zobrist.Mix(key & MASK64))
+
+    @staticmethod
+    def Deck(index: int, key: int = 0) -> List[int]:
+        deck = list(range(0, DECK_SIZE))
+        state = DealIndex.StreamStart(index, key)
+        for i in range(DECK_SIZE - 1, 0, -1):
+            state = (state + GOLDEN) & MASK64
+            j = ((Zobrist.Mix(state) >> 32) * (i + 1)) >> 32
+            temp = deck[i]
+            deck[i] = deck[j]
+            deck[j] = temp
+        return deck
+
+    @staticmethod
+    def MixArray(x: np.ndarray) -> np.ndarray:
+        # Zobrist.Mix over a uint64 array (arithmetic wraps mod 2^64)
+        x = x + _GOLDEN
+        x = (x ^ (x >> np.uint64(30))) * _MUL1
+        x = (x ^ (x >> np.uint64(27))) * _MUL2
+        return x ^ (x >> np.uint64(31))
+
+    @staticmethod
+    def Decks(start: int, count: int, key: int = 0) -> np.ndarray:
+        # (count, 54) uint8: deals start .. start + count - 1, one Fisher-Yates step per
+        # column across all rows
+        indices = (np.arange(count, dtype=np.uint64) + np.uint64(start & MASK64))
+        with np.errstate(over="ignore"):
+            state = DealIndex.MixArray(indices ^ np.uint64(Zobrist.Mix(key & MASK64)))
+            decks = np.empty((count, DECK_SIZE), dtype=np.uint8)
+            decks[:] = np.arange(DECK_SIZE, dtype=np.uint8)
+            rows = np.arange(count)
+            for i in range(DECK_SIZE - 1, 0, -1):
+                state = state + _GOLDEN
+                j = (((DealIndex.MixArray(state) >> np.uint64(32)) * np.uint64(i + 1)) >> np.uint64(32)).astype(np.int64)
+                temp = decks[rows, j]
+                decks[rows, j] = decks[:, i]
+                decks[:, i] = temp
+        return decks
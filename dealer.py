@@ -1,9 +1,26 @@
 import random
 from card import Card
+from rank_counts import RANK_ORDER
+
+# EvaluateHandHeuristic as tables: points per card by rank value, and the combo bonus for
+# holding a rank count times (pair, triple, bomb)
+RANK_WEIGHTS = [{"R": 50, "B": 45, "2": 20, "A": 12, "K": 8, "Q": 6, "J": 5, "T": 4}.get(r, 1) for r in RANK_ORDER]
+COMBO_BONUS = [0, 0, 10, 25, 40]
 
 class Dealer:
     def __init__(self):
         self.deck = []
+        # Source of shuffles. The global random module unless Seed gives this dealer its own stream.
+        self.rng = random
+        # Seed given to Seed() and not yet used by a shuffle; deal_seed is the seed the last
+        # shuffle started from (None if it continued an earlier stream)
+        self.pending_seed = None
+        self.deal_seed = None
+        # Indexed deals (UseDealIndex): the next deal's index and key, and the current deal's
+        # index (None when it came from the RNG)
+        self.next_deal_index = None
+        self.deal_key = 0
+        self.deal_index = None
 
     @staticmethod
     def CreateFullDeck():
@@ -65,18 +82,71 @@ class Dealer:
 
         return score
 
+    @staticmethod
+    def EvaluateRankCounts(counts) -> int:
+        # EvaluateHandHeuristic of a 15-slot rank-count vector, without building the string
+        score = 0
+        for v in range(0, len(counts)):
+            score = score + RANK_WEIGHTS[v] * counts[v] + COMBO_BONUS[counts[v]]
+        return score
+
     @classmethod
     def NewDealer(cls):
         dealer_instance = cls()
         dealer_instance.deck = Dealer.CreateFullDeck()
+        dealer_instance.rng = random
+        dealer_instance.pending_seed = None
+        dealer_instance.deal_seed = None
+        dealer_instance.next_deal_index = None
+        dealer_instance.deal_key = 0
+        dealer_instance.deal_index = None
         return dealer_instance
 
+    def Seed(self, seed: int) -> None:
+        # Private RNG stream: the same seed always gives the same shuffle, whatever else
+        # in the process (or in other processes) draws random numbers
+        self.rng = random.Random(seed)
+        self.pending_seed = seed
+        self.next_deal_index = None
+
+    def Unseed(self) -> None:
+        # Back to the global random module (undoes Seed)
+        self.rng = random
+        self.pending_seed = None
+
+    def NextDealSeed(self):
+        # Seed the next ShuffleDeck will start from (None for an indexed or unseeded deal)
+        if self.next_deal_index is not None:
+            return None
+        return self.pending_seed
+
+    def UseDealIndex(self, index: int, key: int = 0) -> None:
+        # Deal deal #index of key next (then index + 1, ...) instead of shuffling with the
+        # RNG; see DealIndex. Seed switches back to the RNG.
+        self.next_deal_index = index
+        self.deal_key = key
+
+    def DeckForIndex(self, index: int, key: int = 0):
+        # The shuffled deck of deal #index, as ShuffleDeck returns it. deal_index pulls in
+        # numpy, which RNG deals never need, so it is imported on first use.
+        from deal_index import DealIndex
+        return [self.deck[k] for k in DealIndex.Deck(index, key)]
+
     def ShuffleDeck(self):
+        if self.next_deal_index is not None:
+            self.deal_index = self.next_deal_index
+            self.deal_seed = None
+            self.next_deal_index = self.next_deal_index + 1
+            return self.DeckForIndex(self.deal_index, self.deal_key)
+
         # Fisher-Yates shuffle on a copy of dealer's deck
+        self.deal_index = None
+        self.deal_seed = self.pending_seed
+        self.pending_seed = None
         deck_to_shuffle = list(self.deck)
         n = len(deck_to_shuffle)
         for i in range(n - 1, 0, -1):
-            j = random.randint(0, i)
+            j = self.rng.randint(0, i)
             temp = deck_to_shuffle[i]
             deck_to_shuffle[i] = deck_to_shuffle[j]
             deck_to_shuffle[j] = temp
@@ -97,14 +167,13 @@ class Dealer:
         return (hands, seen_cards)
 
     def DetermineLandlord(self, players):
-        # Heuristic: compute a simple hand-strength score for each player's current hand string
-        # Use GetHandAsString accessor to avoid reaching into Player internals.
+        # Heuristic: compute a simple hand-strength score for each player's current hand
+        # (EvaluateHandHeuristic, scored from the rank counts)
         best_score = float("-inf")
         landlord_id = 0
 
         for player in players:
-            hand_str = player.GetHandAsString()
-            score = Dealer.EvaluateHandHeuristic(hand_str)
+            score = Dealer.EvaluateRankCounts(player.GetRankCounts())
             if score > best_score:
                 best_score = score
                 landlord_id = player.GetId()
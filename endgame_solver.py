@@ -0,0 +1,210 @@
+import time
+from collections import OrderedDict
+from typing import List, Dict, Tuple, Optional
+from search_state import SearchState, SearchRules, NUM_PLAYERS
+from rank_counts import RankCounts
+
+# Total cards left across all three hands at or below which a position counts as an endgame
+ENDGAME_CARDS = 20
+
+
+class NodeBudgetExceeded(Exception):
+    # Raised inside a search when max_nodes is used up; Solve / BestAction turn it into None
+    pass
+
+
+class EndgameSolver:
+    # Exact perfect-information solver: does the landlord win under best play by both sides?
+    # Two sides make the game a boolean AND/OR tree, so alpha-beta reduces to cutting off a
+    # node's remaining moves as soon as one move wins for the side to act.
+    def __init__(self):
+        self.rules: SearchRules = None
+        # (state key) -> landlord wins; LRU-bounded like ActionGenerator.pattern_cache
+        self.table: "OrderedDict[Tuple, bool]" = OrderedDict()
+        self.table_capacity = 1 << 20
+        self.max_nodes = 0              # 0 = unlimited; otherwise one Solve gives up past it
+        self.start_nodes = 0            # stats["nodes"] when the current Solve/BestAction began
+        # hand packed -> every action it can afford, most cards first. Hands recur across
+        # countless nodes, so moves are filtered from here instead of regenerated.
+        self.fitting: Dict[int, List[int]] = {}
+        self.stats = EndgameSolver.NewStats()
+
+    @classmethod
+    def NewEndgameSolver(cls, rules: Optional[SearchRules] = None, table_capacity: int = 1 << 20,
+                         max_nodes: int = 0) -> 'EndgameSolver':
+        solver = cls()
+        solver.rules = rules if rules is not None else SearchRules.NewSearchRules()
+        solver.table = OrderedDict()
+        solver.table_capacity = max(1, table_capacity)
+        solver.max_nodes = max_nodes
+        solver.start_nodes = 0
+        solver.fitting = {}
+        solver.stats = EndgameSolver.NewStats()
+        return solver
+
+    @staticmethod
+    def NewStats() -> Dict:
+        return {"solves": 0, "nodes": 0, "table_hits": 0, "table_stores": 0, "table_evictions": 0,
+                "cutoffs": 0, "unbeatable_prunes": 0, "seconds": 0.0}
+
+    def GetStats(self) -> Dict:
+        stats = dict(self.stats)
+        stats["nodes_per_second"] = stats["nodes"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+        stats["table_size"] = len(self.table)
+        return stats
+
+    @staticmethod
+    def CardsLeft(state: SearchState) -> int:
+        total = 0
+        for h in state.hands:
+            total = total + RankCounts.PackedTotal(h)
+        return total
+
+    @staticmethod
+    def IsEndgame(state: SearchState, max_cards: int = ENDGAME_CARDS) -> bool:
+        return EndgameSolver.CardsLeft(state) <= max_cards
+
+    @staticmethod
+    def Key(state: SearchState) -> Tuple:
+        # The pass count never affects the future, and on a free play the last play doesn't either
+        if SearchRules.IsFreePlay(state):
+            return (state.hands, state.landlord, state.current, -1, 0)
+        return (state.hands, state.landlord, state.current, state.last_player, state.last_play)
+
+    def FittingIds(self, hand: int) -> List[int]:
+        ids = self.fitting.get(hand)
+        if ids is None:
+            space = self.rules.action_space
+            ids = space.GetLegalActionIds(hand, None)
+            ids.sort(key=lambda a: -RankCounts.PackedTotal(space.packed[a]))
+            if len(self.fitting) >= self.table_capacity:
+                self.fitting.clear()
+            self.fitting[hand] = ids
+        return ids
+
+    def OrderedMoves(self, state: SearchState) -> List[int]:
+        # The same moves as SearchRules.LegalActionIds, most cards first (shedding fast wins
+        # fast), pass last
+        space = self.rules.action_space
+        fitting = self.FittingIds(state.hands[state.current])
+        if SearchRules.IsFreePlay(state):
+            return fitting
+        last_play = state.last_play
+        if space.kinds[last_play] == "invalid":
+            moves = list(fitting)
+        else:
+            beats = space.Beats
+            moves = [a for a in fitting if beats(a, last_play)]
+        moves.append(0)
+        return moves
+
+    def UnbeatableFinish(self, state: SearchState, moves: List[int]) -> bool:
+        # Bomb/rocket prune, generalized: some legal move cannot be beaten by anything the
+        # other side holds (typically the top bomb or the rocket), and the rest of the hand is a
+        # single action. Play it; the other side must pass, a teammate may pass, and the free
+        # lead that follows plays the rest out. Exact, so the subtree need not be searched.
+        # Plays of kind "invalid" are skipped: Beats never ranks anything above them, yet the
+        # rules let the next player answer them with any move it can afford.
+        space = self.rules.action_space
+        hand = state.hands[state.current]
+        landlord_to_act = (state.current == state.landlord)
+        opponent_moves = [self.FittingIds(state.hands[i]) for i in range(0, NUM_PLAYERS) if (i == state.landlord) != landlord_to_act]
+        beats = space.Beats
+        for action_id in moves:
+            if (action_id == 0) or (space.kinds[action_id] == "invalid"):
+                continue
+            rest = hand - space.packed[action_id]
+            if space.EncodePacked(rest) <= 0:
+                continue
+            topped = False
+            for opp in opponent_moves:
+                for a in opp:
+                    if beats(a, action_id):
+                        topped = True
+                        break
+                if topped:
+                    break
+            if not topped:
+                return True
+        return False
+
+    def LandlordWins(self, state: SearchState) -> bool:
+        if SearchRules.IsTerminal(state):
+            return SearchRules.Winner(state) == state.landlord
+
+        stats = self.stats
+        stats["nodes"] = stats["nodes"] + 1
+        if (self.max_nodes > 0) and (stats["nodes"] - self.start_nodes > self.max_nodes):
+            raise NodeBudgetExceeded("endgame solver node budget exhausted")
+
+        key = EndgameSolver.Key(state)
+        cached = self.table.get(key)
+        if cached is not None:
+            stats["table_hits"] = stats["table_hits"] + 1
+            self.table.move_to_end(key)
+            return cached
+
+        landlord_to_act = (state.current == state.landlord)
+        rules = self.rules
+        hand = state.hands[state.current]
+
+        # Going out in one move wins on the spot
+        moves = self.OrderedMoves(state)
+        one_shot = rules.action_space.EncodePacked(hand)
+        if (one_shot > 0) and (one_shot in moves):
+            result = landlord_to_act
+        elif self.UnbeatableFinish(state, moves):
+            stats["unbeatable_prunes"] = stats["unbeatable_prunes"] + 1
+            result = landlord_to_act
+        else:
+            # The side to act wins if any move wins for it
+            result = not landlord_to_act
+            for action_id in moves:
+                if self.LandlordWins(rules.StepUnchecked(state, action_id)) == landlord_to_act:
+                    result = landlord_to_act
+                    stats["cutoffs"] = stats["cutoffs"] + 1
+                    break
+
+        self.table[key] = result
+        stats["table_stores"] = stats["table_stores"] + 1
+        if len(self.table) > self.table_capacity:
+            self.table.popitem(last=False)
+            stats["table_evictions"] = stats["table_evictions"] + 1
+        return result
+
+    def Solve(self, state: SearchState) -> Optional[bool]:
+        # True if the landlord wins with perfect play, None if the node budget ran out
+        start = time.perf_counter()
+        self.start_nodes = self.stats["nodes"]
+        try:
+            return self.LandlordWins(state)
+        except NodeBudgetExceeded:
+            return None
+        finally:
+            self.stats["solves"] = self.stats["solves"] + 1
+            self.stats["seconds"] = self.stats["seconds"] + (time.perf_counter() - start)
+
+    def BestAction(self, state: SearchState) -> Optional[int]:
+        # A move that keeps the win for the side to act (the first move if the position is
+        # lost anyway); None if the node budget ran out
+        landlord_to_act = (state.current == state.landlord)
+        start = time.perf_counter()
+        self.start_nodes = self.stats["nodes"]
+        try:
+            moves = self.OrderedMoves(state)
+            for action_id in moves:
+                if self.LandlordWins(self.rules.StepUnchecked(state, action_id)) == landlord_to_act:
+                    return action_id
+            return moves[0]
+        except NodeBudgetExceeded:
+            return None
+        finally:
+            self.stats["solves"] = self.stats["solves"] + 1
+            self.stats["seconds"] = self.stats["seconds"] + (time.perf_counter() - start)
+
+    def BestActionForGame(self, game) -> Optional[int]:
+        # Perfect-information move for the current player of a Game in an endgame, else None
+        state = SearchRules.FromGame(game)
+        if not EndgameSolver.IsEndgame(state):
+            return None
+        return self.BestAction(state)
@@ -4,6 +4,9 @@ from judger import Judger
 from player import Player
 from round import Round
 from action_generator import ActionGenerator
+from action_space import ActionSpace
+from rank_counts import RankCounts
+from bitboard import Bitboard
 
 class Game:
     def __init__(self):
@@ -11,47 +14,74 @@ class Game:
         self.dealer: Dealer = None
         self.judger: Judger = None
         self.round: Round = None
+        self.deck = []          # the shuffled deck of the current deal, in deal order
         self.seen_cards = []
+        self.seen_str = ""
         self.action_generator: ActionGenerator = None
+        self.built_action_space: ActionSpace = None     # see action_space
         self.landlord_id = None
+        self.verbose = True     # headless runs turn off every print
+        self.current_player_id = 0
+        self.turn_count = 0
+        self.max_turns = 163
+        self.undo_stack = []    # (current_player_id, turn_count) before each ApplyAction
+        self.recorder = None    # optional GameRecordWriter; Play appends every finished game to it
+        self.sample_exporter = None     # optional SampleExporter; Play feeds it every decision
 
-    def GetOthersHandAsString(self, exclude_player_id: int) -> str:
-        # Combine other two players' hands into a single compact string
-        combined = ""
+    @property
+    def action_space(self) -> ActionSpace:
+        # The id codec (ActionSpace.Shared), built the first time it is needed, so creating
+        # a finder-engine game does not pay for the table
+        if self.built_action_space is None:
+            self.built_action_space = ActionSpace.Shared(self.action_generator)
+        return self.built_action_space
+
+    def GetOthersRankCounts(self, exclude_player_id: int) -> List[int]:
+        # Combined rank counts of the other two players' hands. Packed counts add slot-wise
+        # without carries (at most 8 per slot), so this is one addition and one unpack.
+        packed = 0
         for p in self.players:
-            if p.GetId() == exclude_player_id:
-                continue
-            combined = combined + p.GetHandAsString()
-        # sort combined by rank order for deterministic representation
-        # Use judger's rank order if available
-        order_map = {"3":0,"4":1,"5":2,"6":3,"7":4,"8":5,"9":6,"T":7,"J":8,"Q":9,"K":10,"A":11,"2":12,"B":13,"R":14}
-        chars = list(combined)
-        chars.sort(key=lambda ch: order_map.get(ch, -1))
-        result = ""
-        for ch in chars:
-            result = result + ch
-        return result
-
-    def BuildState(self, current_player_id: int, landlord_id: int, seen_cards, legal_actions: List[str]) -> Dict:
-        current_hand = self.players[current_player_id].GetHandAsString()
-        others_hand = self.GetOthersHandAsString(current_player_id)
+            if p.GetId() != exclude_player_id:
+                packed = packed + Bitboard.PackedCounts(p.GetHandMask())
+        return RankCounts.Unpack(packed)
+
+    def GetOthersHandAsString(self, exclude_player_id: int) -> str:
+        # Combine other two players' hands into a single compact string, in rank order
+        return RankCounts.ToString(self.GetOthersRankCounts(exclude_player_id))
+
+    def BuildState(self, current_player_id: int, landlord_id: int, seen_cards, legal_action_ids: List[int]) -> Dict:
+        # Assembled from running counts, so apart from the "trace" copy the cost does not grow
+        # with the number of turns played. The count vectors ("*_counts") carry the same
+        # information as the strings for consumers that want numbers. "trace_view" is the
+        # trace without the copy: a live view of the round, only valid until the game moves
+        # on (an Undo changes what it shows).
+        legal_actions = [self.action_space.Decode(a) for a in legal_action_ids]
+        current_counts = self.players[current_player_id].GetRankCounts()
+        others_counts = self.GetOthersRankCounts(current_player_id)
+        played_counts = self.round.GetPlayedCounts()
         trace = self.round.GetActionTrace()
         played_cards = self.round.GetAllPlayedCards()
 
-        # Convert seen_cards hand to compact string
-        seen_str = ""
-        for c in seen_cards:
-            seen_str = seen_str + c.rank
+        # Convert seen_cards hand to compact string (once per deal)
+        if seen_cards is self.seen_cards:
+            seen_str = self.seen_str
+        else:
+            seen_str = "".join([c.rank for c in seen_cards])
 
         state = {
             "self": current_player_id,
-            "current_hand": current_hand,
-            "others_hand": others_hand,
+            "current_hand": RankCounts.ToString(current_counts),
+            "others_hand": RankCounts.ToString(others_counts),
             "actions": legal_actions,
+            "action_ids": legal_action_ids,
             "trace": trace,
+            "trace_view": self.round.GetTraceView(),
             "landlord": landlord_id,
             "seen_cards": seen_str,
-            "played_cards": played_cards
+            "played_cards": played_cards,
+            "current_counts": current_counts,
+            "others_counts": others_counts,
+            "played_counts": list(played_counts)
         }
         return state
 
@@ -75,7 +105,7 @@ class Game:
         return
 
     @classmethod
-    def NewGame(cls) -> 'Game':
+    def NewGame(cls, use_action_space: bool = False) -> 'Game':
         game = cls()
         # create players
         game.players = [ Player.NewPlayer(0),
@@ -83,17 +113,92 @@ class Game:
                          Player.NewPlayer(2) ]
         game.dealer = Dealer.NewDealer()
         game.judger = Judger.NewJudger()
-        game.round = Round.NewRound(game.players, game.judger)
+        game.deck = []
         game.seen_cards = []
-        game.action_generator = ActionGenerator.NewActionGenerator()
+        game.action_generator = ActionGenerator.NewActionGenerator(use_action_space)
+        # Actions travel as integer ids; the shared action space is the codec either way.
+        # The table engine has already built it; the finder engine builds it on first use.
+        game.built_action_space = game.action_generator.action_space
+        game.round = Round.NewRound(game.players, game.judger, game.built_action_space)
         game.landlord_id = None
+        game.recorder = None
+        game.sample_exporter = None
         return game
 
+    def Reset(self) -> None:
+        # Start a fresh deal with the same players, dealer, judger and action generator
+        self.round = Round.NewRound(self.players, self.judger, self.built_action_space)
+        self.deck = []
+        self.seen_cards = []
+        self.seen_str = ""
+        self.landlord_id = None
+        self.undo_stack = []
+        for p in self.players:
+            p.SetHand([])
+            p.SetRole("peasant")
+
+    def SetRecorder(self, recorder) -> None:
+        # Attach a GameRecordWriter (None detaches). A pending dealer seed is checked now, and
+        # every later one before its deal, so a bad seed never fails a game mid-run.
+        if recorder is not None:
+            recorder.CheckSeed(self.dealer.NextDealSeed())
+        self.recorder = recorder
+
     def Run(self) -> None:
+        result = self.Play()
+        self.DisplayResults(result["winner"], result["payoff"])
+        return
+
+    def Play(self) -> Dict:
+        # Deal and play one game to the end without displaying it.
+        # Returns {"winner", "landlord", "payoff", "turns"}.
+        if self.recorder is not None:
+            self.recorder.CheckSeed(self.dealer.NextDealSeed())
+        self.Deal()
+
+        while not self.IsDone():
+            current_player_id = self.current_player_id
+            legal_action_ids = self.GetLegalActionIds()
+            # Build state for the current player
+            state = self.BuildState(current_player_id, self.landlord_id, self.seen_cards, legal_action_ids)
+
+            # Get player's chosen action
+            action = self.players[current_player_id].SelectAction(state)
+            action_id = self.action_space.EncodeCards(action)
+
+            if action_id not in legal_action_ids:
+                # Fallback for an invalid action returned by the Player module.
+                if self.verbose:
+                    print("Warning: Player", current_player_id, "returned an illegal action. Choosing a valid fallback.")
+
+                action_id = state["action_ids"][0]
+                action = None
+
+            if self.sample_exporter is not None:
+                self.sample_exporter.AddDecision(self, legal_action_ids, action_id)
+            self.ApplyAction(action_id, action)
+
+        if self.verbose and (self.turn_count >= self.max_turns):
+            print("Reached max turns, aborting game loop.")
+
+        if self.recorder is not None:
+            self.recorder.WriteGame(self)
+        if self.sample_exporter is not None:
+            self.sample_exporter.EndGame(self)
+        return self.GetResult()
+
+    # --- Step API: Deal, then GetLegalActionIds / ApplyAction until IsDone ---
+
+    def Deal(self) -> None:
         # Step 1: Setup deck and deal
-        deck = self.dealer.ShuffleDeck()
+        self.DealDeck(self.dealer.ShuffleDeck())
+
+    def DealDeck(self, deck) -> None:
+        # Deal from an already shuffled deck (e.g. a recorded one) and start play
+        self.deck = deck
         (hands, seen_cards) = self.dealer.Deal(deck)
         self.seen_cards = seen_cards
+        self.seen_str = "".join([c.rank for c in seen_cards])
 
         # Step 2: Assign hands to players
         for i in range(0, 3):
@@ -111,59 +216,80 @@ class Game:
             else:
                 self.players[i].SetRole("peasant")
 
+        # Hands are final now: let the table engine maintain each hand's legal actions incrementally
+        if self.action_generator.action_space is not None:
+            for p in self.players:
+                p.BuildActionIndex(self.action_generator.action_space)
+
         # Step 4: Game loop begins with landlord
-        current_player_id = landlord_id
+        self.current_player_id = landlord_id
+        self.round.SetTurn(landlord_id)
+        self.turn_count = 0
 
+    def IsDone(self) -> bool:
         # Safety cap to prevent infinite loops in buggy implementations
-        turn_count = 0
-        max_turns = 163
-
-        while not self.judger.IsGameOver(self.players):
-            if turn_count >= max_turns:
-                print("Reached max turns, aborting game loop.")
-                break
-            current_player = self.players[current_player_id]
-            legal_actions = self.action_generator.GetLegalActions(current_player, self.round)
-            # Build state for the current player
-            state = self.BuildState(current_player_id, landlord_id, seen_cards, legal_actions)
+        return self.judger.IsGameOver(self.players) or (self.turn_count >= self.max_turns)
 
-            # Get player's chosen action
-            action = self.players[current_player_id].SelectAction(state)
+    def GetCurrentPlayerId(self) -> int:
+        return self.current_player_id
 
-            if not action:
-                action_as_string = "pass"
-            else:
-                action_as_string = self.round.ActionToString(action)
+    def GetLegalActionIds(self) -> List[int]:
+        return self.action_generator.GetLegalActionIds(self.players[self.current_player_id], self.round)
 
-            is_legal = False
-            for legal_action_str in state["actions"]:
-                if action_as_string == legal_action_str:
-                    is_legal = True
-                    break
+    def GetCurrentState(self, legal_action_ids: List[int]) -> Dict:
+        return self.BuildState(self.current_player_id, self.landlord_id, self.seen_cards, legal_action_ids)
 
-            if not is_legal:
-                # Fallback for an invalid action returned by the Player module.
-                print("Warning: Player", current_player_id, "returned an illegal action. Choosing a valid fallback.")
+    def ApplyAction(self, action_id: int, action=None) -> None:
+        # Play action_id (assumed legal) for the current player. action: the player's cards for
+        # it, or None to take them from the action string.
+        current_player_id = self.current_player_id
+        if action is None:
+            # We need to convert the id back to a PlayAction object for processing
+            action = self.players[current_player_id].ParseActionStringToCards(self.action_space.Decode(action_id))
 
-                fallback_action_str = state["actions"][0]
+        # Apply the action to the round and the player (reversibly, see UndoAction)
+        self.undo_stack.append((current_player_id, self.turn_count))
+        self.round.Apply(current_player_id, action_id, action)
+        self.players[current_player_id].Apply(action)
 
-                # We need to convert the fallback string back to a PlayAction object for processing
-                action = self.players[current_player_id].ParseActionStringToCards(fallback_action_str) 
+        # Check for winner immediately
+        if self.judger.IsGameOver(self.players):
+            return
 
-            # Apply the action to the round and the player
-            self.round.RecordAction(current_player_id, action)
-            self.players[current_player_id].RemoveCards(action)
+        # Determine next player
+        self.current_player_id = self.round.GetNextPlayer(current_player_id)
+        self.turn_count = self.turn_count + 1
 
-            # Check for winner immediately
-            if self.judger.IsGameOver(self.players):
-                break
+    def UndoAction(self) -> None:
+        # Take back the last ApplyAction, restoring round, hand and turn exactly
+        (current_player_id, turn_count) = self.undo_stack.pop()
+        self.players[current_player_id].Undo()
+        self.round.Undo()
+        self.current_player_id = current_player_id
+        self.turn_count = turn_count
 
-            # Determine next player
-            current_player_id = self.round.GetNextPlayer(current_player_id)
-            turn_count = turn_count + 1
+    def GetPositionHash(self) -> int:
+        # Zobrist hash of the whole position: hands (with suits), turn, last play, pass count.
+        # Every component is maintained incrementally, so this is a few XORs.
+        h = self.round.GetStateHash()
+        for p in self.players:
+            h = h ^ p.GetHandHash()
+        return h
 
-        # Step 5: Calculate payoff and display results
+    def GetRankPositionHash(self) -> int:
+        # Suit-insensitive variant: hands by rank counts only (what the rules depend on)
+        h = self.round.GetStateHash()
+        for p in self.players:
+            h = h ^ p.GetRankHash()
+        return h
+
+    def GetResult(self) -> Dict:
+        # Step 5: Calculate payoff
         winner_id = self.judger.GetWinner(self.players)
         payoff = self.judger.CalculatePayoff(winner_id, self.landlord_id)
-        self.DisplayResults(winner_id, payoff)
-        return
+        return {
+            "winner": winner_id,
+            "landlord": self.landlord_id,
+            "payoff": payoff,
+            "turns": len(self.round.action_id_trace)
+        }
@@ -0,0 +1,255 @@
+import os
+import mmap
+import struct
+import numpy as np
+from typing import List, Optional
+from card import Card
+from bitboard import Bitboard, SUIT_ORDER
+from rank_counts import RANK_ORDER, SLOT_BITS
+
+# File layout (little-endian):
+#   file header   MAGIC, version (uint16), reserved (uint16)
+#   records       appended back to back, each
+#                   seed (int64), flags (uint8, FLAG_SEEDED when seed is set),
+#                   landlord (int8), winner (int8), number of actions (uint16),
+#                   deck (54 x uint8): the shuffled deck as Bitboard card bits, in deal order
+#                   action ids (n x uint16), turn t played by player (landlord + t) % 3
+# A sidecar "<path>.idx" holds the uint64 byte offset of every record, so readers get
+# random access without scanning.
+MAGIC = b"DDZR"
+VERSION = 2
+FILE_HEADER = struct.Struct("<4sHH")
+RECORD_HEADER = struct.Struct("<qBbbH")
+FLAG_SEEDED = 1
+SEED_MIN = -(1 << 63)
+SEED_MAX = (1 << 63) - 1
+DECK_SIZE = 54
+NUM_PLAYERS = 3
+INDEX_SUFFIX = ".idx"
+
+
+class GameRecord:
+    # One decoded record: deck and action_ids are small uint8 / uint16 arrays
+    def __init__(self, seed: Optional[int], landlord: int, winner: int, deck, action_ids):
+        self.seed = seed
+        self.landlord = landlord
+        self.winner = winner
+        self.deck = deck
+        self.action_ids = action_ids
+
+    @staticmethod
+    def CardFromBit(bit: int) -> Card:
+        rank = RANK_ORDER[bit // SLOT_BITS]
+        if rank == "B" or rank == "R":
+            return Card(rank=rank, suit=None)
+        return Card(rank=rank, suit=SUIT_ORDER[bit % SLOT_BITS])
+
+    def GetDeck(self) -> List[Card]:
+        return [GameRecord.CardFromBit(int(bit)) for bit in self.deck]
+
+    def GetActionIdTrace(self) -> List:
+        # (player_id, action_id) per turn, as Round.GetActionIdTrace
+        return [((self.landlord + t) % NUM_PLAYERS, int(a)) for t, a in enumerate(self.action_ids)]
+
+    def Replay(self, game) -> None:
+        # Deal the recorded deck into game and play the recorded actions; the game ends in
+        # the recorded final position
+        game.Reset()
+        game.DealDeck(self.GetDeck())
+        for action_id in self.action_ids:
+            game.ApplyAction(int(action_id))
+
+
+class GameRecordWriter:
+    # Streaming, append-only writer: each game is one write to the (buffered) record file and
+    # one to its index. Opening an existing file appends to it, after cutting off a partial
+    # last record (e.g. from a crash mid-write).
+    def __init__(self):
+        self.path = ""
+        self.file = None
+        self.index_file = None
+        self.offset = 0
+        self.records_written = 0
+
+    @classmethod
+    def NewGameRecordWriter(cls, path: str) -> 'GameRecordWriter':
+        writer = cls()
+        writer.path = path
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            # Only append records of the same layout
+            with open(path, "rb") as f:
+                header = f.read(FILE_HEADER.size)
+            if (len(header) != FILE_HEADER.size) or (FILE_HEADER.unpack(header)[:2] != (MAGIC, VERSION)):
+                raise ValueError("not a game record file of this version: " + path)
+            GameRecordWriter.Repair(path)
+        writer.file = open(path, "ab")
+        writer.offset = writer.file.tell()
+        if writer.offset == 0:
+            writer.file.write(FILE_HEADER.pack(MAGIC, VERSION, 0))
+            writer.offset = FILE_HEADER.size
+        writer.index_file = open(path + INDEX_SUFFIX, "ab")
+        writer.records_written = 0
+        return writer
+
+    @staticmethod
+    def Repair(path: str) -> None:
+        # Truncate the record file to its last complete record and make the index list
+        # exactly those records, so appends start on a record boundary
+        with GameRecordReader.NewGameRecordReader(path) as reader:
+            end = reader.end
+            indexed = reader.indexed
+            offsets = np.array(reader.offsets, dtype="<u8")
+        if os.path.getsize(path) != end:
+            os.truncate(path, end)
+        if not indexed:
+            with open(path + INDEX_SUFFIX, "wb") as f:
+                f.write(offsets.tobytes())
+
+    @staticmethod
+    def CheckSeed(seed: Optional[int]) -> None:
+        # Records hold seeds as int64; reject others before a game is played, not after
+        if (seed is not None) and ((seed < SEED_MIN) or (seed > SEED_MAX)):
+            raise ValueError("seed does not fit a game record (int64): " + str(seed))
+
+    def Write(self, seed: Optional[int], landlord: int, winner: int, deck_bits: List[int], action_ids: List[int]) -> None:
+        if len(deck_bits) != DECK_SIZE:
+            raise ValueError("a record needs the full deck of " + str(DECK_SIZE) + " cards")
+        GameRecordWriter.CheckSeed(seed)
+        if seed is None:
+            header = RECORD_HEADER.pack(0, 0, landlord, winner, len(action_ids))
+        else:
+            header = RECORD_HEADER.pack(seed, FLAG_SEEDED, landlord, winner, len(action_ids))
+        data = header + bytes(deck_bits) + struct.pack("<%dH" % len(action_ids), *action_ids)
+        self.file.write(data)
+        self.index_file.write(struct.pack("<Q", self.offset))
+        self.offset = self.offset + len(data)
+        self.records_written = self.records_written + 1
+
+    def WriteGame(self, game) -> None:
+        # Record a finished Game: its deal, landlord, winner and action ids
+        self.Write(game.dealer.deal_seed, game.landlord_id, game.judger.GetWinner(game.players),
+                   [Bitboard.CardBit(c) for c in game.deck],
+                   [action_id for _, action_id in game.round.action_id_trace])
+
+    def Flush(self) -> None:
+        self.file.flush()
+        self.index_file.flush()
+
+    def Close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.index_file.close()
+            self.file = None
+            self.index_file = None
+
+    def __enter__(self) -> 'GameRecordWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.Close()
+
+
+class GameRecordReader:
+    # Random-access reader over a memory-mapped record file; only the pages of the records
+    # actually read are loaded. The offsets come from the index file when it covers the
+    # whole record file, otherwise from one scan of the record headers. A partial last
+    # record (e.g. from a crash mid-write) is not read.
+    def __init__(self):
+        self.path = ""
+        self.file = None
+        self.map: Optional[mmap.mmap] = None
+        self.offsets: np.ndarray = None
+        # End of the last complete record, and whether the offsets came from the index
+        self.end = 0
+        self.indexed = False
+
+    @classmethod
+    def NewGameRecordReader(cls, path: str) -> 'GameRecordReader':
+        reader = cls()
+        reader.path = path
+        reader.file = open(path, "rb")
+        if os.fstat(reader.file.fileno()).st_size < FILE_HEADER.size:
+            reader.file.close()
+            raise ValueError("not a game record file: " + path)
+        reader.map = mmap.mmap(reader.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _) = FILE_HEADER.unpack_from(reader.map, 0)
+        if (magic != MAGIC) or (version != VERSION):
+            raise ValueError("not a game record file: " + path)
+        reader.offsets = reader.LoadIndex()
+        reader.indexed = reader.offsets is not None
+        if reader.offsets is None:
+            reader.offsets = reader.ScanOffsets()
+        return reader
+
+    def RecordEnd(self, offset: int) -> int:
+        # End of the record starting at offset, -1 if the file stops inside it
+        size = len(self.map)
+        if offset + RECORD_HEADER.size > size:
+            return -1
+        (_, _, _, _, n) = RECORD_HEADER.unpack_from(self.map, offset)
+        end = offset + RECORD_HEADER.size + DECK_SIZE + 2 * n
+        return end if end <= size else -1
+
+    def LoadIndex(self) -> Optional[np.ndarray]:
+        index_path = self.path + INDEX_SUFFIX
+        if not os.path.exists(index_path):
+            return None
+        size = os.path.getsize(index_path)
+        if size % 8 != 0:
+            return None
+        if size == 0:
+            offsets = np.zeros(0, dtype="<u8")
+            end = FILE_HEADER.size
+        else:
+            offsets = np.memmap(index_path, dtype="<u8", mode="r")
+            end = self.RecordEnd(int(offsets[-1]))
+        # A stale or partial index (e.g. after a crash) falls back to scanning
+        if end != len(self.map):
+            return None
+        self.end = end
+        return offsets
+
+    def ScanOffsets(self) -> np.ndarray:
+        # Offsets of the complete records; a partial last record is left out
+        offsets: List[int] = []
+        offset = FILE_HEADER.size
+        end = self.RecordEnd(offset)
+        while end >= 0:
+            offsets.append(offset)
+            offset = end
+            end = self.RecordEnd(offset)
+        self.end = offset
+        return np.array(offsets, dtype="<u8")
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def Get(self, i: int) -> GameRecord:
+        offset = int(self.offsets[i])
+        (seed, flags, landlord, winner, n) = RECORD_HEADER.unpack_from(self.map, offset)
+        offset = offset + RECORD_HEADER.size
+        # Copied out of the map (a record is ~140 bytes), so records outlive Close
+        deck = np.frombuffer(self.map, dtype=np.uint8, count=DECK_SIZE, offset=offset).copy()
+        action_ids = np.frombuffer(self.map, dtype="<u2", count=n, offset=offset + DECK_SIZE).copy()
+        return GameRecord(seed if (flags & FLAG_SEEDED) else None, landlord, winner, deck, action_ids)
+
+    def __getitem__(self, i: int) -> GameRecord:
+        return self.Get(i)
+
+    def __iter__(self):
+        for i in range(0, len(self.offsets)):
+            yield self.Get(i)
+
+    def Close(self) -> None:
+        if self.map is not None:
+            self.offsets = None
+            self.map.close()
+            self.file.close()
+            self.map = None
+            self.file = None
+
+    def __enter__(self) -> 'GameRecordReader':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.Close()
@@ -0,0 +1,234 @@
+import math
+import time
+import random
+from typing import List, Dict, Optional
+from player import Player
+from search_state import SearchState, SearchRules, NUM_PLAYERS
+from rank_counts import RankCounts, RANK_ORDER, RANK_TO_VAL, NUM_RANKS
+
+HAND_SIZE = 17
+SEEN_SIZE = 3
+
+
+class ISMCTSNode:
+    # Node of a single-observer information-set tree: children are keyed by action id, and
+    # since determinizations differ in which actions are legal, every child also counts how
+    # often it was available when its parent was visited.
+    def __init__(self, parent: Optional['ISMCTSNode'], action_id: int, player: int):
+        self.parent = parent
+        self.action_id = action_id
+        self.player = player            # who played action_id to reach this node
+        self.children: Dict[int, 'ISMCTSNode'] = {}
+        self.visits = 0
+        self.availability = 0
+        self.total_reward = 0.0
+
+    def UCB(self, exploration: float) -> float:
+        return (self.total_reward / self.visits) + exploration * math.sqrt(math.log(self.availability) / self.visits)
+
+
+class ISMCTSPlayer(Player):
+    # Information-set MCTS: every iteration samples opponent hands consistent with the
+    # observation, walks the shared tree restricted to that sample's legal actions, expands
+    # one node and finishes with a uniform random rollout on SearchState.
+    def __init__(self, id_: int):
+        super().__init__(id_)
+        self.rules: SearchRules = None
+        self.max_iterations = 0         # 0 = no iteration cap
+        self.time_budget = 0.0          # seconds per decision, 0 = no time cap
+        self.exploration = 0.7
+        self.rng = random.Random()
+        self.stats = ISMCTSPlayer.NewStats()
+
+    @classmethod
+    def NewISMCTSPlayer(cls, id_: int, max_iterations: int = 1000, time_budget: float = 0.0,
+                        exploration: float = 0.7, seed: Optional[int] = None,
+                        rules: Optional[SearchRules] = None) -> 'ISMCTSPlayer':
+        if (max_iterations <= 0) and (time_budget <= 0.0):
+            raise ValueError("ISMCTSPlayer needs an iteration or a time budget")
+        player_instance = cls.NewPlayer(id_)
+        player_instance.rules = rules if rules is not None else SearchRules.NewSearchRules()
+        player_instance.max_iterations = max_iterations
+        player_instance.time_budget = time_budget
+        player_instance.exploration = exploration
+        player_instance.rng = random.Random(seed)
+        player_instance.stats = ISMCTSPlayer.NewStats()
+        return player_instance
+
+    # --- Performance counters ---
+
+    @staticmethod
+    def NewStats() -> Dict:
+        return {
+            "decisions": 0,
+            "iterations": 0,
+            "rollouts": 0,
+            "rollout_steps": 0,
+            "search_seconds": 0.0,
+            "determinize_seconds": 0.0,
+            "tree_seconds": 0.0,
+            "rollout_seconds": 0.0
+        }
+
+    def GetStats(self) -> Dict:
+        stats = dict(self.stats)
+        seconds = stats["search_seconds"]
+        stats["iterations_per_second"] = stats["iterations"] / seconds if seconds > 0 else 0.0
+        stats["rollouts_per_second"] = stats["rollouts"] / seconds if seconds > 0 else 0.0
+        stats["rollout_steps_per_second"] = stats["rollout_steps"] / stats["rollout_seconds"] if stats["rollout_seconds"] > 0 else 0.0
+        return stats
+
+    def ResetStats(self) -> None:
+        self.stats = ISMCTSPlayer.NewStats()
+
+    # --- Observation -> sampled SearchState ---
+
+    @staticmethod
+    def CardsLeft(state: Dict) -> List[int]:
+        # Cards each player still holds: 17 (+3 for the landlord) minus what the trace shows played
+        left = [HAND_SIZE] * NUM_PLAYERS
+        left[state["landlord"]] = HAND_SIZE + SEEN_SIZE
+        for player_id, action_str in state["trace"]:
+            if action_str != "pass":
+                left[player_id] = left[player_id] - len(action_str)
+        return left
+
+    @staticmethod
+    def LastPlay(state: Dict, rules: SearchRules):
+        # (last_player, last_play_id, passes since) from the trace
+        passes = 0
+        for i in range(len(state["trace"]) - 1, -1, -1):
+            player_id, action_str = state["trace"][i]
+            if action_str != "pass":
+                return (player_id, rules.action_space.Encode(action_str), passes)
+            passes = passes + 1
+        return (-1, 0, passes)
+
+    def Determinize(self, state: Dict, left: List[int], last) -> SearchState:
+        # Deal the unseen cards (others_hand) to the two opponents with the right counts.
+        # An opponent landlord still holds every seen card it has not played yet.
+        me = state["self"]
+        landlord = state["landlord"]
+        opponents = [(me + 1) % NUM_PLAYERS, (me + 2) % NUM_PLAYERS]
+        pool = list(state["others_hand"])
+        fixed: List[str] = []
+        if landlord != me:
+            seen = RankCounts.FromString(state["seen_cards"])
+            played = [0] * NUM_RANKS
+            for player_id, action_str in state["trace"]:
+                if (player_id == landlord) and (action_str != "pass"):
+                    for ch in action_str:
+                        played[RANK_TO_VAL[ch]] = played[RANK_TO_VAL[ch]] + 1
+            for v in range(0, NUM_RANKS):
+                for _ in range(0, seen[v] - played[v]):
+                    fixed.append(RANK_ORDER[v])
+            for ch in fixed:
+                pool.remove(ch)
+        self.rng.shuffle(pool)
+
+        hands = [0] * NUM_PLAYERS
+        hands[me] = RankCounts.PackString(state["current_hand"])
+        pos = 0
+        for opp in opponents:
+            cards = fixed if opp == landlord else []
+            take = left[opp] - len(cards)
+            hands[opp] = RankCounts.PackString("".join(cards) + "".join(pool[pos:pos + take]))
+            pos = pos + take
+        (last_player, last_play, passes) = last
+        return SearchState(hands=tuple(hands), landlord=landlord, current=me,
+                           last_player=last_player, last_play=last_play, passes=passes)
+
+    # --- Search ---
+
+    def Search(self, state: Dict) -> int:
+        # Best action id for the observed state (most visited root child)
+        rules = self.rules
+        stats = self.stats
+        left = ISMCTSPlayer.CardsLeft(state)
+        last = ISMCTSPlayer.LastPlay(state, rules)
+        root = ISMCTSNode(None, -1, -1)
+        clock = time.perf_counter
+        start = clock()
+        deadline = start + self.time_budget if self.time_budget > 0.0 else None
+        iterations = 0
+        while True:
+            if (self.max_iterations > 0) and (iterations >= self.max_iterations):
+                break
+            if (deadline is not None) and (clock() >= deadline):
+                break
+
+            t0 = clock()
+            sample = self.Determinize(state, left, last)
+            t1 = clock()
+
+            # Selection / expansion
+            node = root
+            while not rules.IsTerminal(sample):
+                legal = rules.LegalActionIds(sample)
+                untried = [a for a in legal if a not in node.children]
+                for a in legal:
+                    child = node.children.get(a)
+                    if child is not None:
+                        child.availability = child.availability + 1
+                if untried:
+                    action_id = untried[self.rng.randrange(len(untried))]
+                    child = ISMCTSNode(node, action_id, sample.current)
+                    child.availability = 1
+                    node.children[action_id] = child
+                    sample = rules.Step(sample, action_id)
+                    node = child
+                    break
+                best = None
+                best_score = -1.0
+                for a in legal:
+                    child = node.children[a]
+                    score = child.UCB(self.exploration)
+                    if score > best_score:
+                        best_score = score
+                        best = child
+                sample = rules.Step(sample, best.action_id)
+                node = best
+            t2 = clock()
+
+            # Rollout
+            steps = 0
+            while not rules.IsTerminal(sample):
+                legal = rules.LegalActionIds(sample)
+                sample = rules.Step(sample, legal[self.rng.randrange(len(legal))])
+                steps = steps + 1
+            payoff = rules.Payoff(sample)
+            t3 = clock()
+
+            # Backpropagation: each node scores the payoff of the player who moved into it
+            while node is not None:
+                node.visits = node.visits + 1
+                if node.player >= 0:
+                    node.total_reward = node.total_reward + payoff[node.player]
+                node = node.parent
+
+            iterations = iterations + 1
+            stats["rollouts"] = stats["rollouts"] + 1
+            stats["rollout_steps"] = stats["rollout_steps"] + steps
+            stats["determinize_seconds"] = stats["determinize_seconds"] + (t1 - t0)
+            stats["tree_seconds"] = stats["tree_seconds"] + (t2 - t1)
+            stats["rollout_seconds"] = stats["rollout_seconds"] + (t3 - t2)
+
+        stats["decisions"] = stats["decisions"] + 1
+        stats["iterations"] = stats["iterations"] + iterations
+        stats["search_seconds"] = stats["search_seconds"] + (clock() - start)
+
+        best_id = state["action_ids"][0]
+        best_visits = -1
+        for action_id in state["action_ids"]:
+            child = root.children.get(action_id)
+            if (child is not None) and (child.visits > best_visits):
+                best_visits = child.visits
+                best_id = action_id
+        return best_id
+
+    def SelectAction(self, state):
+        if len(state["action_ids"]) == 1:
+            action_id = state["action_ids"][0]
+        else:
+            action_id = self.Search(state)
+        return self.ParseActionStringToCards(self.rules.action_space.Decode(action_id))
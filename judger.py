@@ -12,14 +12,14 @@ class Judger:
     def IsGameOver(self, players):
         # Game over if any player has zero cards in hand
         for p in players:
-            if len(p.GetHand()) == 0:
+            if p.GetHandSize() == 0:
                 return True
         return False
 
     def GetWinner(self, players):
         # Return the id of the first player with empty hand; if none, return -1
         for p in players:
-            if len(p.GetHand()) == 0:
+            if p.GetHandSize() == 0:
                 return p.GetId()
         return -1
 
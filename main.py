@@ -1,5 +1,54 @@
+import argparse
 from game import Game
+from simulation import Simulator
+from parallel import ParallelRunner
 
 if __name__ == "__main__":
-    game = Game.NewGame()
-    game.Run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=0, help="run N headless games and print a summary")
+    parser.add_argument("--table", action="store_true", help="use the precomputed action-space engine")
+    parser.add_argument("--seed", type=int, default=None, help="deal game i from seed SEED+i (reproducible)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for --games (0 = all cores)")
+    parser.add_argument("--record", default=None, help="append every game played to this game record file")
+    args = parser.parse_args()
+    if (args.record is not None) and (args.workers != 1):
+        parser.error("--record needs --workers 1")
+    recorder = None
+    if args.record is not None:
+        # numpy-backed; only needed when recording
+        from game_record import GameRecordWriter
+        if args.seed is not None:
+            try:
+                GameRecordWriter.CheckSeed(args.seed)
+                GameRecordWriter.CheckSeed(args.seed + max(0, args.games - 1))
+            except ValueError as e:
+                parser.error(str(e))
+        recorder = GameRecordWriter.NewGameRecordWriter(args.record)
+
+    if args.games <= 0:
+        game = Game.NewGame(args.table)
+        if args.seed is not None:
+            game.dealer.Seed(args.seed)
+        game.SetRecorder(recorder)
+        game.Run()
+    elif ((args.seed is None) or (recorder is not None)) and (args.workers == 1):
+        simulator = Simulator.NewSimulator(args.table)
+        simulator.game.SetRecorder(recorder)
+        if args.seed is None:
+            results = simulator.RunGames(args.games)
+        else:
+            results = simulator.RunSeeds(range(args.seed, args.seed + args.games))
+        summary = Simulator.Summarize(results)
+        games_per_second = simulator.GamesPerSecond()
+    else:
+        runner = ParallelRunner.NewParallelRunner(args.workers, args.table)
+        summary = runner.RunSummary(args.seed if args.seed is not None else 0, args.games)
+        games_per_second = runner.GamesPerSecond()
+
+    if args.games > 0:
+        print("Games:", summary["games"], "landlord wins:", summary["landlord_wins"],
+              "peasant wins:", summary["peasant_wins"], "no winner:", summary["no_winner"])
+        print("Average turns: %.1f" % (summary["turns"] / summary["games"]))
+        print("Throughput: %.1f games/sec" % games_per_second)
+    if recorder is not None:
+        recorder.Close()
@@ -0,0 +1,139 @@
+import numpy as np
+from typing import List, Dict, Optional
+from action_space import ActionSpace
+from rank_counts import RankCounts, NUM_RANKS, SLOT_BITS, SLOT_MASK
+
+NUM_PLAYERS = 3
+MAX_COUNT = 4
+HISTORY_LEN = 15
+PLANE_SIZE = MAX_COUNT * NUM_RANKS      # one 4x15 card matrix
+NUM_HAND_PLANES = 4                     # current hand, others' hand, played cards, seen cards
+
+# THRESHOLDS[count] is the column of a card matrix for a rank held count times:
+# row r is 1 when count > r (so a pair fills rows 0 and 1)
+THRESHOLDS = np.array([[1.0 if c > r else 0.0 for r in range(0, MAX_COUNT)] for c in range(0, MAX_COUNT + 1)],
+                      dtype=np.float32)
+
+
+class ObservationEncoder:
+    # Numeric counterpart of Game.BuildState for learning agents. An observation is one flat
+    # float32 vector, written in place into a caller-owned buffer (typically a row of a batch
+    # array), laid out as:
+    #   cards    (4 + history_len, 4, 15)  current hand, others' hand, played, seen cards,
+    #                                      then the last history_len moves, newest first
+    #   landlord (3,)                      one-hot landlord id
+    #   seat     (3,)                      one-hot id of the player to act
+    #   movers   (history_len, 3)          one-hot player of each history move
+    # A pass is an all-zero card matrix with its mover set; unused history slots are all zero.
+    # All matrices are filled by a single np.take from a preallocated count buffer.
+    def __init__(self):
+        self.action_space: ActionSpace = None
+        self.history_len = HISTORY_LEN
+        self.size = 0
+        self.landlord_offset = 0
+        self.seat_offset = 0
+        self.movers_offset = 0
+        # Rank counts of every action id, (action space size, 15)
+        self.action_counts: np.ndarray = None
+        # Scratch rank counts of the card matrices of the observation being written
+        self.counts: np.ndarray = None
+
+    @classmethod
+    def NewObservationEncoder(cls, action_space: Optional[ActionSpace] = None,
+                              history_len: int = HISTORY_LEN) -> 'ObservationEncoder':
+        encoder = cls()
+        encoder.action_space = action_space if action_space is not None else ActionSpace.Shared()
+        encoder.history_len = max(0, history_len)
+        num_planes = NUM_HAND_PLANES + encoder.history_len
+        encoder.landlord_offset = num_planes * PLANE_SIZE
+        encoder.seat_offset = encoder.landlord_offset + NUM_PLAYERS
+        encoder.movers_offset = encoder.seat_offset + NUM_PLAYERS
+        encoder.size = encoder.movers_offset + encoder.history_len * NUM_PLAYERS
+        packed = np.array(encoder.action_space.packed, dtype=np.int64)
+        encoder.action_counts = np.stack([(packed >> (SLOT_BITS * v)) & SLOT_MASK for v in range(0, NUM_RANKS)], axis=1)
+        encoder.counts = np.zeros((num_planes, NUM_RANKS), dtype=np.int64)
+        return encoder
+
+    def Size(self) -> int:
+        return self.size
+
+    def NewObservationBuffer(self, batch_size: int) -> np.ndarray:
+        return np.zeros((batch_size, self.size), dtype=np.float32)
+
+    def NewMaskBuffer(self, batch_size: int) -> np.ndarray:
+        return np.zeros((batch_size, self.action_space.Size()), dtype=bool)
+
+    def Views(self, out: np.ndarray) -> Dict[str, np.ndarray]:
+        # Named, shaped views into one observation row (no copies)
+        num_planes = NUM_HAND_PLANES + self.history_len
+        cards = out[:self.landlord_offset].reshape(num_planes, MAX_COUNT, NUM_RANKS)
+        return {
+            "current_hand": cards[0],
+            "others_hand": cards[1],
+            "played_cards": cards[2],
+            "seen_cards": cards[3],
+            "history": cards[NUM_HAND_PLANES:],
+            "landlord": out[self.landlord_offset:self.seat_offset],
+            "seat": out[self.seat_offset:self.movers_offset],
+            "movers": out[self.movers_offset:].reshape(self.history_len, NUM_PLAYERS)
+        }
+
+    def Write(self, out: np.ndarray, player_id: int, landlord_id: int, history) -> None:
+        # Card matrices from self.counts (hand rows already filled by the caller), then the
+        # one-hots. history: sequence of (player_id, action_id), oldest first.
+        counts = self.counts
+        start = max(0, len(history) - self.history_len)
+        slot = NUM_HAND_PLANES
+        movers = out[self.movers_offset:]
+        movers[:] = 0.0
+        for i in range(len(history) - 1, start - 1, -1):
+            (mover, action_id) = history[i]
+            counts[slot] = self.action_counts[action_id]
+            movers[(slot - NUM_HAND_PLANES) * NUM_PLAYERS + mover] = 1.0
+            slot = slot + 1
+        counts[slot:] = 0
+
+        cards = out[:self.landlord_offset].reshape(len(counts), MAX_COUNT, NUM_RANKS)
+        np.take(THRESHOLDS, counts, axis=0, out=cards.transpose(0, 2, 1), mode="clip")
+        out[self.landlord_offset:self.movers_offset] = 0.0
+        if landlord_id is not None:
+            out[self.landlord_offset + landlord_id] = 1.0
+        out[self.seat_offset + player_id] = 1.0
+
+    def EncodeGame(self, game, out: np.ndarray, player_id: Optional[int] = None) -> np.ndarray:
+        # Observation of player_id (default: the player to act) straight from the game's
+        # running counts and id trace; out is a 1-D float32 array of Size()
+        if player_id is None:
+            player_id = game.GetCurrentPlayerId()
+        counts = self.counts
+        counts[0] = game.players[player_id].GetRankCounts()
+        counts[1] = game.GetOthersRankCounts(player_id)
+        counts[2] = game.round.GetPlayedCounts()
+        counts[3] = RankCounts.FromString(game.seen_str)
+        self.Write(out, player_id, game.landlord_id, game.round.action_id_trace)
+        return out
+
+    def EncodeState(self, state: Dict, out: np.ndarray) -> np.ndarray:
+        # The same observation from a Game.BuildState dict
+        counts = self.counts
+        counts[0] = state["current_counts"]
+        counts[1] = state["others_counts"]
+        counts[2] = state["played_counts"]
+        counts[3] = RankCounts.FromString(state["seen_cards"])
+        trace = state["trace"]
+        encode = self.action_space.Encode
+        history: List = [(mover, encode(action_str)) for mover, action_str in trace[max(0, len(trace) - self.history_len):]]
+        self.Write(out, state["self"], state["landlord"], history)
+        return out
+
+    @staticmethod
+    def EncodeMask(legal_action_ids: List[int], out: np.ndarray,
+                   previous_ids: Optional[List[int]] = None) -> np.ndarray:
+        # Boolean legal-action mask over the whole action space. With previous_ids (the ids
+        # this row was last set to) only those bits are cleared instead of the whole row.
+        if previous_ids is None:
+            out[:] = False
+        else:
+            out[previous_ids] = False
+        out[legal_action_ids] = True
+        return out
@@ -0,0 +1,82 @@
+import os
+import time
+import multiprocessing
+from typing import List, Dict, Iterator, Optional
+from simulation import Simulator
+from action_space import ActionSpace
+
+# One Simulator per worker process, built by the pool initializer and reused for every chunk
+_worker_simulator: Optional[Simulator] = None
+
+
+def _InitWorker(use_action_space: bool) -> None:
+    global _worker_simulator
+    _worker_simulator = Simulator.NewSimulator(use_action_space)
+
+
+def _RunChunk(task) -> List[Dict]:
+    (seed_lo, seed_hi, include_trace) = task
+    return _worker_simulator.RunSeeds(range(seed_lo, seed_hi), include_trace)
+
+
+class ParallelRunner:
+    # Shards a seed range over a process pool. Every game is dealt from its own seed
+    # (Dealer.Seed), so seed k plays the same deal and trace whatever the worker count,
+    # chunk size or scheduling order.
+    def __init__(self):
+        self.workers = 1
+        self.chunk_size = 256
+        self.use_action_space = False
+        self.games_played = 0
+        self.elapsed = 0.0
+
+    @classmethod
+    def NewParallelRunner(cls, workers: Optional[int] = None, use_action_space: bool = False, chunk_size: int = 256) -> 'ParallelRunner':
+        runner = cls()
+        runner.workers = workers if (workers is not None and workers > 0) else (os.cpu_count() or 1)
+        runner.chunk_size = max(1, chunk_size)
+        runner.use_action_space = use_action_space
+        runner.games_played = 0
+        runner.elapsed = 0.0
+        return runner
+
+    def IterResults(self, seed_start: int, num_games: int, include_trace: bool = False) -> Iterator[Dict]:
+        # Yields per-game results as chunks complete (not in seed order; each result carries
+        # its "seed"). Small chunks keep all workers busy until the end of the range.
+        tasks = []
+        for lo in range(seed_start, seed_start + num_games, self.chunk_size):
+            tasks.append((lo, min(lo + self.chunk_size, seed_start + num_games), include_trace))
+
+        start = time.perf_counter()
+        if self.workers == 1:
+            _InitWorker(self.use_action_space)
+            for task in tasks:
+                for r in _RunChunk(task):
+                    yield r
+        else:
+            # Build the shared action space before forking so workers inherit it
+            ActionSpace.Shared()
+            with multiprocessing.Pool(self.workers, _InitWorker, (self.use_action_space,)) as pool:
+                for chunk in pool.imap_unordered(_RunChunk, tasks):
+                    for r in chunk:
+                        yield r
+        self.elapsed = self.elapsed + (time.perf_counter() - start)
+        self.games_played = self.games_played + num_games
+
+    def RunSummary(self, seed_start: int, num_games: int) -> Dict:
+        # Streaming merge: results are folded into the summary as they arrive and then dropped
+        summary = Simulator.NewSummary()
+        for r in self.IterResults(seed_start, num_games):
+            Simulator.AddToSummary(summary, r)
+        return summary
+
+    def RunResults(self, seed_start: int, num_games: int, include_trace: bool = False) -> List[Dict]:
+        # All results, sorted by seed
+        results = list(self.IterResults(seed_start, num_games, include_trace))
+        results.sort(key=lambda r: r["seed"])
+        return results
+
+    def GamesPerSecond(self) -> float:
+        if self.elapsed <= 0.0:
+            return 0.0
+        return self.games_played / self.elapsed
@@ -1,10 +1,21 @@
 from typing import List, Dict
 from card import Card
+from rank_counts import RankCounts, RANK_TO_VAL
+from bitboard import Bitboard
+from zobrist import Zobrist
+
+NO_IDS: List[int] = []      # shared "nothing dropped" result of RemoveMask; never modified
 
 class Player:
     def __init__(self, id_: int):
         self.id = id_
-        self.hand: List[Card] = []
+        self.hand_mask = 0          # one bit per card in hand (see bitboard.py); hand is derived from it
+        self.hand_cards: List[Card] = []    # cached Card list of hand_cards_mask (see hand)
+        self.hand_cards_mask = 0
+        self.action_index = None    # optional HandActionIndex, maintained while the hand shrinks
+        self.undo_stack = []        # flat: removed mask, hand hash, rank hash, dropped index ids per Apply
+        self.hand_hash = 0          # Zobrist hash of the cards held (suit-aware)
+        self.rank_hash = 0          # Zobrist hash of the rank counts held (suit-insensitive)
         self.role = "peasant"
 
     @staticmethod
@@ -45,9 +56,50 @@ class Player:
 
         return result
 
+    @property
+    def hand(self) -> List[Card]:
+        # The hand as Cards, ordered by rank then suit. Built from hand_mask when read after
+        # a change, so Apply / Undo never touch a list.
+        if self.hand_cards_mask != self.hand_mask:
+            self.hand_cards = Bitboard.ToCards(self.hand_mask)
+            self.hand_cards_mask = self.hand_mask
+        return self.hand_cards
+
+    @hand.setter
+    def hand(self, cards) -> None:
+        self.SetHand(cards)
+
     def GetHand(self):
         return [Card(rank=c.rank, suit=c.suit) for c in self.hand]
 
+    def GetRankCounts(self) -> List[int]:
+        # 15-slot rank-count vector of the hand (no Card copies)
+        return Bitboard.RankCounts(self.hand_mask)
+
+    def GetHandMask(self) -> int:
+        return self.hand_mask
+
+    def GetHandSize(self) -> int:
+        return Bitboard.CardCount(self.hand_mask)
+
+    def BuildActionIndex(self, space) -> None:
+        # Call once the hand is final for the game (after the landlord takes the seen cards)
+        from action_space import HandActionIndex
+        self.action_index = HandActionIndex.NewHandActionIndex(space, Bitboard.PackedCounts(self.hand_mask))
+
+    def GetActionIndex(self):
+        return self.action_index
+
+    def GetHandHash(self) -> int:
+        return self.hand_hash
+
+    def GetRankHash(self) -> int:
+        return self.rank_hash
+
+    def RehashHand(self) -> None:
+        self.hand_hash = Zobrist.CardHash(self.id, self.hand_mask)
+        self.rank_hash = Zobrist.RankHash(self.id, Bitboard.PackedCounts(self.hand_mask))
+
     def GetId(self) -> int:
         return self.id
 
@@ -57,54 +109,102 @@ class Player:
     def GetHandAsString(self) -> str:
         # Convert hand into compact string ordered by rank mapping used elsewhere.
         # Use rank characters only (suit omitted) for compactness like '345...R'
-        rank_order = ["3","4","5","6","7","8","9","T","J","Q","K","A","2","B","R"]
-        bucket = {ch: 0 for ch in rank_order}
-        for card in self.hand:
-            ch = card.rank
-            bucket[ch] = bucket.get(ch, 0) + 1
-
-        result = ""
-        for r in rank_order:
-            count = bucket.get(r, 0)
-            for _ in range(1, count + 1):
-                result = result + r
-        return result
+        return RankCounts.ToString(self.GetRankCounts())
 
     @classmethod
     def NewPlayer(cls, id_: int) -> 'Player':
         player_instance = cls(id_)
         player_instance.id = id_
-        player_instance.hand = []
+        player_instance.hand_mask = 0
+        player_instance.hand_cards = []
+        player_instance.hand_cards_mask = 0
+        player_instance.action_index = None
+        player_instance.undo_stack = []
+        player_instance.hand_hash = 0
+        player_instance.rank_hash = 0
         player_instance.role = "peasant"   # default
         return player_instance
 
     def SetHand(self, hand):
-        self.hand = [Card(rank=c.rank, suit=c.suit) for c in hand]
+        mask = Bitboard.FromCards(hand)
+        if Bitboard.CardCount(mask) != len(hand):
+            # e.g. two suit-less cards of one rank, which share a bit
+            raise ValueError("hand holds a card more than once for player " + str(self.id))
+        self.hand_mask = mask
+        self.action_index = None    # the index only follows a shrinking hand
+        self.undo_stack = []
+        self.RehashHand()
 
     def SetRole(self, role: str):
         self.role = role
 
     def AddCards(self, cards):
-        # Append cards to player's hand
-        for card in cards:
-            self.hand.append(card)
-        # Keep deterministic ordering: sort hand by Rank ordering then suit (optional)
-        Player.SortHand(self)
-
-    def RemoveCards(self, cards):
-        # For each card in action, find and remove one matching card from hand
+        # Add cards to player's hand; the hand stays ordered by rank then suit
+        added = Bitboard.FromCards(cards)
+        if (Bitboard.CardCount(added) != len(cards)) or (added & self.hand_mask):
+            raise ValueError("added cards repeat a card of the hand for player " + str(self.id))
+        self.hand_mask = self.hand_mask | added
+        self.action_index = None
+        self.undo_stack = []
+        self.RehashHand()
+
+    def RemovalMask(self, cards) -> int:
+        # One matching card bit per played card
+        removal = 0
         for played_card in cards:
-            removed = False
-            for i in range(0, len(self.hand)):
-                if Player.CardsEqual(self.hand[i], played_card):
-                    del self.hand[i]
-                    removed = True
-                    break
-            if not removed:
-                # Defensive: if card not found, raise/print error and ignore (shouldn't happen)
+            available = self.hand_mask & ~removal
+            if played_card.suit is None:
+                # suit-less card (e.g. synthetic fallback) matches the lowest suit of its rank
+                bit = Bitboard.LowestCardOfRank(available, RANK_TO_VAL[played_card.rank])
+            else:
+                bit = Bitboard.CardBit(played_card)
+                if not ((available >> bit) & 1):
+                    bit = -1
+            if bit < 0:
+                # Defensive: if card not found, print error and ignore (shouldn't happen)
                 print("Warning: attempted to remove card not in hand for player", self.id)
-        # Maintain order
-        Player.SortHand(self)
+                continue
+            removal = removal | (1 << bit)
+        return removal
+
+    def RemoveCards(self, cards):
+        self.RemoveMask(self.RemovalMask(cards))
+
+    def RemoveMask(self, removal: int) -> List[int]:
+        # Drop the cards with a single mask subtraction. Returns the action ids the index
+        # dropped.
+        if not removal:
+            return NO_IDS
+        before_packed = Bitboard.PackedCounts(self.hand_mask)
+        self.hand_mask = self.hand_mask - removal
+        after_packed = Bitboard.PackedCounts(self.hand_mask)
+        removed_ranks = Bitboard.GuardRanks(Bitboard.PresenceAtLeast(before_packed - after_packed, 1))
+        # Incremental Zobrist update: XOR out the removed cards and the changed rank counts
+        self.hand_hash = self.hand_hash ^ Zobrist.CardHash(self.id, removal)
+        self.rank_hash = self.rank_hash ^ Zobrist.RankHashDelta(self.id, before_packed, after_packed, removed_ranks)
+        if self.action_index is not None:
+            return self.action_index.RemoveRanks(after_packed, removed_ranks)
+        return NO_IDS
+
+    def Apply(self, cards):
+        # RemoveCards that can be reversed exactly by Undo; only the mask and hashes change
+        removal = self.RemovalMask(cards)
+        undo_stack = self.undo_stack
+        undo_stack.append(removal)
+        undo_stack.append(self.hand_hash)
+        undo_stack.append(self.rank_hash)
+        undo_stack.append(self.RemoveMask(removal))
+
+    def Undo(self):
+        # Put back the cards of the last Apply: its mask, hashes and the index entries it
+        # dropped
+        undo_stack = self.undo_stack
+        dropped_ids = undo_stack.pop()
+        self.rank_hash = undo_stack.pop()
+        self.hand_hash = undo_stack.pop()
+        self.hand_mask = self.hand_mask | undo_stack.pop()
+        if self.action_index is not None:
+            self.action_index.RestoreIds(Bitboard.PackedCounts(self.hand_mask), dropped_ids)
 
     def SelectAction(self, state):
         # 职责：只从给定的合法动作列表中选择一个。
@@ -0,0 +1,72 @@
+from typing import List
+
+RANK_ORDER: List[str] = ["3","4","5","6","7","8","9","T","J","Q","K","A","2","B","R"]
+RANK_TO_VAL = {r: i for i, r in enumerate(RANK_ORDER)}
+NUM_RANKS = 15
+
+# Packed layout: one 4-bit slot per rank (rank value i lives in bits 4*i .. 4*i+3).
+# A count never exceeds 4, so the top bit of every slot is free and is used as a
+# guard bit for the borrow-free "a <= b in every slot" test below.
+SLOT_BITS = 4
+SLOT_MASK = 0xF
+GUARD_MASK = 0
+for _i in range(0, NUM_RANKS):
+    GUARD_MASK = GUARD_MASK | (0x8 << (SLOT_BITS * _i))
+
+
+class RankCounts:
+    @staticmethod
+    def FromString(s: str) -> List[int]:
+        counts = [0] * NUM_RANKS
+        for ch in s:
+            counts[RANK_TO_VAL[ch]] += 1
+        return counts
+
+    @staticmethod
+    def FromCards(cards) -> List[int]:
+        counts = [0] * NUM_RANKS
+        for c in cards:
+            counts[RANK_TO_VAL[c.rank]] += 1
+        return counts
+
+    @staticmethod
+    def ToString(counts: List[int]) -> str:
+        # Compact rank string in rank order, e.g. [2,0,1,...] -> "335"
+        parts: List[str] = []
+        for i in range(0, NUM_RANKS):
+            if counts[i] > 0:
+                parts.append(RANK_ORDER[i] * counts[i])
+        return "".join(parts)
+
+    @staticmethod
+    def Pack(counts: List[int]) -> int:
+        packed = 0
+        for i in range(0, NUM_RANKS):
+            packed = packed | (counts[i] << (SLOT_BITS * i))
+        return packed
+
+    @staticmethod
+    def Unpack(packed: int) -> List[int]:
+        return [(packed >> (SLOT_BITS * i)) & SLOT_MASK for i in range(0, NUM_RANKS)]
+
+    @staticmethod
+    def PackString(s: str) -> int:
+        packed = 0
+        for ch in s:
+            packed = packed + (1 << (SLOT_BITS * RANK_TO_VAL[ch]))
+        return packed
+
+    @staticmethod
+    def PackedTotal(packed: int) -> int:
+        total = 0
+        while packed:
+            total = total + (packed & SLOT_MASK)
+            packed = packed >> SLOT_BITS
+        return total
+
+    @staticmethod
+    def PackedFits(action_packed: int, hand_packed: int) -> bool:
+        # Every slot of the action must be <= the same slot of the hand. Setting the guard
+        # bits on the hand keeps each slot non-negative after subtraction (no borrows), and
+        # a slot keeps its guard bit exactly when hand_count - action_count >= 0.
+        return (((hand_packed | GUARD_MASK) - action_packed) & GUARD_MASK) == GUARD_MASK
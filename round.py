@@ -1,14 +1,60 @@
+from collections.abc import Sequence
 from typing import List, Tuple, Optional
 from card import Card
+from action_space import ActionSpace
+from zobrist import Zobrist
+from rank_counts import RANK_ORDER, RANK_TO_VAL, NUM_RANKS
+
+class TraceView(Sequence):
+    # Read-only view of the first `length` entries of a round's decoded trace, handed out
+    # instead of a copy. The round only appends during play, so the view stays valid
+    # (Undo pops entries; views taken before an Undo should not be used after it).
+    def __init__(self, entries: List[Tuple[int, str]], length: int):
+        self.entries = entries
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.entries[j] for j in range(*i.indices(self.length))]
+        if i < 0:
+            i = i + self.length
+        if (i < 0) or (i >= self.length):
+            raise IndexError("trace index out of range")
+        return self.entries[i]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, tuple, TraceView)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
 
 class Round:
     def __init__(self, players, judger):
         self.players = players
         self.judger = judger
-        self.action_trace: List[Tuple[int, str]] = []
+        self.action_space: Optional[ActionSpace] = None
+        # (player_id, action_id) per turn; ids come from the action space ("pass" is 0)
+        self.action_id_trace: List[Tuple[int, int]] = []
         self.played_cards: List[Card] = []
+        # Running views for BuildState: decoded trace (append-only) and played rank counts
+        self.trace: List[Tuple[int, str]] = []
+        self.played_counts: List[int] = [0] * NUM_RANKS
+        self.played_ranks: Optional[List[str]] = None     # GetAllPlayedCards cache
         self.last_non_pass_player: Optional[int] = None
+        self.last_play_id = 0
         self.consecutive_passes = 0
+        # Player to act: set by the game when play starts, then advanced by every recorded action
+        self.turn: Optional[int] = None
+        # Zobrist hash of (turn, last non-pass play, pass count), kept up to date incrementally
+        self.state_hash = 0
+        # (last_non_pass_player, last_play_id, consecutive_passes, len(played_cards), turn, state_hash)
+        # before each Apply
+        self.undo_stack: List[Tuple[Optional[int], int, int, int, Optional[int], int]] = []
 
     @staticmethod
     def ActionToString(action):
@@ -18,50 +64,99 @@ class Round:
         return s
 
     @classmethod
-    def NewRound(cls, players, judger):
+    def NewRound(cls, players, judger, action_space: Optional[ActionSpace] = None):
         round_instance = cls(players, judger)
         round_instance.players = players
         round_instance.judger = judger
-        round_instance.action_trace = []
+        round_instance.action_space = action_space
+        round_instance.action_id_trace = []
         round_instance.played_cards = []
+        round_instance.trace = []
+        round_instance.played_counts = [0] * NUM_RANKS
+        round_instance.played_ranks = None
         round_instance.last_non_pass_player = None
+        round_instance.last_play_id = 0
         round_instance.consecutive_passes = 0
+        round_instance.turn = None
+        round_instance.state_hash = 0
+        round_instance.undo_stack = []
         return round_instance
 
+    def SetTurn(self, player_id: int) -> None:
+        self.state_hash = self.state_hash ^ Zobrist.TurnKey(self.turn) ^ Zobrist.TurnKey(player_id)
+        self.turn = player_id
+
+    def GetStateHash(self) -> int:
+        # Hash of the round's part of the position; Game combines it with the hands
+        return self.state_hash
+
+    def GetActionSpace(self) -> ActionSpace:
+        # The codec for the trace; built on first use when none was given
+        if self.action_space is None:
+            self.action_space = ActionSpace.Shared()
+        return self.action_space
+
+    def GetLastValidPlayId(self):
+        # Returns (player_id, action_id) for the last non-pass play, or null if none.
+        if self.last_non_pass_player is None:
+            return None
+        return (self.last_non_pass_player, self.last_play_id)
+
     def GetLastValidPlay(self):
         # Returns a tuple of (player_id, action_string) for the last non-pass play, or null if none.
         if self.last_non_pass_player is None:
             return None
-
-        # Find the most recent action by the last non-pass player from the trace.
-        for i in range(len(self.action_trace) - 1, -1, -1):
-            player_id, action_str = self.action_trace[i]
-            if player_id == self.last_non_pass_player:
-                return (player_id, action_str)
-
-        # Should not be reached if last_non_pass_player is not null, but as a fallback:
-        return None
+        return (self.last_non_pass_player, self.GetActionSpace().Decode(self.last_play_id))
 
     def RecordAction(self, player_id: int, action):
+        # Record a played card list (empty = pass); the trace stores its action id.
+        # API change: the trace holds ids now, so a card list outside the action space (no
+        # id to store) raises ValueError instead of being recorded as its rank string.
+        action_id = self.GetActionSpace().EncodeCards(action)
+        if action_id < 0:
+            raise ValueError("action is not in the action space: " + Round.ActionToString(action))
+        self.RecordActionId(player_id, action_id, action)
+
+    def RecordActionId(self, player_id: int, action_id: int, cards):
         # Record the action in trace and update played_cards and pass counters
-        if len(action) == 0:
-            # pass
-            self.action_trace.append((player_id, "pass"))
+        h = self.state_hash ^ Zobrist.PassesKey(self.consecutive_passes)
+        self.action_id_trace.append((player_id, action_id))
+        self.trace.append((player_id, self.GetActionSpace().Decode(action_id)))
+        if action_id == 0:
+            # pass: do not add cards to played_cards
             self.consecutive_passes = self.consecutive_passes + 1
-            # when pass, do not add cards to played_cards
         else:
-            # convert played cards to string for trace (compact by ranks)
-            action_str = Round.ActionToString(action)
-            self.action_trace.append((player_id, action_str))
-            for c in action:
+            for c in cards:
                 self.played_cards.append(c)
+                self.played_counts[RANK_TO_VAL[c.rank]] += 1
+            self.played_ranks = None
             # reset pass counter since someone played
+            h = h ^ Zobrist.LastPlayKey(self.last_non_pass_player, self.last_play_id) ^ Zobrist.LastPlayKey(player_id, action_id)
             self.consecutive_passes = 0
             self.last_non_pass_player = player_id
+            self.last_play_id = action_id
+        self.state_hash = h ^ Zobrist.PassesKey(self.consecutive_passes)
+        self.SetTurn(self.GetNextPlayer(player_id))
 
         # If two consecutive passes after a play, the "pile" clears — but full game logic tracks only for turn order.
         return
 
+    def Apply(self, player_id: int, action_id: int, cards):
+        # RecordActionId that can be reversed exactly by Undo
+        self.undo_stack.append((self.last_non_pass_player, self.last_play_id, self.consecutive_passes,
+                                len(self.played_cards), self.turn, self.state_hash))
+        self.RecordActionId(player_id, action_id, cards)
+
+    def Undo(self):
+        (self.last_non_pass_player, self.last_play_id, self.consecutive_passes, played_len,
+         self.turn, self.state_hash) = self.undo_stack.pop()
+        self.action_id_trace.pop()
+        self.trace.pop()
+        for c in self.played_cards[played_len:]:
+            self.played_counts[RANK_TO_VAL[c.rank]] -= 1
+        del self.played_cards[played_len:]
+        self.played_ranks = None
+
     def GetNextPlayer(self, current_player_id: int) -> int:
         # players are in sequence by their id order in round.players
         # find index of current_player_id
@@ -76,15 +171,28 @@ class Round:
             return self.players[0].GetId()
         return self.players[next_index].GetId()
 
+    def GetActionIdTrace(self):
+        return list(self.action_id_trace)
+
     def GetActionTrace(self):
-        # Return a copy of the trace for safety
-        return list(self.action_trace)
+        # Copy of the decoded trace: (player_id, action_string)
+        return list(self.trace)
+
+    def GetTraceView(self) -> TraceView:
+        # The same entries as GetActionTrace without copying them
+        return TraceView(self.trace, len(self.trace))
+
+    def GetPlayedCounts(self) -> List[int]:
+        # Running rank counts of every card played so far (shared list, do not modify)
+        return self.played_counts
 
     def GetAllPlayedCards(self):
-        # Return sorted list of played card ranks as strings (single-char per card)
-        ranks_list: List[str] = []
-        for c in self.played_cards:
-            ranks_list.append(c.rank)
-        order_map = {r: i for i, r in enumerate(self.judger.rank_order)}
-        ranks_list.sort(key=lambda ch: order_map.get(ch, -1))
-        return ranks_list
\ No newline at end of file
+        # Return sorted list of played card ranks as strings (single-char per card);
+        # built from the running counts (already in rank order) only after a play changed them
+        if self.played_ranks is None:
+            ranks_list: List[str] = []
+            for v in range(0, NUM_RANKS):
+                if self.played_counts[v] > 0:
+                    ranks_list.extend([RANK_ORDER[v]] * self.played_counts[v])
+            self.played_ranks = ranks_list
+        return list(self.played_ranks)
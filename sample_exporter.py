@@ -0,0 +1,338 @@
+import os
+import glob
+import queue
+import threading
+import numpy as np
+from typing import List, Dict, Optional
+from action_space import ActionSpace
+from observation import ObservationEncoder
+
+# Shard arrays (N samples per shard, written with np.savez_compressed):
+#   obs            (N, encoder size) uint8   ObservationEncoder row (every feature is 0/1)
+#   players        (N,) int8                 player who decided
+#   actions        (N,) uint16               chosen action id
+#   rewards        (N,) float32              that player's final payoff (Judger.CalculatePayoff)
+#   seeds          (N,) int64                seed of the deal, -1 if not seeded
+#   legal_ids      (total,) uint16           legal action ids of every sample, concatenated
+#   legal_offsets  (N + 1,) int64            sample i's legal ids are legal_ids[off[i]:off[i + 1]]
+SHARD_SIZE = 65536
+SHARD_PATTERN = "%s-%06d.npz"
+
+
+class SampleExporter:
+    # Turns every decision of a game into a training sample. A game's decisions are staged
+    # until its payoff is known (EndGame), then copied in bulk into the shard buffer; full
+    # shards are compressed and written by a background thread while play continues.
+    def __init__(self):
+        self.directory = ""
+        self.prefix = "samples"
+        self.shard_size = SHARD_SIZE
+        self.encoder: ObservationEncoder = None
+        self.next_shard = 0
+        self.shards_written: List[str] = []
+        self.samples_written = 0
+        # Current game: observation rows plus per-decision fields
+        self.game_obs: np.ndarray = None
+        self.game_players: List[int] = []
+        self.game_actions: List[int] = []
+        self.game_legal: List[List[int]] = []
+        # Current shard
+        self.count = 0
+        self.obs: np.ndarray = None
+        self.players: np.ndarray = None
+        self.actions: np.ndarray = None
+        self.rewards: np.ndarray = None
+        self.seeds: np.ndarray = None
+        self.legal_ids: List[int] = []
+        self.legal_offsets: List[int] = [0]
+        # Background writer
+        self.writes: queue.Queue = queue.Queue(maxsize=2)
+        self.thread: Optional[threading.Thread] = None
+        self.error: Optional[BaseException] = None
+
+    @classmethod
+    def NewSampleExporter(cls, directory: str, shard_size: int = SHARD_SIZE, prefix: str = "samples",
+                          encoder: Optional[ObservationEncoder] = None) -> 'SampleExporter':
+        exporter = cls()
+        exporter.directory = directory
+        exporter.prefix = prefix
+        exporter.shard_size = max(1, shard_size)
+        exporter.encoder = encoder if encoder is not None else ObservationEncoder.NewObservationEncoder()
+        os.makedirs(directory, exist_ok=True)
+        # Never overwrite: continue after the highest shard number already in the directory
+        exporter.next_shard = SampleExporter.NextShardNumber(directory, prefix)
+        exporter.shards_written = []
+        exporter.samples_written = 0
+        exporter.game_obs = np.zeros((256, exporter.encoder.Size()), dtype=np.float32)
+        exporter.NewShard()
+        exporter.writes = queue.Queue(maxsize=2)
+        exporter.thread = threading.Thread(target=exporter.WriteLoop, daemon=True)
+        exporter.thread.start()
+        return exporter
+
+    @staticmethod
+    def NextShardNumber(directory: str, prefix: str) -> int:
+        # One past the largest index among "<prefix>-<index>.npz" files (and their .tmp
+        # leftovers from an interrupted write), 0 if there are none
+        next_number = 0
+        for path in glob.glob(os.path.join(directory, prefix + "-*.npz*")):
+            name = os.path.basename(path)
+            stem = name[len(prefix) + 1:].split(".", 1)[0]
+            if stem.isdigit():
+                next_number = max(next_number, int(stem) + 1)
+        return next_number
+
+    def NewShard(self) -> None:
+        self.count = 0
+        self.obs = np.zeros((self.shard_size, self.encoder.Size()), dtype=np.uint8)
+        self.players = np.zeros(self.shard_size, dtype=np.int8)
+        self.actions = np.zeros(self.shard_size, dtype=np.uint16)
+        self.rewards = np.zeros(self.shard_size, dtype=np.float32)
+        self.seeds = np.zeros(self.shard_size, dtype=np.int64)
+        self.legal_ids = []
+        self.legal_offsets = [0]
+
+    # --- Collecting ---
+
+    def AddDecision(self, game, legal_action_ids: List[int], action_id: int) -> None:
+        # Call before the game applies action_id for its current player
+        t = len(self.game_actions)
+        if t == len(self.game_obs):
+            self.game_obs = np.concatenate([self.game_obs, np.zeros_like(self.game_obs)])
+        self.encoder.EncodeGame(game, self.game_obs[t])
+        self.game_players.append(game.GetCurrentPlayerId())
+        self.game_actions.append(action_id)
+        self.game_legal.append(legal_action_ids)
+
+    def EndGame(self, game) -> None:
+        # The game is over: label its staged decisions with the final payoffs
+        payoff = game.GetResult()["payoff"]
+        seed = game.dealer.deal_seed
+        n = len(self.game_actions)
+        t = 0
+        while t < n:
+            take = min(n - t, self.shard_size - self.count)
+            lo = self.count
+            hi = lo + take
+            self.obs[lo:hi] = self.game_obs[t:t + take]
+            self.players[lo:hi] = self.game_players[t:t + take]
+            self.actions[lo:hi] = self.game_actions[t:t + take]
+            self.rewards[lo:hi] = [payoff[p] for p in self.game_players[t:t + take]]
+            self.seeds[lo:hi] = -1 if seed is None else seed
+            for legal in self.game_legal[t:t + take]:
+                self.legal_ids.extend(legal)
+                self.legal_offsets.append(len(self.legal_ids))
+            self.count = hi
+            t = t + take
+            if self.count == self.shard_size:
+                self.Flush()
+        self.game_players = []
+        self.game_actions = []
+        self.game_legal = []
+
+    def ExportRecord(self, record, game) -> None:
+        # Samples of a recorded game (game_record.GameRecord), replayed on game
+        game.Reset()
+        game.DealDeck(record.GetDeck())
+        game.dealer.deal_seed = record.seed
+        for action_id in record.action_ids:
+            action_id = int(action_id)
+            self.AddDecision(game, game.GetLegalActionIds(), action_id)
+            game.ApplyAction(action_id)
+        self.EndGame(game)
+
+    # --- Writing ---
+
+    def Flush(self) -> None:
+        # Hand the buffered samples (if any) to the writer thread and start a new shard
+        if self.error is not None:
+            raise self.error
+        if self.count == 0:
+            return
+        n = self.count
+        path = os.path.join(self.directory, SHARD_PATTERN % (self.prefix, self.next_shard))
+        arrays = {
+            "obs": self.obs[:n],
+            "players": self.players[:n],
+            "actions": self.actions[:n],
+            "rewards": self.rewards[:n],
+            "seeds": self.seeds[:n],
+            "legal_ids": np.array(self.legal_ids, dtype=np.uint16),
+            "legal_offsets": np.array(self.legal_offsets, dtype=np.int64)
+        }
+        self.writes.put((path, arrays))
+        self.next_shard = self.next_shard + 1
+        self.shards_written.append(path)
+        self.samples_written = self.samples_written + n
+        self.NewShard()
+
+    def WriteLoop(self) -> None:
+        while True:
+            item = self.writes.get()
+            if item is None:
+                return
+            (path, arrays) = item
+            try:
+                # Write under a temporary name so readers never see a partial shard
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    np.savez_compressed(f, **arrays)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                self.error = e
+
+    def Close(self) -> None:
+        # Write the partial last shard and wait for every pending write
+        if self.thread is not None:
+            self.Flush()
+            self.writes.put(None)
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self) -> 'SampleExporter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.Close()
+
+
+class ShardLoader:
+    # Streams shards back as shuffled training batches. Each pass visits the shards in a
+    # random order and each shard's samples in a random permutation; batches span shard
+    # boundaries. A background thread loads and batches up to `prefetch` batches ahead.
+    # Batch dict: the shard fields for the batch's samples (obs as float32), with legal_ids /
+    # legal_offsets re-based to the batch, plus "masks" (batch, action space size) when
+    # with_masks is set.
+    def __init__(self):
+        self.paths: List[str] = []
+        self.batch_size = 256
+        self.shuffle = True
+        self.drop_last = False
+        self.with_masks = True
+        self.prefetch = 4
+        self.action_space_size = 0
+        self.rng = np.random.default_rng()
+
+    @classmethod
+    def NewShardLoader(cls, paths, batch_size: int = 256, shuffle: bool = True, seed: Optional[int] = None,
+                       prefetch: int = 4, drop_last: bool = False, with_masks: bool = True,
+                       action_space: Optional[ActionSpace] = None) -> 'ShardLoader':
+        # paths: a shard directory or a list of shard files
+        loader = cls()
+        if isinstance(paths, str):
+            paths = sorted(glob.glob(os.path.join(paths, "*.npz")))
+        loader.paths = list(paths)
+        loader.batch_size = max(1, batch_size)
+        loader.shuffle = shuffle
+        loader.drop_last = drop_last
+        loader.with_masks = with_masks
+        loader.prefetch = max(1, prefetch)
+        if with_masks:
+            loader.action_space_size = (action_space if action_space is not None else ActionSpace.Shared()).Size()
+        loader.rng = np.random.default_rng(seed)
+        return loader
+
+    @staticmethod
+    def LoadShard(path: str) -> Dict[str, np.ndarray]:
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    @staticmethod
+    def Gather(shards: List[Dict[str, np.ndarray]], picks: List[np.ndarray]) -> Dict[str, np.ndarray]:
+        # Batch of picks[j] rows from shards[j], legal sets included
+        batch: Dict[str, np.ndarray] = {}
+        for name in ("obs", "players", "actions", "rewards", "seeds"):
+            batch[name] = np.concatenate([s[name][p] for s, p in zip(shards, picks)])
+        batch["obs"] = batch["obs"].astype(np.float32)
+        ids_parts: List[np.ndarray] = []
+        lengths_parts: List[np.ndarray] = []
+        for s, p in zip(shards, picks):
+            offsets = s["legal_offsets"]
+            starts = offsets[p]
+            lengths = offsets[p + 1] - starts
+            # Positions of every picked sample's ids: start + 0 .. start + length - 1
+            run_starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+            positions = np.arange(int(lengths.sum())) - run_starts + np.repeat(starts, lengths)
+            ids_parts.append(s["legal_ids"][positions])
+            lengths_parts.append(lengths)
+        lengths = np.concatenate(lengths_parts)
+        batch["legal_ids"] = np.concatenate(ids_parts)
+        batch["legal_offsets"] = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        return batch
+
+    def AddMasks(self, batch: Dict[str, np.ndarray]) -> None:
+        lengths = np.diff(batch["legal_offsets"])
+        masks = np.zeros((len(lengths), self.action_space_size), dtype=bool)
+        masks[np.repeat(np.arange(len(lengths)), lengths), batch["legal_ids"]] = True
+        batch["masks"] = masks
+
+    def IterBatchesSync(self):
+        order = list(range(0, len(self.paths)))
+        if self.shuffle:
+            self.rng.shuffle(order)
+        # (shard, remaining permuted rows) pieces waiting to fill the next batch
+        pending: List = []
+        pending_count = 0
+        for i in order:
+            shard = ShardLoader.LoadShard(self.paths[i])
+            n = len(shard["actions"])
+            rows = self.rng.permutation(n) if self.shuffle else np.arange(n)
+            pos = 0
+            while pos < n:
+                take = min(n - pos, self.batch_size - pending_count)
+                pending.append((shard, rows[pos:pos + take]))
+                pending_count = pending_count + take
+                pos = pos + take
+                if pending_count == self.batch_size:
+                    yield self.MakeBatch(pending)
+                    pending = []
+                    pending_count = 0
+        if (pending_count > 0) and (not self.drop_last):
+            yield self.MakeBatch(pending)
+
+    def MakeBatch(self, pending: List) -> Dict[str, np.ndarray]:
+        batch = ShardLoader.Gather([s for s, _ in pending], [p for _, p in pending])
+        if self.with_masks:
+            self.AddMasks(batch)
+        return batch
+
+    def __iter__(self):
+        # One pass over every shard, produced ahead of the consumer by a loader thread
+        batches: queue.Queue = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        failure: List[BaseException] = []
+
+        def Put(item) -> bool:
+            # False once the consumer has gone away
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def Produce():
+            try:
+                for batch in self.IterBatchesSync():
+                    if not Put(batch):
+                        return
+            except Exception as e:
+                failure.append(e)
+            Put(None)
+
+        thread = threading.Thread(target=Produce, daemon=True)
+        thread.start()
+        try:
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    break
+                yield batch
+        finally:
+            stop.set()
+            thread.join()
+        if failure:
+            raise failure[0]
@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+from typing import List, Dict, Tuple, Optional
+from judger import Judger
+from action_generator import ActionGenerator
+from action_space import ActionSpace
+from rank_counts import RankCounts
+from bitboard import Bitboard
+
+NUM_PLAYERS = 3
+
+
+@dataclass(frozen=True)
+class SearchState:
+    # Immutable, hashable snapshot of a game in play for tree search. Suits never matter to
+    # the rules, so hands are RankCounts packed counts; plays are action-space ids.
+    # Cloning is free (share the object); Step returns a new state.
+    hands: Tuple[int, int, int]     # packed rank counts per player id
+    landlord: int
+    current: int                    # player to act
+    last_player: int                # player of the last non-pass play, -1 if none yet
+    last_play: int                  # its action id (0 if none)
+    passes: int                     # consecutive passes since that play
+
+
+class SearchRules:
+    # The Game loop's rules over SearchState: legality from the action-space table (the same
+    # actions ActionGenerator produces), turn order as Round.GetNextPlayer, game end and
+    # payoff as Judger.
+    def __init__(self):
+        self.action_generator: ActionGenerator = None
+        self.action_space: ActionSpace = None
+        self.judger: Judger = None
+
+    @classmethod
+    def NewSearchRules(cls, action_generator: Optional[ActionGenerator] = None) -> 'SearchRules':
+        rules = cls()
+        if action_generator is None:
+            action_generator = ActionGenerator.NewActionGenerator()
+        rules.action_generator = action_generator
+        rules.action_space = ActionSpace.Shared(action_generator)
+        rules.judger = Judger.NewJudger()
+        return rules
+
+    @staticmethod
+    def FromGame(game) -> SearchState:
+        # Snapshot of a Game after Deal (or mid-game)
+        last = game.round.GetLastValidPlayId()
+        return SearchState(
+            hands=tuple([Bitboard.PackedCounts(p.GetHandMask()) for p in game.players]),
+            landlord=game.landlord_id,
+            current=game.GetCurrentPlayerId(),
+            last_player=-1 if last is None else last[0],
+            last_play=0 if last is None else last[1],
+            passes=game.round.consecutive_passes)
+
+    @staticmethod
+    def NewState(hand_strings: List[str], landlord: int, current: Optional[int] = None) -> SearchState:
+        # A fresh position from compact hand strings indexed by player id
+        return SearchState(
+            hands=tuple([RankCounts.PackString(s) for s in hand_strings]),
+            landlord=landlord,
+            current=landlord if current is None else current,
+            last_player=-1,
+            last_play=0,
+            passes=0)
+
+    @staticmethod
+    def IsFreePlay(state: SearchState) -> bool:
+        # No play to beat: nothing played yet, or the last play was our own
+        return (state.last_player < 0) or (state.last_player == state.current)
+
+    def LastInfo(self, state: SearchState) -> Optional[Dict]:
+        if SearchRules.IsFreePlay(state):
+            return None
+        return self.action_generator.GetPatternInfo(self.action_space.actions[state.last_play])
+
+    def LegalActionIds(self, state: SearchState) -> List[int]:
+        # Same ids, same order as ActionGenerator.GetLegalActionIds for the equivalent Game
+        return self.action_space.GetLegalActionIds(state.hands[state.current], self.LastInfo(state))
+
+    def IsLegal(self, state: SearchState, action_id: int) -> bool:
+        space = self.action_space
+        if (action_id < 0) or (action_id >= space.Size()):
+            return False
+        free = SearchRules.IsFreePlay(state)
+        if action_id == 0:
+            return not free
+        if not RankCounts.PackedFits(space.packed[action_id], state.hands[state.current]):
+            return False
+        if free or (space.kinds[state.last_play] == "invalid"):
+            return True
+        return space.Beats(action_id, state.last_play)
+
+    def Step(self, state: SearchState, action_id: int) -> SearchState:
+        # Pure transition: the state after the current player plays action_id
+        if not self.IsLegal(state, action_id):
+            raise ValueError("illegal action for this state: " + str(action_id))
+        return self.StepUnchecked(state, action_id)
+
+    def StepUnchecked(self, state: SearchState, action_id: int) -> SearchState:
+        # Step for callers that only pass ids from LegalActionIds
+        next_player = (state.current + 1) % NUM_PLAYERS
+        if action_id == 0:
+            return SearchState(state.hands, state.landlord, next_player, state.last_player, state.last_play, state.passes + 1)
+        hands = list(state.hands)
+        hands[state.current] = hands[state.current] - self.action_space.packed[action_id]
+        if hands[state.current] == 0:
+            # Game over: the winner stays the current player
+            next_player = state.current
+        return SearchState(
+            hands=tuple(hands),
+            landlord=state.landlord,
+            current=next_player,
+            last_player=state.current,
+            last_play=action_id,
+            passes=0)
+
+    @staticmethod
+    def IsTerminal(state: SearchState) -> bool:
+        for h in state.hands:
+            if h == 0:
+                return True
+        return False
+
+    @staticmethod
+    def Winner(state: SearchState) -> int:
+        # First player id with an empty hand, -1 if none (Judger.GetWinner order)
+        for id_ in range(0, NUM_PLAYERS):
+            if state.hands[id_] == 0:
+                return id_
+        return -1
+
+    def Payoff(self, state: SearchState) -> Dict[int, int]:
+        return self.judger.CalculatePayoff(SearchRules.Winner(state), state.landlord)
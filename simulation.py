@@ -0,0 +1,96 @@
+import time
+from typing import List, Dict, Optional
+from game import Game
+
+class Simulator:
+    # Headless batch runner: one Game (players, dealer, judger, action generator, action
+    # space) is built once and reset between deals; nothing is printed.
+    def __init__(self):
+        self.game: Game = None
+        self.games_played = 0
+        self.elapsed = 0.0
+
+    @classmethod
+    def NewSimulator(cls, use_action_space: bool = False) -> 'Simulator':
+        simulator = cls()
+        simulator.game = Game.NewGame(use_action_space)
+        simulator.game.verbose = False
+        simulator.games_played = 0
+        simulator.elapsed = 0.0
+        return simulator
+
+    def PlayOne(self, seed: Optional[int] = None, include_trace: bool = False) -> Dict:
+        # seed: deal from the dealer's own RNG stream seeded with it (reproducible anywhere);
+        # None deals from the global random module, even after seeded games
+        if seed is not None:
+            self.game.dealer.Seed(seed)
+        else:
+            self.game.dealer.Unseed()
+        self.game.Reset()
+        result = self.game.Play()
+        result["seed"] = seed
+        if include_trace:
+            result["trace"] = self.game.round.GetActionIdTrace()
+        return result
+
+    def RunGames(self, num_games: int, results: Optional[List[Dict]] = None) -> List[Dict]:
+        # Per-game results: {"winner", "landlord", "payoff", "turns", "seed"}
+        if results is None:
+            results = []
+        start = time.perf_counter()
+        for _ in range(0, num_games):
+            results.append(self.PlayOne())
+        self.elapsed = self.elapsed + (time.perf_counter() - start)
+        self.games_played = self.games_played + num_games
+        return results
+
+    def RunSeeds(self, seeds, include_trace: bool = False, results: Optional[List[Dict]] = None) -> List[Dict]:
+        # One game per seed, in the given order
+        if results is None:
+            results = []
+        start = time.perf_counter()
+        count = 0
+        for seed in seeds:
+            results.append(self.PlayOne(seed, include_trace))
+            count = count + 1
+        self.elapsed = self.elapsed + (time.perf_counter() - start)
+        self.games_played = self.games_played + count
+        return results
+
+    def GamesPerSecond(self) -> float:
+        if self.elapsed <= 0.0:
+            return 0.0
+        return self.games_played / self.elapsed
+
+    @staticmethod
+    def NewSummary() -> Dict:
+        return {
+            "games": 0,
+            "landlord_wins": 0,
+            "peasant_wins": 0,
+            "no_winner": 0,
+            "turns": 0,
+            "payoff": {0: 0, 1: 0, 2: 0}
+        }
+
+    @staticmethod
+    def AddToSummary(summary: Dict, r: Dict) -> None:
+        # Aggregates are plain sums, so results can be merged in any order as they arrive
+        summary["games"] = summary["games"] + 1
+        if r["winner"] == -1:
+            summary["no_winner"] = summary["no_winner"] + 1
+        elif r["winner"] == r["landlord"]:
+            summary["landlord_wins"] = summary["landlord_wins"] + 1
+        else:
+            summary["peasant_wins"] = summary["peasant_wins"] + 1
+        summary["turns"] = summary["turns"] + r["turns"]
+        for id_, value in r["payoff"].items():
+            summary["payoff"][id_] = summary["payoff"][id_] + value
+
+    @staticmethod
+    def Summarize(results: List[Dict]) -> Dict:
+        # Aggregate counts over per-game results
+        summary = Simulator.NewSummary()
+        for r in results:
+            Simulator.AddToSummary(summary, r)
+        return summary
@@ -0,0 +1,26 @@
+import pytest
+from action_space import ActionSpace
+
+
+@pytest.fixture(scope="module")
+def space():
+    return ActionSpace.Shared()
+
+
+def test_count_beating_covers_every_id(space):
+    for action_id in range(0, space.Size()):
+        if space.kinds[action_id] == "invalid":
+            assert space.CountBeating(action_id) == space.Size() - 1
+        else:
+            assert space.CountBeating(action_id) == len(space.GetBeatingIds(action_id))
+    assert space.CountBeating(0) == 0
+    assert space.CountBeating(space.rocket_id) == 0
+    assert space.GetBeatingIds(space.kinds.index("invalid")) == list(range(1, space.Size()))
+
+
+def test_beating_ids_are_what_beats_accepts(space):
+    for target_id in range(1, space.Size(), 97):
+        if space.kinds[target_id] == "invalid":
+            continue
+        expected = [a for a in range(1, space.Size()) if space.Beats(a, target_id)]
+        assert sorted(space.GetBeatingIds(target_id)) == expected
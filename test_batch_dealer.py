@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from batch_dealer import BatchDealer, FULL_DECK
+from bitboard import Bitboard
+from dealer import Dealer
+from player import Player
+from rank_counts import RankCounts
+
+NUM_DEALS = 500
+
+
+@pytest.fixture(scope="module")
+def deals():
+    return BatchDealer.NewBatchDealer(3).DealCounts(NUM_DEALS)
+
+
+def test_rows_are_permutations(deals):
+    (decks, _, _) = deals
+    assert decks.shape == (NUM_DEALS, 54)
+    assert (np.sort(decks, axis=1) == np.arange(54)).all()
+
+
+def test_counts_match_dealer_deal(deals):
+    (decks, hand_counts, seen_counts) = deals
+    packed = BatchDealer.PackedCounts(decks)
+    dealer = Dealer.NewDealer()
+    for m in range(0, NUM_DEALS):
+        (hands, seen) = dealer.Deal(BatchDealer.DeckCards(decks[m]))
+        for p in range(0, 3):
+            counts = Bitboard.RankCounts(Bitboard.FromCards(hands[p]))
+            assert hand_counts[m, p].tolist() == counts
+            assert packed[m, p] == RankCounts.Pack(counts)
+        assert seen_counts[m].tolist() == RankCounts.FromString("".join([c.rank for c in seen]))
+
+
+def test_split_deals_follows_dealer_deal(deals):
+    (decks, _, _) = deals
+    (hands, seen) = BatchDealer.SplitDeals(decks[:1])
+    (dealt_hands, dealt_seen) = Dealer.NewDealer().Deal(list(decks[0]))
+    assert hands[0].tolist() == [list(h) for h in dealt_hands]
+    assert seen[0].tolist() == list(dealt_seen)
+
+
+def test_iter_deal_counts_chunks():
+    dealer = BatchDealer.NewBatchDealer(4)
+    sizes = [len(decks) for decks, _, _ in dealer.IterDealCounts(1000, chunk_size=300)]
+    assert sizes == [300, 300, 300, 100]
+
+
+def test_deck_cards_are_copies():
+    cards = BatchDealer.DeckCards(np.arange(54))
+    assert [(c.rank, c.suit) for c in cards] == [(c.rank, c.suit) for c in FULL_DECK]
+    assert all(a is not b for a, b in zip(cards, FULL_DECK))
+
+
+def test_evaluate_hands_equals_the_heuristic(deals):
+    (decks, hand_counts, _) = deals
+    scores = BatchDealer.EvaluateHands(hand_counts)
+    landlords = BatchDealer.DetermineLandlords(hand_counts)
+    dealer = Dealer.NewDealer()
+    players = [Player.NewPlayer(p) for p in range(0, 3)]
+    for m in range(0, NUM_DEALS):
+        (hands, _) = dealer.Deal(BatchDealer.DeckCards(decks[m]))
+        for p in range(0, 3):
+            players[p].SetHand(hands[p])
+            assert scores[m, p] == Dealer.EvaluateHandHeuristic(players[p].GetHandAsString())
+            assert scores[m, p] == Dealer.EvaluateRankCounts(players[p].GetRankCounts())
+        assert landlords[m] == dealer.DetermineLandlord(players)
+
+
+def test_evaluate_hands_on_any_counts():
+    rng = np.random.default_rng(0)
+    counts = rng.integers(0, 5, size=(2000, 15))
+    counts[:, 13:] = rng.integers(0, 2, size=(2000, 2))
+    scores = BatchDealer.EvaluateHands(counts)
+    for row, score in zip(counts, scores):
+        assert score == Dealer.EvaluateHandHeuristic(RankCounts.ToString(row.tolist()))
+
+
+def test_landlord_ties_go_to_the_lowest_id():
+    counts = np.zeros((1, 3, 15), dtype=np.uint8)
+    counts[0, 1, 12] = 1
+    counts[0, 2, 12] = 1
+    assert BatchDealer.DetermineLandlords(counts).tolist() == [1]
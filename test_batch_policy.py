@@ -0,0 +1,88 @@
+import threading
+import pytest
+from batch_policy import BatchPolicy, GreedyBatchPolicy, PolicyBatcher
+
+
+class Interrupted(BaseException):
+    pass
+
+
+class InterruptingPolicy(BatchPolicy):
+    def SelectActions(self, states):
+        raise Interrupted()
+
+
+class ShortPolicy(BatchPolicy):
+    def SelectActions(self, states):
+        return [0] * (len(states) - 1)
+
+
+def NewState(n):
+    return {"action_ids": [0, n], "actions": ["pass", "3" * n]}
+
+
+def SelectConcurrently(batcher, states):
+    # SelectAction of every state from its own thread: (results, errors) by index
+    results = [None] * len(states)
+    errors = [None] * len(states)
+
+    def Run(i):
+        try:
+            results[i] = batcher.SelectAction(states[i])
+        except BaseException as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=Run, args=(i,)) for i in range(0, len(states))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+        assert not t.is_alive()
+    return (results, errors)
+
+
+def test_policy_is_abstract():
+    with pytest.raises(TypeError):
+        BatchPolicy()
+
+
+def test_batches_decisions():
+    batcher = PolicyBatcher.NewPolicyBatcher(GreedyBatchPolicy(), max_batch_size=4, max_wait_time=0.05)
+    batcher.Start()
+    (results, errors) = SelectConcurrently(batcher, [NewState(n) for n in range(1, 9)])
+    batcher.Stop()
+    assert results == list(range(1, 9))
+    assert errors == [None] * 8
+    assert batcher.decisions == 8
+
+
+def test_select_requires_a_running_batcher():
+    batcher = PolicyBatcher.NewPolicyBatcher(GreedyBatchPolicy())
+    with pytest.raises(RuntimeError):
+        batcher.SelectAction(NewState(1))
+    batcher.Start()
+    assert batcher.SelectAction(NewState(2)) == 2
+    batcher.Stop()
+    with pytest.raises(RuntimeError):
+        batcher.SelectAction(NewState(1))
+
+
+def test_wrong_number_of_ids_fails_the_batch():
+    batcher = PolicyBatcher.NewPolicyBatcher(ShortPolicy(), max_batch_size=4, max_wait_time=0.05)
+    batcher.Start()
+    (_, errors) = SelectConcurrently(batcher, [NewState(n) for n in range(1, 5)])
+    batcher.Stop()
+    assert all(isinstance(e, ValueError) for e in errors)
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_base_exception_answers_the_batch():
+    batcher = PolicyBatcher.NewPolicyBatcher(InterruptingPolicy(), max_batch_size=4, max_wait_time=0.05)
+    batcher.Start()
+    (_, errors) = SelectConcurrently(batcher, [NewState(n) for n in range(1, 5)])
+    assert all(isinstance(e, (Interrupted, RuntimeError)) for e in errors)
+    assert any(isinstance(e, Interrupted) for e in errors)
+    batcher.thread.join(timeout=10)
+    with pytest.raises(RuntimeError):
+        batcher.SelectAction(NewState(1))
+    batcher.Stop()
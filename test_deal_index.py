@@ -0,0 +1,28 @@
+import pytest
+from deal_index import DealIndex
+from batch_dealer import BatchDealer
+from simulation import Simulator
+
+
+@pytest.mark.parametrize("key,start", [(0, 0), (12345, 2 ** 64 - 100), (7, 10 ** 15)])
+def test_vectorized_decks_equal_scalar_decks(key, start):
+    decks = DealIndex.Decks(start, 200, key)
+    for m in range(0, 200):
+        assert decks[m].tolist() == DealIndex.Deck(start + m, key)
+
+
+def test_decks_are_permutations_and_differ_by_key():
+    deck = DealIndex.Deck(5)
+    assert sorted(deck) == list(range(0, 54))
+    assert DealIndex.Deck(5, 1) != deck
+    assert DealIndex.Deck(6) != deck
+    assert BatchDealer.IndexedDecks(5, 1)[0].tolist() == deck
+
+
+def test_deal_index_replays_its_game():
+    simulator = Simulator.NewSimulator(True)
+    simulator.game.dealer.UseDealIndex(100)
+    results = [simulator.PlayOne(None, True) for _ in range(0, 4)]
+    assert simulator.game.dealer.deal_index == 103
+    simulator.game.dealer.UseDealIndex(102)
+    assert simulator.PlayOne(None, True) == results[2]
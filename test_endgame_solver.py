@@ -0,0 +1,96 @@
+import random
+from typing import Dict, Optional
+import pytest
+from search_state import SearchRules, SearchState
+from endgame_solver import EndgameSolver
+from rank_counts import RANK_ORDER
+
+
+@pytest.fixture(scope="module")
+def rules():
+    return SearchRules.NewSearchRules()
+
+
+def MinimaxLandlordWins(rules: SearchRules, state: SearchState, memo: Optional[Dict] = None) -> bool:
+    # Plain minimax over SearchRules: every legal move in generator order, memoized on the
+    # whole state, with none of the solver's keys, move ordering or prunes
+    if SearchRules.IsTerminal(state):
+        return SearchRules.Winner(state) == state.landlord
+    if memo is None:
+        memo = {}
+    cached = memo.get(state)
+    if cached is not None:
+        return cached
+    landlord_to_act = (state.current == state.landlord)
+    result = not landlord_to_act
+    for action_id in rules.LegalActionIds(state):
+        if MinimaxLandlordWins(rules, rules.Step(state, action_id), memo) == landlord_to_act:
+            result = landlord_to_act
+            break
+    memo[state] = result
+    return result
+
+
+# (hands by player id, landlord, player to act). They include plays of kind "invalid"
+# (airplanes with three or more trios plus wings and similar shapes) that any affordable
+# move may answer.
+REGRESSION_POSITIONS = [
+    (["34", "6667778889TQK", "AAA2"], 2, 1),
+    (["4", "333444555TJQA", "KKK2"], 2, 1),
+    (["3", "5556667778TJQ", "AAAK"], 2, 1),
+    (["35", "777888999TJQK", "2222"], 2, 1),
+    (["34", "55", "6"], 0, 0),
+    (["3456", "77", "88"], 1, 0),
+    (["B", "R", "2"], 2, 2),
+]
+
+
+@pytest.mark.parametrize("hands,landlord,current", REGRESSION_POSITIONS)
+def test_solver_matches_minimax(rules, hands, landlord, current):
+    state = SearchRules.NewState(hands, landlord, current)
+    assert EndgameSolver.NewEndgameSolver(rules).Solve(state) == MinimaxLandlordWins(rules, state)
+
+
+def test_solver_matches_minimax_on_random_positions(rules):
+    deck = [r for r in RANK_ORDER[:13] for _ in range(0, 4)] + ["B", "R"]
+    rng = random.Random(0)
+    solver = EndgameSolver.NewEndgameSolver(rules)
+    for _ in range(0, 60):
+        rng.shuffle(deck)
+        sizes = [rng.choice([3, 4]) for _ in range(0, 3)]
+        hands = ["".join(deck[sum(sizes[:i]):sum(sizes[:i + 1])]) for i in range(0, 3)]
+        state = SearchRules.NewState(hands, rng.randrange(3))
+        assert solver.Solve(state) == MinimaxLandlordWins(rules, state), hands
+
+
+def test_best_action_keeps_the_win(rules):
+    state = SearchRules.NewState(["BR3", "4", "5"], 0, 0)
+    solver = EndgameSolver.NewEndgameSolver(rules)
+    assert solver.Solve(state) is True
+    action_id = solver.BestAction(state)
+    assert MinimaxLandlordWins(rules, rules.Step(state, action_id)) is True
+
+
+def test_node_budget_is_per_call(rules):
+    state = SearchRules.NewState(["34", "6667778889TQK", "AAA2"], 2, 1)
+    assert EndgameSolver.NewEndgameSolver(rules, max_nodes=10).Solve(state) is None
+    small = SearchRules.NewState(["3456", "77", "88"], 1, 0)
+    solver = EndgameSolver.NewEndgameSolver(rules)
+    expected = solver.Solve(small)
+    budget = solver.GetStats()["nodes"]
+    solver = EndgameSolver.NewEndgameSolver(rules, max_nodes=budget)
+    for _ in range(0, 5):
+        solver.table.clear()
+        assert solver.Solve(small) == expected
+    assert solver.GetStats()["nodes"] == 5 * budget
+
+
+def test_other_timeouts_propagate(rules):
+    class TimingOutRules(SearchRules):
+        def StepUnchecked(self, state, action_id):
+            raise TimeoutError("I/O timed out")
+
+    timing_out = TimingOutRules.NewSearchRules()
+    state = SearchRules.NewState(["3456", "77", "88"], 1, 0)
+    with pytest.raises(TimeoutError):
+        EndgameSolver.NewEndgameSolver(timing_out, max_nodes=1000).Solve(state)
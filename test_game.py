@@ -0,0 +1,57 @@
+import json
+import pytest
+from game import Game
+from card import Card
+from action_space import ActionSpace
+
+
+@pytest.fixture(scope="module")
+def game():
+    game = Game.NewGame(True)
+    game.verbose = False
+    return game
+
+
+def PlayTurns(game, seed, turns):
+    game.dealer.Seed(seed)
+    game.Reset()
+    game.Deal()
+    for _ in range(0, turns):
+        game.ApplyAction(game.GetLegalActionIds()[-1])
+
+
+def test_state_trace_is_a_snapshot(game):
+    PlayTurns(game, 3, 6)
+    state = game.GetCurrentState(game.GetLegalActionIds())
+    trace = list(state["trace"])
+    assert isinstance(state["trace"], list)
+    assert json.loads(json.dumps(state["trace"])) == [list(entry) for entry in trace]
+    assert state["trace"] + [(0, "pass")] == trace + [(0, "pass")]
+
+    game.UndoAction()
+    game.UndoAction()
+    game.ApplyAction(game.GetLegalActionIds()[0])
+    assert state["trace"] == trace
+    assert state["trace_view"] != trace
+
+
+def test_trace_view_matches_trace(game):
+    PlayTurns(game, 4, 9)
+    state = game.GetCurrentState(game.GetLegalActionIds())
+    assert state["trace_view"] == state["trace"]
+    assert state["trace_view"][-3:] == state["trace"][-3:]
+
+
+def test_finder_game_builds_the_codec_lazily():
+    game = Game.NewGame()
+    game.Reset()
+    assert game.built_action_space is None
+    assert game.round.action_space is None
+    assert game.action_space is ActionSpace.Shared()
+
+
+def test_record_action_outside_the_space_raises(game):
+    game.Reset()
+    with pytest.raises(ValueError):
+        game.round.RecordAction(0, [Card(rank="3", suit=None)] * 5)
+    assert game.round.GetActionIdTrace() == []
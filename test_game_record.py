@@ -0,0 +1,91 @@
+import os
+import pytest
+from game_record import GameRecordReader, GameRecordWriter, INDEX_SUFFIX
+from simulation import Simulator
+from game import Game
+
+
+@pytest.fixture(scope="module")
+def simulator():
+    return Simulator.NewSimulator(True)
+
+
+def WriteGames(simulator, path, seeds):
+    with GameRecordWriter.NewGameRecordWriter(path) as writer:
+        simulator.game.SetRecorder(writer)
+        try:
+            simulator.RunSeeds(seeds)
+        finally:
+            simulator.game.SetRecorder(None)
+
+
+def ReadSeeds(path):
+    with GameRecordReader.NewGameRecordReader(path) as reader:
+        return [rec.seed for rec in reader]
+
+
+@pytest.mark.parametrize("drop_index", [False, True])
+def test_partial_last_record_is_skipped(simulator, tmp_path, drop_index):
+    path = str(tmp_path / "games.ddz")
+    WriteGames(simulator, path, range(0, 20))
+    if drop_index:
+        os.remove(path + INDEX_SUFFIX)
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+    assert ReadSeeds(path) == list(range(0, 20))
+
+
+def test_truncated_file_reopens(simulator, tmp_path):
+    path = str(tmp_path / "games.ddz")
+    WriteGames(simulator, path, range(0, 20))
+    # Cut the last record in half, as a crash mid-write would
+    os.truncate(path, os.path.getsize(path) - 40)
+    assert ReadSeeds(path) == list(range(0, 19))
+
+    WriteGames(simulator, path, range(100, 105))
+    expected = list(range(0, 19)) + list(range(100, 105))
+    assert ReadSeeds(path) == expected
+    with GameRecordReader.NewGameRecordReader(path) as reader:
+        assert reader.indexed
+        assert reader.end == os.path.getsize(path)
+        for rec, seed in zip(reader, expected):
+            assert rec.GetActionIdTrace() == simulator.PlayOne(seed, True)["trace"]
+
+
+def test_not_a_record_file(tmp_path):
+    path = str(tmp_path / "games.ddz")
+    with open(path, "wb") as f:
+        f.write(b"DD")
+    with pytest.raises(ValueError):
+        GameRecordReader.NewGameRecordReader(path)
+    with pytest.raises(ValueError):
+        GameRecordWriter.NewGameRecordWriter(path)
+
+
+def test_records_replay_their_games(simulator, tmp_path):
+    path = str(tmp_path / "games.ddz")
+    WriteGames(simulator, path, range(40, 70))
+    game = Game.NewGame(True)
+    game.verbose = False
+    with GameRecordReader.NewGameRecordReader(path) as reader:
+        assert len(reader) == 30
+        for rec in reader:
+            result = simulator.PlayOne(rec.seed, True)
+            assert rec.GetActionIdTrace() == result["trace"]
+            assert (rec.landlord, rec.winner) == (result["landlord"], result["winner"])
+            rec.Replay(game)
+            assert game.IsDone()
+            assert game.round.GetActionIdTrace() == result["trace"]
+            assert game.judger.GetWinner(game.players) == rec.winner
+
+
+def test_unseeded_records_keep_no_seed(simulator, tmp_path):
+    path = str(tmp_path / "games.ddz")
+    with GameRecordWriter.NewGameRecordWriter(path) as writer:
+        simulator.game.SetRecorder(writer)
+        try:
+            simulator.RunGames(3)
+            simulator.PlayOne(-1)
+        finally:
+            simulator.game.SetRecorder(None)
+    assert ReadSeeds(path) == [None, None, None, -1]
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from vector_env import VectorEnv
+from observation import ObservationEncoder
+from rank_counts import RankCounts
+
+NUM_ENVS = 4
+NUM_STEPS = 400
+
+
+@pytest.fixture(scope="module")
+def env():
+    return VectorEnv.NewVectorEnv(NUM_ENVS, seed=1, encode_observations=True)
+
+
+def test_encode_game_equals_encode_state(env):
+    encoder = env.encoder
+    row = np.zeros(encoder.Size(), dtype=np.float32)
+    rng = np.random.default_rng(0)
+    (observations, _, _) = env.Reset()
+    for _ in range(0, NUM_STEPS):
+        (obs, masks, player_ids) = env.ObserveArrays()
+        for k in range(0, NUM_ENVS):
+            state = observations[k]
+            encoder.EncodeState(state, row)
+            np.testing.assert_array_equal(row, obs[k])
+            views = encoder.Views(obs[k])
+            for name in ("current_hand", "others_hand"):
+                counts = views[name].sum(axis=0).astype(int).tolist()
+                assert RankCounts.ToString(counts) == state[name]
+            assert views["seat"].tolist() == [1.0 if p == player_ids[k] else 0.0 for p in range(0, 3)]
+            assert np.flatnonzero(masks[k]).tolist() == sorted(state["action_ids"])
+        action_ids = [observations[k]["action_ids"][rng.integers(len(observations[k]["action_ids"]))]
+                      for k in range(0, NUM_ENVS)]
+        (observations, _, _, _, _, _) = env.Step(action_ids)
+
+
+def test_history_is_newest_first(env):
+    encoder = env.encoder
+    env.Reset()
+    game = env.games[0]
+    while len(game.round.action_id_trace) < encoder.history_len + 2:
+        game.ApplyAction(game.GetLegalActionIds()[-1])
+    out = encoder.EncodeGame(game, encoder.NewObservationBuffer(1)[0])
+    views = encoder.Views(out)
+    trace = game.round.action_id_trace
+    for slot in range(0, encoder.history_len):
+        (mover, action_id) = trace[len(trace) - 1 - slot]
+        counts = views["history"][slot].sum(axis=0).astype(int).tolist()
+        assert RankCounts.Pack(counts) == encoder.action_space.packed[action_id]
+        assert views["movers"][slot].tolist() == [1.0 if p == mover else 0.0 for p in range(0, 3)]
+
+
+def test_encode_mask_clears_previous_bits():
+    mask = np.zeros(32, dtype=bool)
+    ObservationEncoder.EncodeMask([1, 5, 9], mask)
+    ObservationEncoder.EncodeMask([2, 5], mask, [1, 5, 9])
+    assert np.flatnonzero(mask).tolist() == [2, 5]
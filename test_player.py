@@ -0,0 +1,69 @@
+import pytest
+from game import Game
+from player import Player
+from bitboard import Bitboard
+from card import Card
+
+
+@pytest.fixture(scope="module")
+def game():
+    game = Game.NewGame(True)
+    game.verbose = False
+    return game
+
+
+def Snapshot(player):
+    return (player.hand_mask, player.hand_hash, player.rank_hash, player.GetHandAsString(),
+            sorted(player.action_index.live))
+
+
+def test_apply_undo_restores_the_hand(game):
+    game.dealer.Seed(11)
+    game.Reset()
+    game.Deal()
+    snapshots = []
+    while not game.IsDone():
+        player = game.players[game.GetCurrentPlayerId()]
+        snapshots.append((player, Snapshot(player)))
+        ids = game.GetLegalActionIds()
+        game.ApplyAction(ids[len(ids) // 2])
+    while snapshots:
+        game.UndoAction()
+        (player, snapshot) = snapshots.pop()
+        assert Snapshot(player) == snapshot
+        assert Bitboard.FromCards(player.hand) == player.hand_mask
+        assert player.GetHandSize() == len(player.hand)
+
+
+def test_apply_undo_leave_the_card_list_alone(game):
+    game.dealer.Seed(12)
+    game.Reset()
+    game.Deal()
+    player = game.players[game.GetCurrentPlayerId()]
+    hand = player.hand
+    cards = player.ParseActionStringToCards(game.action_space.Decode(game.GetLegalActionIds()[-1]))
+    player.Apply(cards)
+    assert player.hand_cards is hand
+    assert player.GetHandSize() == len(hand) - len(cards)
+    player.Undo()
+    assert player.hand is hand
+
+
+def test_hand_setter_sets_the_mask():
+    player = Player.NewPlayer(0)
+    player.hand = Bitboard.ToCards(0b10110)
+    assert player.hand_mask == 0b10110
+    assert len(player.hand) == 3
+
+
+def test_duplicate_cards_are_rejected():
+    player = Player.NewPlayer(0)
+    with pytest.raises(ValueError):
+        player.SetHand([Card(rank="5", suit=None), Card(rank="5", suit=None)])
+    with pytest.raises(ValueError):
+        player.SetHand([Card(rank="B", suit=None), Card(rank="B", suit=None)])
+    player.SetHand([Card(rank="5", suit=None), Card(rank="5", suit="Heart"), Card(rank="R", suit=None)])
+    assert player.GetHandSize() == 3
+    with pytest.raises(ValueError):
+        player.AddCards([Card(rank="R", suit=None)])
+    assert player.GetHandSize() == 3
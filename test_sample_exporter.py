@@ -0,0 +1,79 @@
+import os
+import numpy as np
+import pytest
+from collections import Counter
+from game import Game
+from game_record import GameRecordReader, GameRecordWriter
+from sample_exporter import SampleExporter, ShardLoader
+from simulation import Simulator
+
+SEEDS = range(200, 212)
+SHARD_SIZE = 100
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    # The same games exported live and from their records: (live dir, replayed dir)
+    root = tmp_path_factory.mktemp("samples")
+    live_dir = str(root / "live")
+    replayed_dir = str(root / "replayed")
+    record_path = str(root / "games.ddz")
+    simulator = Simulator.NewSimulator(True)
+    with SampleExporter.NewSampleExporter(live_dir, SHARD_SIZE) as exporter:
+        with GameRecordWriter.NewGameRecordWriter(record_path) as writer:
+            simulator.game.sample_exporter = exporter
+            simulator.game.SetRecorder(writer)
+            simulator.RunSeeds(SEEDS)
+    game = Game.NewGame(True)
+    game.verbose = False
+    with SampleExporter.NewSampleExporter(replayed_dir, SHARD_SIZE) as exporter:
+        with GameRecordReader.NewGameRecordReader(record_path) as reader:
+            for rec in reader:
+                exporter.ExportRecord(rec, game)
+    return (live_dir, replayed_dir)
+
+
+def LoadAll(directory):
+    loader = ShardLoader.NewShardLoader(directory, batch_size=1 << 20, shuffle=False, with_masks=False)
+    return next(iter(loader))
+
+
+def SampleKeys(batch):
+    offsets = batch["legal_offsets"]
+    return Counter((int(batch["seeds"][i]), int(batch["players"][i]), int(batch["actions"][i]),
+                    batch["obs"][i].tobytes(), batch["legal_ids"][offsets[i]:offsets[i + 1]].tobytes())
+                   for i in range(0, len(batch["actions"])))
+
+
+def test_record_export_equals_live_export(exported):
+    (live_dir, replayed_dir) = exported
+    live = LoadAll(live_dir)
+    replayed = LoadAll(replayed_dir)
+    assert len(os.listdir(live_dir)) == len(os.listdir(replayed_dir)) > 1
+    assert set(live) == set(replayed)
+    for name in live:
+        np.testing.assert_array_equal(live[name], replayed[name])
+    assert set(live["seeds"].tolist()) == set(SEEDS)
+
+
+def test_shuffled_pass_yields_every_sample_once(exported):
+    (live_dir, _) = exported
+    expected = SampleKeys(LoadAll(live_dir))
+    loader = ShardLoader.NewShardLoader(live_dir, batch_size=64, seed=3)
+    seen = Counter()
+    for batch in loader:
+        masks = batch["masks"]
+        offsets = batch["legal_offsets"]
+        for i in range(0, len(masks)):
+            assert np.flatnonzero(masks[i]).tolist() == sorted(batch["legal_ids"][offsets[i]:offsets[i + 1]].tolist())
+            assert masks[i, batch["actions"][i]]
+        seen.update(SampleKeys(batch))
+    assert seen == expected
+
+
+def test_next_shard_number_skips_existing(tmp_path):
+    for name in ("samples-000000.npz", "samples-000004.npz", "samples-000007.npz.tmp", "other-000009.npz"):
+        (tmp_path / name).write_bytes(b"")
+    assert SampleExporter.NextShardNumber(str(tmp_path), "samples") == 8
+    assert SampleExporter.NextShardNumber(str(tmp_path), "other") == 10
+    assert SampleExporter.NextShardNumber(str(tmp_path), "none") == 0
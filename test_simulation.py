@@ -0,0 +1,23 @@
+import random
+import pytest
+from simulation import Simulator
+
+
+@pytest.fixture(scope="module")
+def simulator():
+    return Simulator.NewSimulator(True)
+
+
+def test_seeded_games_are_reproducible(simulator):
+    first = simulator.PlayOne(21, True)
+    simulator.PlayOne(22)
+    assert simulator.PlayOne(21, True) == first
+
+
+def test_unseeded_game_draws_from_the_global_random(simulator):
+    random.seed(1)
+    expected = simulator.PlayOne(None, True)
+    simulator.PlayOne(5)
+    random.seed(1)
+    assert simulator.PlayOne(None, True) == expected
+    assert simulator.game.dealer.deal_seed is None
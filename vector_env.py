@@ -0,0 +1,130 @@
+import numpy as np
+from typing import List, Dict, Optional, Tuple
+from game import Game
+from action_space import ActionSpace
+from observation import ObservationEncoder
+
+class VectorEnv:
+    # K independent tables advanced in lockstep. Each step every table waits on exactly one
+    # decision (its current player's), so a step takes one action id per table.
+    # Finished tables are reset and dealt again immediately (auto-reset).
+    def __init__(self):
+        self.games: List[Game] = []
+        self.action_space: ActionSpace = None
+        self.num_envs = 0
+        self.next_seed: Optional[int] = None
+        # Per-table legal ids of the pending decision; masks[k] is their boolean image
+        self.legal_ids: List[List[int]] = []
+        self.masks: np.ndarray = None
+        self.player_ids: np.ndarray = None
+        self.seeds: List[Optional[int]] = []      # seed of each table's current deal
+        # Optional array observations: obs[k] is table k's pending decision, kept up to date
+        # in place by RefreshTable
+        self.encoder: Optional[ObservationEncoder] = None
+        self.obs: np.ndarray = None
+
+    @classmethod
+    def NewVectorEnv(cls, num_envs: int, use_action_space: bool = True, seed: Optional[int] = None,
+                     encode_observations: bool = False) -> 'VectorEnv':
+        # seed: deals are drawn from seeds seed, seed+1, ... in the order tables (re)start,
+        # so a run is reproducible; None uses the global random module.
+        # encode_observations: also maintain the (K, encoder size) array returned by ObserveArrays
+        env = cls()
+        env.num_envs = num_envs
+        env.next_seed = seed
+        for _ in range(0, num_envs):
+            game = Game.NewGame(use_action_space)
+            game.verbose = False
+            env.games.append(game)
+        env.action_space = env.games[0].action_space
+        env.legal_ids = [[] for _ in range(0, num_envs)]
+        env.masks = np.zeros((num_envs, env.action_space.Size()), dtype=bool)
+        env.player_ids = np.zeros(num_envs, dtype=np.int64)
+        env.seeds = [None] * num_envs
+        if encode_observations:
+            env.encoder = ObservationEncoder.NewObservationEncoder(env.action_space)
+            env.obs = env.encoder.NewObservationBuffer(num_envs)
+        return env
+
+    def ResetTable(self, k: int) -> None:
+        game = self.games[k]
+        self.seeds[k] = self.next_seed
+        if self.next_seed is not None:
+            game.dealer.Seed(self.next_seed)
+            self.next_seed = self.next_seed + 1
+        game.Reset()
+        game.Deal()
+
+    def Reset(self) -> Tuple[List[Dict], np.ndarray, np.ndarray]:
+        # Deal every table; returns (observations, legal masks, current player ids).
+        # The mask and player-id arrays are reused buffers, overwritten by the next step.
+        for k in range(0, self.num_envs):
+            self.ResetTable(k)
+            self.RefreshTable(k)
+        return self.Observe()
+
+    def RefreshTable(self, k: int) -> None:
+        # Recompute table k's pending decision; only the previously set mask bits are cleared
+        game = self.games[k]
+        ids = game.GetLegalActionIds()
+        ObservationEncoder.EncodeMask(ids, self.masks[k], self.legal_ids[k])
+        self.legal_ids[k] = ids
+        self.player_ids[k] = game.GetCurrentPlayerId()
+        if self.encoder is not None:
+            self.encoder.EncodeGame(game, self.obs[k])
+
+    def Observe(self) -> Tuple[List[Dict], np.ndarray, np.ndarray]:
+        observations = [self.games[k].GetCurrentState(self.legal_ids[k]) for k in range(0, self.num_envs)]
+        return (observations, self.masks, self.player_ids)
+
+    def ObserveArrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # (observations, legal masks, current player ids) as reused arrays, no dicts built.
+        # Valid after Reset/Step on an env made with encode_observations=True.
+        if self.encoder is None:
+            raise ValueError("VectorEnv was created without encode_observations")
+        return (self.obs, self.masks, self.player_ids)
+
+    def Step(self, action_ids) -> Tuple[List[Dict], np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[Optional[Dict]]]:
+        # action_ids: one action id per table. An illegal id falls back to the table's first
+        # legal action, as Game.Play does.
+        # Returns (observations, masks, player_ids, rewards, dones, infos). rewards[k] is the
+        # (3,) payoff of a game that ended on this step (zeros otherwise); infos[k] is its result
+        # dict. The observation of a finished table is the first decision of its next deal.
+        rewards = np.zeros((self.num_envs, 3), dtype=np.float32)
+        dones = np.zeros(self.num_envs, dtype=bool)
+        infos: List[Optional[Dict]] = [None] * self.num_envs
+        for k in range(0, self.num_envs):
+            game = self.games[k]
+            action_id = int(action_ids[k])
+            if (action_id < 0) or (action_id >= self.masks.shape[1]) or (not self.masks[k, action_id]):
+                action_id = self.legal_ids[k][0]
+            game.ApplyAction(action_id)
+            if game.IsDone():
+                result = game.GetResult()
+                result["seed"] = self.seeds[k]
+                for id_, value in result["payoff"].items():
+                    rewards[k, id_] = value
+                dones[k] = True
+                infos[k] = result
+                self.ResetTable(k)
+            self.RefreshTable(k)
+        (observations, masks, player_ids) = self.Observe()
+        return (observations, masks, player_ids, rewards, dones, infos)
+
+    def RunPolicy(self, policy, num_games: int, max_batch_size: int = 0) -> List[Dict]:
+        # Play num_games deals with a BatchPolicy deciding for every seat: each step gathers
+        # the K pending states and answers them with SelectActions calls of at most
+        # max_batch_size states (0 = all K in one call). Returns the finished games' results.
+        results: List[Dict] = []
+        if max_batch_size <= 0:
+            max_batch_size = self.num_envs
+        (observations, _, _) = self.Reset()
+        while len(results) < num_games:
+            action_ids: List[int] = []
+            for lo in range(0, self.num_envs, max_batch_size):
+                action_ids.extend(policy.SelectActions(observations[lo:lo + max_batch_size]))
+            (observations, _, _, _, dones, infos) = self.Step(action_ids)
+            for k in range(0, self.num_envs):
+                if dones[k] and len(results) < num_games:
+                    results.append(infos[k])
+        return results
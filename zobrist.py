@@ -0,0 +1,109 @@
+from typing import List, Optional
+from rank_counts import NUM_RANKS, SLOT_BITS, SLOT_MASK
+
+NUM_PLAYERS = 3
+MASK64 = (1 << 64) - 1
+CARD_BITS = NUM_RANKS * SLOT_BITS      # bitboard positions (bitboard.py layout)
+MAX_COUNT = 4
+
+# Key domains, mixed into the key index so no two tables share a key
+DOMAIN_CARD = 1
+DOMAIN_RANK = 2
+DOMAIN_TURN = 3
+DOMAIN_LAST = 4
+DOMAIN_PASSES = 5
+
+
+class Zobrist:
+    # 64-bit Zobrist keys. Every key is a fixed function of what it stands for (splitmix64 of
+    # its index), so hashes agree across runs and processes and need no shared table.
+    # A position hash is the XOR of:
+    #   - per player: one key per card held (suit-aware) or one key per (rank, count) held
+    #     (suit-insensitive; the rules only look at ranks)
+    #   - the player to act, the last non-pass play (player, action id) and the pass count
+    # Counts of zero, "no last play", "no turn" and zero passes hash to 0.
+
+    @staticmethod
+    def Mix(x: int) -> int:
+        # splitmix64 finalizer
+        x = (x + 0x9E3779B97F4A7C15) & MASK64
+        x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+        return x ^ (x >> 31)
+
+    @staticmethod
+    def Key(domain: int, a: int, b: int = 0, c: int = 0) -> int:
+        return Zobrist.Mix((((domain << 20) | a) << 24 | b) << 8 | c)
+
+    # Precomputed card and rank-count keys: CARD_KEYS[player][bit], RANK_KEYS[player][rank][count]
+    CARD_KEYS: List[List[int]] = []
+    RANK_KEYS: List[List[List[int]]] = []
+
+    @staticmethod
+    def CardHash(player_id: int, mask: int) -> int:
+        # XOR of the card keys of every bit in mask; removing cards XORs their mask back out
+        keys = Zobrist.CARD_KEYS[player_id]
+        h = 0
+        while mask:
+            low = mask & -mask
+            h = h ^ keys[low.bit_length() - 1]
+            mask = mask ^ low
+        return h
+
+    @staticmethod
+    def RankHash(player_id: int, packed: int) -> int:
+        keys = Zobrist.RANK_KEYS[player_id]
+        h = 0
+        v = 0
+        while packed:
+            h = h ^ keys[v][packed & SLOT_MASK]
+            packed = packed >> SLOT_BITS
+            v = v + 1
+        return h
+
+    @staticmethod
+    def RankHashDelta(player_id: int, before: int, after: int, ranks: List[int]) -> int:
+        # XOR turning RankHash(before) into RankHash(after) when only these ranks changed
+        keys = Zobrist.RANK_KEYS[player_id]
+        h = 0
+        for v in ranks:
+            shift = SLOT_BITS * v
+            h = h ^ keys[v][(before >> shift) & SLOT_MASK] ^ keys[v][(after >> shift) & SLOT_MASK]
+        return h
+
+    @staticmethod
+    def TurnKey(player_id: Optional[int]) -> int:
+        if player_id is None:
+            return 0
+        return Zobrist.Key(DOMAIN_TURN, player_id)
+
+    @staticmethod
+    def LastPlayKey(player_id: Optional[int], action_id: int) -> int:
+        if (player_id is None) or (player_id < 0):
+            return 0
+        return Zobrist.Key(DOMAIN_LAST, action_id, player_id)
+
+    @staticmethod
+    def PassesKey(passes: int) -> int:
+        if passes == 0:
+            return 0
+        return Zobrist.Key(DOMAIN_PASSES, passes)
+
+    @staticmethod
+    def RoundHash(turn: Optional[int], last_player: Optional[int], last_play_id: int, passes: int) -> int:
+        return Zobrist.TurnKey(turn) ^ Zobrist.LastPlayKey(last_player, last_play_id) ^ Zobrist.PassesKey(passes)
+
+    @staticmethod
+    def HashSearchState(state) -> int:
+        # Suit-insensitive hash of a SearchState; equals Game.GetRankPositionHash() of the
+        # position it was taken from (while the game is not over)
+        h = Zobrist.RoundHash(state.current, state.last_player, state.last_play, state.passes)
+        for player_id in range(0, NUM_PLAYERS):
+            h = h ^ Zobrist.RankHash(player_id, state.hands[player_id])
+        return h
+
+
+for _p in range(0, NUM_PLAYERS):
+    Zobrist.CARD_KEYS.append([Zobrist.Key(DOMAIN_CARD, _bit, _p) for _bit in range(0, CARD_BITS)])
+    Zobrist.RANK_KEYS.append([[0] + [Zobrist.Key(DOMAIN_RANK, _v, _p, _c) for _c in range(1, MAX_COUNT + 1)]
+                              for _v in range(0, NUM_RANKS)])